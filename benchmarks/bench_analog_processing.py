@@ -0,0 +1,65 @@
+"""
+Benchmark: Analog Processing
+Compares the cost per scan of conditioning analog tags (scaling, filtering, deadband, high/low alarms) one tag at a
+time in python against the AnalogProcessor doing the same as array operations, as the number of tags grows.
+
+    python benchmarks/bench_analog_processing.py --tags 100 1000 10000
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+# so that it runs from a checkout, without the package being installed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controlpyweb.analog_processing import AnalogProcessor
+from controlpyweb.io_definitions.analog_io import AnalogIn
+from controlpyweb.webio_module import WebIOModule
+
+
+def make_module(tags: int) -> WebIOModule:
+    members = {'Analog{}'.format(i): AnalogIn('Analog{}'.format(i), 'analog{}'.format(i)) for i in range(tags)}
+    module = type('BenchModule', (WebIOModule,), members)('bench', keep_alive=False)
+    module.loads(json.dumps({'analog{}'.format(i): '{}.5'.format(i % 100) for i in range(tags)}))
+    return module
+
+
+def per_tag(module: WebIOModule, names: list, state: dict):
+    """ The same conditioning, a tag at a time, as control logic would do it without the processor"""
+    for name in names:
+        io = getattr(module, name)
+        scaled = io.value * 0.1 - 5.0
+        previous = state.get(name)
+        filtered = scaled if previous is None else 0.2 * scaled + 0.8 * previous[0]
+        output = filtered if previous is None or abs(filtered - previous[1]) > 0.05 else previous[1]
+        high, low = output > 90.0, output < 1.0
+        state[name] = (filtered, output, high, low)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tags', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--scans', type=int, default=50)
+    args = parser.parse_args()
+
+    for tags in args.tags:
+        module = make_module(tags)
+        names = list(module.members)
+        state = dict()
+        python = min(timeit.repeat(lambda: per_tag(module, names, state), number=args.scans, repeat=3))
+
+        processor = AnalogProcessor()
+        processor.add_module(module, scale=0.1, offset=-5.0, alpha=0.2, deadband=0.05, low=1.0, high=90.0)
+        vectorized = min(timeit.repeat(processor.process, number=args.scans, repeat=3))
+
+        print(json.dumps(dict(tags=tags, python_us_per_scan=round(python / args.scans * 1e6, 1),
+                              vectorized_us_per_scan=round(vectorized / args.scans * 1e6, 1),
+                              vectorized_ns_per_tag=round(vectorized / args.scans / tags * 1e9, 1),
+                              speedup=round(python / vectorized, 1))))
+
+
+if __name__ == '__main__':
+    main()
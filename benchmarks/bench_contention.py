@@ -0,0 +1,92 @@
+"""
+Benchmark: Contention
+Polls N modules from N threads against a fake session with a fixed round trip time. Because a module's lock is
+never held across the http call, aggregate throughput should grow linearly with N (efficiency close to 1.0).
+
+    python benchmarks/bench_contention.py --latency 0.02 --duration 2 --modules 1 2 4 8 16 32
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+# so that it runs from a checkout, without the package being installed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controlpyweb.reader_writer import ReaderWriter
+
+PAYLOAD = {"vin": "23.6", "serialNumber": "00:0C:C8:04:24:B2", "utcTime": "1559533814"}
+PAYLOAD.update({"relay{}".format(i): "0" for i in range(1, 17)})
+
+
+class _FakeResponse:
+    def __init__(self, payload: dict):
+        self._payload = payload
+
+    def json(self):
+        return dict(self._payload)
+
+
+class _FakeSession:
+    """ Stands in for requests.Session, sleeping for the configured round trip time on every get."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def get(self, url, params=None, timeout=None):
+        time.sleep(self.latency)
+        return _FakeResponse(PAYLOAD)
+
+
+def _poll(rw: ReaderWriter, stop: threading.Event, counts: list, index: int):
+    n = 0
+    while not stop.is_set():
+        rw.update_from_hardware()
+        rw.write("relay1", n % 2 == 0)
+        rw.read("relay2")
+        rw.send_changes_to_hardware()
+        n += 1
+    counts[index] = n
+
+
+def run(n_modules: int, latency: float, duration: float) -> dict:
+    modules = []
+    for i in range(n_modules):
+        rw = ReaderWriter("10.0.0.{}".format(i + 1))
+        rw._req = _FakeSession(latency)
+        modules.append(rw)
+
+    stop = threading.Event()
+    counts = [0] * n_modules
+    threads = [threading.Thread(target=_poll, args=(rw, stop, counts, i), daemon=True)
+               for i, rw in enumerate(modules)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    scans_per_sec = sum(counts) / elapsed
+    ideal = n_modules / (2 * latency)        # each scan is one read and one write round trip
+    return dict(modules=n_modules, scans_per_sec=round(scans_per_sec, 1),
+                efficiency=round(scans_per_sec / ideal, 3))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated round trip time in seconds")
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds to run each configuration")
+    parser.add_argument("--modules", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+    for n in args.modules:
+        print(json.dumps(run(n, args.latency, args.duration)))
+
+
+if __name__ == '__main__':
+    main()
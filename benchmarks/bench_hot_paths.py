@@ -0,0 +1,210 @@
+"""
+Benchmark: Hot Paths
+Times the paths taken on every tag access and every poll, across tag counts: the SingleIO descriptor, the .value
+conversion, the operator overloads, ReaderWriter.read/write (with their lock) and their bulk read_many/write_many,
+_value_to_str, the decoding of a customState.json payload (by the standard library and by the json backend in use),
+and dumps/loads. Results are in nanoseconds per operation; for the payload cases (decode, dumps, loads, store) an
+operation is one tag's share of the payload.
+
+Each figure is the best of many short runs, which keeps it clear of the bursts of a busy machine. Baselines are kept
+in benchmarks/baselines; to absorb the difference in speed between machines, every result is also expressed relative
+to a fixed pure python calibration loop, timed in turn with the runs of that case (so that a slow spell of the machine
+slows both alike), and it is these relative figures that are compared. Run from the root of a checkout, the package
+need not be installed.
+
+    python benchmarks/bench_hot_paths.py --tags 10 100 1000 10000
+    python benchmarks/bench_hot_paths.py --save benchmarks/baselines/hot_paths.json
+    python benchmarks/bench_hot_paths.py --compare benchmarks/baselines/hot_paths.json --tolerance 0.5
+
+When comparing, the exit status is 1 if any case is slower than its baseline by more than the tolerance.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+from typing import Callable, Dict, List, Tuple
+
+# so that it runs from a checkout, without the package being installed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controlpyweb.io_definitions.analog_io import AnalogOut
+from controlpyweb.io_definitions.discrete_io import DiscreteOut
+from controlpyweb.webio_module import WebIOModule
+
+
+class Fixture:
+    """ A module with the given number of tags (alternately analog and discrete outputs), loaded with a poll"""
+
+    def __init__(self, tags: int):
+        members = dict()
+        self.payload = dict()
+        for i in range(tags):
+            name, addr = 'Tag{}'.format(i), 'tag{}'.format(i)
+            if i % 2:
+                members[name] = AnalogOut(name, addr)
+                self.payload[addr] = '{}.5'.format(i)
+            else:
+                members[name] = DiscreteOut(name, addr)
+                self.payload[addr] = str(i // 2 % 2)
+        self.tags = tags
+        self.module = type('BenchModule', (WebIOModule,), members)('bench', keep_alive=False)
+        self.text = json.dumps(self.payload)
+        self.body = self.text.encode()
+        self.module.loads(self.text)
+        self.names = list(members)
+        self.addrs = list(self.payload)
+        self.ios = [getattr(self.module, name) for name in self.names]
+        self.values = [1.5 if i % 2 else True for i in range(tags)]
+
+
+def _per_tag(fixture: Fixture) -> Dict[str, Callable[[], None]]:
+    module, names, addrs, ios, values = fixture.module, fixture.names, fixture.addrs, fixture.ios, fixture.values
+
+    def descriptor_get():
+        for name in names:
+            getattr(module, name)
+
+    def value():
+        for io in ios:
+            io.value
+
+    def operator_eq():
+        for io in ios:
+            io == 1
+
+    def operator_add():
+        for io in ios:
+            io + 1
+
+    def read():
+        for addr in addrs:
+            module.read(addr)
+
+    def write():
+        for addr, v in zip(addrs, values):
+            module.write(addr, v)
+        module.flush_changes()
+
+    def value_to_str():
+        to_str = module._value_to_str
+        for v in values:
+            to_str(v)
+
+    items = dict(zip(addrs, values))
+
+    def write_many():
+        module.write_many(items)
+        module.flush_changes()
+
+    return dict(descriptor_get=descriptor_get, value=value, operator_eq=operator_eq, operator_add=operator_add,
+                read=read, write=write, value_to_str=value_to_str, read_many=lambda: module.read_many(ios),
+                write_many=write_many)
+
+
+def _per_payload(fixture: Fixture) -> Dict[str, Callable[[], None]]:
+    module, body, text, payload = fixture.module, fixture.body, fixture.text, fixture.payload
+    return dict(json_decode=lambda: json.loads(body),
+                backend_decode=lambda: module._loads(body),
+                dumps=module.dumps,
+                loads=lambda: module.loads(text),
+                store_read=lambda: module._store_hardware_read(dict(payload)))
+
+
+_TABLE = {i: str(i) for i in range(100)}
+
+
+def _calibration_loop():
+    """ A fixed pure python loop (dict lookups, attribute access and a call) of 100 iterations"""
+    get = _TABLE.get
+    for i in range(100):
+        get(i).upper()
+
+
+def _timer(run: Callable[[], None], run_time: float) -> Tuple[timeit.Timer, int]:
+    """ Returns a timer of the function, with the number of calls that take about run_time seconds"""
+    timer = timeit.Timer(run)
+    number, elapsed = timer.autorange()
+    return timer, max(1, int(number * run_time / max(elapsed, 1e-9)))
+
+
+def _time(run: Callable[[], None], ops: int, run_time: float, repeat: int) -> Tuple[float, float]:
+    """ Returns the best of the given number of runs, each of about run_time seconds, in nanoseconds per
+    operation, along with the best of the calibration loop (in nanoseconds per iteration) timed in turn with them,
+    so that both see the same state of the machine"""
+    timer, number = _timer(run, run_time)
+    calibration, calibration_number = _timer(_calibration_loop, run_time)
+    best, best_calibration = float('inf'), float('inf')
+    for _ in range(repeat):
+        best = min(best, timer.timeit(number) / (number * ops))
+        best_calibration = min(best_calibration, calibration.timeit(calibration_number) / (calibration_number * 100))
+    return best * 1e9, best_calibration * 1e9
+
+
+def run(tag_counts: List[int], run_time: float, repeat: int) -> dict:
+    results = dict()
+    references = []
+    for tags in tag_counts:
+        fixture = Fixture(tags)
+        # a payload case is a handful of calls, far more at the mercy of the machine than the thousands of a per tag
+        # one, so it is given more runs
+        cases = [(name, fn, repeat) for name, fn in _per_tag(fixture).items()] + \
+                [(name, fn, 4 * repeat) for name, fn in _per_payload(fixture).items()]
+        for name, fn, runs in cases:
+            ns, reference = _time(fn, tags, run_time, runs)
+            references.append(reference)
+            results['{}[{}]'.format(name, tags)] = dict(ns=round(ns, 2), relative=round(ns / reference, 4))
+    return dict(python=platform.python_version(), machine=platform.machine(),
+                calibration_ns=round(min(references), 2), results=results)
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> Tuple[List[str], List[str]]:
+    """ Returns the report lines, and the cases that regressed beyond the tolerance"""
+    lines, regressions = [], []
+    for case, result in current['results'].items():
+        base = baseline['results'].get(case)
+        if base is None:
+            lines.append('{:28} {:>10.1f} ns  (no baseline)'.format(case, result['ns']))
+            continue
+        change = result['relative'] / base['relative'] - 1.0
+        flag = ''
+        if change > tolerance:
+            flag = '  REGRESSION'
+            regressions.append(case)
+        lines.append('{:28} {:>10.1f} ns  {:+7.1%}{}'.format(case, result['ns'], change, flag))
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tags', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    parser.add_argument('--run-time', type=float, default=0.01, help='seconds per timing run')
+    parser.add_argument('--repeat', type=int, default=25,
+                        help='timing runs per case (four times as many for a payload case), of which the best is kept')
+    parser.add_argument('--save', metavar='PATH', help='store the results as a baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare the results against a baseline')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='the slowdown allowed, 0.5 being 50%%')
+    args = parser.parse_args()
+
+    current = run(args.tags, args.run_time, args.repeat)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(current, f, indent=2)
+            f.write('\n')
+    if not args.compare:
+        print(json.dumps(current, indent=2))
+        return
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    lines, regressions = compare(current, baseline, args.tolerance)
+    print('\n'.join(lines))
+    if regressions:
+        print('{} case(s) regressed by more than {:.0%}: {}'.format(len(regressions), args.tolerance,
+                                                                    ', '.join(regressions)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark: Memory
+Compares the dictionary and the compact (array/bitset backed) typed image for a large number of tags: the memory
+held by the typed image and by the declared IO, and the memory allocated by each poll while loading the typed image
+(the decoding of the json payload, common to both, is not included).
+
+    python benchmarks/bench_memory.py --tags 20000 --polls 20
+"""
+
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+
+# so that it runs from a checkout, without the package being installed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controlpyweb.io_definitions.analog_io import AnalogIn
+from controlpyweb.io_definitions.discrete_io import DiscreteIn
+from controlpyweb.webio_module import WebIOModule
+
+
+def make_module_class(tags: int):
+    members = dict()
+    for i in range(tags):
+        io_class = AnalogIn if i % 2 else DiscreteIn
+        members['Tag{}'.format(i)] = io_class('Tag{}'.format(i), 'tag{}'.format(i))
+    return type('BenchModule', (WebIOModule,), members)
+
+
+def make_poll(tags: int, n: int) -> dict:
+    return {'tag{}'.format(i): ('{}.{}'.format(i, n % 10) if i % 2 else str((i + n) % 2)) for i in range(tags)}
+
+
+def measure(module_class, tags: int, polls: int, compact: bool) -> dict:
+    module = module_class('bench', compact_image=compact, keep_alive=False)
+    images = [make_poll(tags, n) for n in range(polls + 1)]
+    module._store_hardware_read(images[0])
+
+    tracemalloc.start()
+    peaks = []
+    retained = 0
+    for vals in images[1:]:
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        module._store_hardware_read(vals)
+        current, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - start)
+        retained += current - start
+    tracemalloc.stop()
+
+    return dict(compact=compact, typed_image_bytes=module._typed.nbytes,
+                peak_bytes_per_poll=round(sum(peaks) / polls), retained_bytes_per_poll=round(retained / polls))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tags", type=int, default=20000)
+    parser.add_argument("--polls", type=int, default=20)
+    args = parser.parse_args()
+
+    module_class = make_module_class(args.tags)
+    io = next(iter(module_class._io_table.values()))
+    print(json.dumps(dict(tags=args.tags, bytes_per_io=sys.getsizeof(io), io_has_dict=hasattr(io, '__dict__'))))
+    for compact in (False, True):
+        print(json.dumps(measure(module_class, args.tags, args.polls, compact)))
+
+
+if __name__ == '__main__':
+    main()
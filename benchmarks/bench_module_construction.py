@@ -0,0 +1,41 @@
+"""
+Benchmark: Module Construction
+Times the construction of many instances of the same WebIOModule subclass. The tag table is computed once, when the
+class is defined, so construction is a copy of each declared IO per instance.
+
+    python benchmarks/bench_module_construction.py --modules 200 --tags 16
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# so that it runs from a checkout, without the package being installed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controlpyweb.io_definitions.discrete_io import DiscreteOut
+from controlpyweb.webio_module import WebIOModule
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", type=int, default=200)
+    parser.add_argument("--tags", type=int, default=16)
+    args = parser.parse_args()
+
+    members = {'Relay{}'.format(i): DiscreteOut('Relay{}'.format(i), 'relay{}'.format(i)) for i in range(args.tags)}
+    start = time.perf_counter()
+    module_class = type('X410DigitalOut', (WebIOModule,), members)
+    defined = time.perf_counter()
+    modules = [module_class('10.0.{}.{}'.format(i // 250, i % 250), keep_alive=False) for i in range(args.modules)]
+    constructed = time.perf_counter()
+
+    print(json.dumps(dict(modules=len(modules), tags=args.tags,
+                          class_definition_us=round((defined - start) * 1e6, 1),
+                          construction_us_per_module=round((constructed - defined) / args.modules * 1e6, 1))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: Value Access
+Measures the cost of reading tags through the SingleIO descriptors, with the typed image (the addresses are
+converted once per poll) and without it (every access reads the raw string and converts it, as before the typed
+image existed).
+
+    python benchmarks/bench_value_access.py --tags 500
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+# so that it runs from a checkout, without the package being installed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controlpyweb.io_definitions.analog_io import AnalogIn
+from controlpyweb.io_definitions.discrete_io import DiscreteIn
+from controlpyweb.tag_image import DictTagImage
+from controlpyweb.webio_module import WebIOModule
+
+
+def make_module(tags: int, compact: bool = False) -> WebIOModule:
+    members = dict()
+    raw = dict()
+    for i in range(tags):
+        if i % 2:
+            members['Analog{}'.format(i)] = AnalogIn('Analog{}'.format(i), 'analog{}'.format(i))
+            raw['analog{}'.format(i)] = '{}.5'.format(i)
+        else:
+            members['Discrete{}'.format(i)] = DiscreteIn('Discrete{}'.format(i), 'discrete{}'.format(i))
+            raw['discrete{}'.format(i)] = '1' if i % 4 else '0'
+    module = type('BenchModule', (WebIOModule,), members)('bench', compact_image=compact)
+    module.loads(json.dumps(raw))
+    return module
+
+
+def scan(module: WebIOModule, names: list):
+    """ A typical piece of control logic, touching every tag through .value and an operator overload"""
+    total = 0
+    for name in names:
+        io = getattr(module, name)
+        if io.value:
+            total += 1
+        if io == 1:
+            total += 1
+    return total
+
+
+def measure(module: WebIOModule, names: list, repeat: int) -> float:
+    timer = timeit.Timer(lambda: scan(module, names))
+    number = max(1, repeat // len(names))
+    best = min(timer.repeat(repeat=5, number=number))
+    return best / (number * len(names) * 2) * 1e9      # two accesses per tag
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tags", type=int, default=500)
+    parser.add_argument("--accesses", type=int, default=20000)
+    parser.add_argument("--compact", action="store_true", help="use the compact (array backed) typed image")
+    args = parser.parse_args()
+
+    module = make_module(args.tags, args.compact)
+    names = list(module.members)
+    typed = measure(module, names, args.accesses)
+
+    module._converters.clear()
+    module._typed = DictTagImage()
+    untyped = measure(module, names, args.accesses)
+
+    print(json.dumps(dict(tags=args.tags, typed_ns_per_access=round(typed, 1),
+                          untyped_ns_per_access=round(untyped, 1), speedup=round(untyped / typed, 2))))
+
+
+if __name__ == '__main__':
+    main()
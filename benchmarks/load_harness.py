@@ -0,0 +1,91 @@
+"""
+Load Harness
+Drives N modules served by the DeviceSimulator at a target scan rate, over real http, and reports the scan rate
+achieved, the request throughput and the cycle latency. Used to size a gateway (how many modules, at what rate, on
+what hardware) before deploying it.
+
+    python benchmarks/load_harness.py --modules 16 --rate 20 --latency 0.01 --jitter 0.005 --duration 10
+
+By default the simulator runs in the same process as the harness, sharing its interpreter. For sizing, start the
+simulator on its own (python -m controlpyweb.simulator --modules 16 ...) and point the harness at it with --external.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# so that it runs from a checkout, without the package being installed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controlpyweb.io_definitions.discrete_io import DiscreteOut
+from controlpyweb.scan_scheduler import ScanScheduler
+from controlpyweb.simulator import DeviceSimulator
+from controlpyweb.webio_module import WebIOModule
+
+
+def make_module_class(tags: int) -> type:
+    members = {'Relay{}'.format(i): DiscreteOut('Relay{}'.format(i), 'relay{}'.format(i))
+               for i in range(1, tags + 1)}
+    return type('LoadModule', (WebIOModule,), members)
+
+
+def run(args) -> dict:
+    simulator = DeviceSimulator()
+    state = {'relay{}'.format(i): '0' for i in range(1, args.tags + 1)}
+    names = ['module{}'.format(i) for i in range(args.modules)]
+    for i, name in enumerate(names):
+        simulator.add_module(name, state, latency=args.latency, jitter=args.jitter,
+                             failure_rate=args.failure_rate, drop_rate=args.drop_rate, seed=i)
+    if args.external is None:
+        simulator.start()
+    base = args.external or simulator.address
+    module_class = make_module_class(args.tags)
+    modules = [module_class('{}/{}'.format(base, name), timeout=args.timeout) for name in names]
+    for module in modules:
+        module.update_from_hardware()
+
+    def logic(scheduler: ScanScheduler):
+        for module in modules:
+            module.Relay1 = not module.Relay1.value
+
+    scheduler = ScanScheduler(modules, period=1.0 / args.rate, logic=logic, timeout=args.timeout)
+    cycles = int(args.rate * args.duration)
+    start = time.monotonic()
+    scheduler.run(cycles=cycles)
+    # the first cycle starts at once, so the run is measured to the end of the period of its last cycle (its whole
+    # periods), not to when the last cycle finished
+    elapsed = max(time.monotonic() - start, cycles * scheduler.period)
+    scheduler.group.close()
+    for module in modules:
+        module.close()
+    simulator.stop()
+
+    summary = scheduler.stats.summary()
+    requests = summary['cycles'] * len(modules) + sum(module.write_stats.requests for module in modules)
+    result = dict(modules=args.modules, target_rate=args.rate, achieved_rate=round(summary['cycles'] / elapsed, 2),
+                  requests_per_second=round(requests / elapsed, 1), overruns=summary['overruns'],
+                  skipped_cycles=summary['skipped_cycles'], connection_errors=summary['connection_errors'])
+    for phase in ('cycle', 'read', 'write', 'jitter'):
+        result[phase + '_ms'] = {k: None if v is None else round(v * 1000, 2) for k, v in summary[phase].items()}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modules', type=int, default=8)
+    parser.add_argument('--tags', type=int, default=16)
+    parser.add_argument('--rate', type=float, default=10.0, help='target scans per second')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds')
+    parser.add_argument('--latency', type=float, default=0.005, help='simulated round trip time, in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--drop-rate', type=float, default=0.0)
+    parser.add_argument('--timeout', type=float, default=1.0)
+    parser.add_argument('--external', metavar='HOST:PORT', help='use a simulator already running at this address')
+    print(json.dumps(run(parser.parse_args()), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Callable
 
 
 class AbstractReaderWriter(ABC):
@@ -8,6 +9,12 @@ class AbstractReaderWriter(ABC):
         """This method provides a response to a read request, based on last load"""
         pass
 
+    def read_value(self, addr: str, converter: Callable[[object], object]) -> object:
+        """This method provides a converted response to a read request, based on last load. Implementations
+        may serve it from a pre-converted image."""
+        val = self.read(addr)
+        return None if val is None else converter(val)
+
     @abstractmethod
     def read_immediate(self, addr: str, timeout: float = None) -> object:
         """This method must provide an immediate response to a read request"""
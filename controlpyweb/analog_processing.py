@@ -0,0 +1,211 @@
+"""
+Module Analog Processing
+The AnalogProcessor conditions the analog tags of many modules as one batch. Each scan it gathers the typed values of
+every channel into a single array, and then applies, as whole-array NumPy operations:
+ - linear scaling into engineering units (raw * scale + offset),
+ - a first order (exponential moving average) filter, with a per channel smoothing factor alpha,
+ - a deadband, holding the output until the filtered value moves further than the deadband from it,
+ - high and low alarm limits, with hysteresis on the way back.
+
+The outputs are written back to each module as derived values (by default under the address with '_eu' appended),
+read like any other through read_value, and alarms that are raised or cleared are returned from process. Beyond
+gathering and storing the values, the work per scan does not grow with the number of channels in python.
+
+NumPy is needed for the processor only; the rest of the library does not depend on it.
+
+    processor = AnalogProcessor()
+    processor.add(tank, 'level1', scale=0.1, offset=-5.0, alpha=0.2, deadband=0.05, high=90.0)
+    processor.add_module(boiler, alpha=0.5)
+    for event in processor.process():
+        print(event.addr, event.limit, event.active, event.value)
+"""
+
+from itertools import repeat
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+from controlpyweb import tag_image
+from controlpyweb.reader_writer import BaseReaderWriter
+
+HIGH = 'high'
+LOW = 'low'
+
+_PARAMETERS = ('scale', 'offset', 'alpha', 'deadband', 'low', 'high', 'hysteresis')
+
+
+class AlarmEvent(NamedTuple):
+    module: BaseReaderWriter
+    addr: str
+    limit: str          # HIGH or LOW
+    active: bool        # True when raised, False when cleared
+    value: float
+
+
+class _ModuleChannels:
+    """ The channels of one module, which are gathered and stored together"""
+
+    def __init__(self, module: BaseReaderWriter):
+        self.module = module
+        self.addrs = []         # type: List[str]
+        self.derived = []       # type: List[str]
+        self.start = 0
+
+
+_STATE = ('_raw', '_filtered', '_output', '_high_active', '_low_active')
+
+
+class AnalogProcessor:
+
+    def __init__(self, suffix: str = '_eu'):
+        """
+        :param suffix: Appended to the address of a channel to form the address of its derived value.
+        """
+        self.suffix = suffix
+        self._modules = dict()          # type: Dict[int, _ModuleChannels]
+        self._settings = dict()         # type: Dict[Tuple[int, str], Dict[str, float]]
+        self._index = dict()            # type: Dict[Tuple[int, str], int]
+        self._channels = []             # type: List[Tuple[BaseReaderWriter, str]]
+        self._parameters = dict()       # type: Dict[str, np.ndarray]
+        self._raw = self._filtered = self._output = np.empty(0)
+        self._high_active = self._low_active = np.empty(0, dtype=bool)
+
+    def __len__(self):
+        return len(self._index)
+
+    def add(self, module: BaseReaderWriter, addr: str, scale: float = 1.0, offset: float = 0.0, alpha: float = 1.0,
+            deadband: float = 0.0, low: float = None, high: float = None, hysteresis: float = 0.0):
+        """
+        Adds a channel, or replaces the settings of one already added.
+        :param module: The module (reader/writer) holding the tag.
+        :param addr: The address of the tag, registered as analog (converted by float) when it is not already.
+        :param scale: Multiplies the raw value into engineering units.
+        :param offset: Added to the scaled value.
+        :param alpha: The smoothing factor of the filter, from 1.0 (no filtering) down towards 0.0 (heavy).
+        :param deadband: The output only follows the filtered value once it moves further than this from it.
+        :param low: An alarm is raised while the output is below this limit.
+        :param high: An alarm is raised while the output is above this limit.
+        :param hysteresis: How far back inside its limit the output must come for an alarm to clear.
+        """
+        self._add(module, addr, scale, offset, alpha, deadband, low, high, hysteresis)
+        self._rebuild()
+
+    def _add(self, module: BaseReaderWriter, addr: str, scale: float = 1.0, offset: float = 0.0, alpha: float = 1.0,
+             deadband: float = 0.0, low: float = None, high: float = None, hysteresis: float = 0.0):
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("The filter alpha must be greater than 0 and at most 1.")
+        key = (id(module), addr)
+        self._settings[key] = dict(scale=scale, offset=offset, alpha=alpha, deadband=deadband,
+                                   low=-np.inf if low is None else low, high=np.inf if high is None else high,
+                                   hysteresis=hysteresis)
+        if key not in self._index:
+            channels = self._modules.get(id(module))
+            if channels is None:
+                channels = self._modules[id(module)] = _ModuleChannels(module)
+            if addr not in module._typed.addresses:
+                # channels are gathered from the typed image, which only holds registered addresses
+                module.register_converter(addr, float, tag_image.ANALOG)
+            derived = addr + self.suffix
+            module.register_derived(derived, tag_image.ANALOG)
+            channels.addrs.append(addr)
+            channels.derived.append(derived)
+
+    def add_module(self, module: BaseReaderWriter, **kwargs):
+        """ Adds every analog IO declared on a module, with the settings given (those of add)"""
+        for io in getattr(module, '_bound_io', {}).values():
+            if io._kind == tag_image.ANALOG:
+                self._add(module, io.addr, **kwargs)
+        self._rebuild()
+
+    def remove_module(self, module: BaseReaderWriter):
+        """ Stops processing the channels of a module"""
+        if self._modules.pop(id(module), None) is None:
+            return
+        self._settings = {key: value for key, value in self._settings.items() if key[0] != id(module)}
+        self._rebuild()
+
+    def _rebuild(self):
+        """ Lays the channels out module by module, so that each module's are contiguous in the arrays, carrying
+        over the state of the channels that were already there"""
+        state = {key: tuple(getattr(self, name)[i] for name in _STATE) for key, i in self._index.items()}
+        self._index = dict()
+        self._channels = []
+        for module_id, channels in self._modules.items():
+            channels.start = len(self._index)
+            for addr in channels.addrs:
+                self._index[(module_id, addr)] = len(self._index)
+                self._channels.append((channels.module, addr))
+        keys = list(self._index)
+        self._parameters = {name: np.array([self._settings[key][name] for key in keys], dtype=float)
+                            for name in _PARAMETERS}
+        fresh = (np.nan, np.nan, np.nan, False, False)
+        for position, name in enumerate(_STATE):
+            dtype = bool if name.endswith('active') else float
+            values = [state.get(key, fresh)[position] for key in keys]
+            setattr(self, name, np.array(values, dtype=dtype))
+
+    def _gather(self):
+        raw = self._raw
+        for channels in self._modules.values():
+            n = len(channels.addrs)
+            get = channels.module._typed.get
+            raw[channels.start:channels.start + n] = np.fromiter(map(get, channels.addrs, repeat(np.nan)), float, n)
+
+    def process(self) -> List[AlarmEvent]:
+        """ Processes the latest values of every channel, stores the outputs as derived values and returns the
+        alarms raised or cleared by this scan"""
+        if len(self._index) == 0:
+            return []
+        p = self._parameters
+        self._gather()
+        scaled = self._raw * p['scale'] + p['offset']
+        # the filter starts from the first value it sees, and a missing value leaves it as it is
+        previous = self._filtered
+        filtered = np.where(np.isnan(previous), scaled, p['alpha'] * scaled + (1.0 - p['alpha']) * previous)
+        filtered = np.where(np.isnan(scaled), previous, filtered)
+        self._filtered = filtered
+        output = self._output
+        move = np.isnan(output) | (np.abs(filtered - output) > p['deadband'])
+        output = np.where(move, filtered, output)
+        self._output = output
+
+        with np.errstate(invalid='ignore'):
+            high = np.where(self._high_active, output > p['high'] - p['hysteresis'], output > p['high'])
+            low = np.where(self._low_active, output < p['low'] + p['hysteresis'], output < p['low'])
+        events = self._events(HIGH, self._high_active, high) + self._events(LOW, self._low_active, low)
+        self._high_active, self._low_active = high, low
+        self._store()
+        return events
+
+    def _events(self, limit: str, before: np.ndarray, after: np.ndarray) -> List[AlarmEvent]:
+        changed = np.flatnonzero(before != after)
+        if len(changed) == 0:
+            return []
+        return [AlarmEvent(self._channels[i][0], self._channels[i][1], limit, bool(after[i]), float(self._output[i]))
+                for i in changed]
+
+    def _store(self):
+        outputs = self._output.tolist()
+        for channels in self._modules.values():
+            n = len(channels.addrs)
+            channels.module._store_derived(channels.derived, outputs[channels.start:channels.start + n])
+
+    def value(self, module: BaseReaderWriter, addr: str) -> float:
+        """ Returns the processed value of a channel, NaN before it has had a value"""
+        return float(self._output[self._channel(module, addr)])
+
+    def alarms(self, module: BaseReaderWriter, addr: str) -> Tuple[bool, bool]:
+        """ Returns whether the (high, low) alarms of a channel are active"""
+        index = self._channel(module, addr)
+        return bool(self._high_active[index]), bool(self._low_active[index])
+
+    def active_alarms(self) -> List[Tuple[BaseReaderWriter, str, str]]:
+        """ Returns the (module, addr, HIGH or LOW) of every active alarm"""
+        return ([self._channels[i] + (HIGH,) for i in np.flatnonzero(self._high_active)] +
+                [self._channels[i] + (LOW,) for i in np.flatnonzero(self._low_active)])
+
+    def _channel(self, module: BaseReaderWriter, addr: str) -> int:
+        try:
+            return self._index[(id(module), addr)]
+        except KeyError:
+            raise KeyError("{} is not processed.".format(addr)) from None
@@ -0,0 +1,302 @@
+"""
+Module Async Reader Writer
+This module provides the AsyncReaderWriter class, an asyncio counterpart of the ReaderWriter. Reads and writes
+against the in-memory image behave exactly as they do for the ReaderWriter, while the calls that go to the hardware
+are coroutines running over a small, non-blocking HTTP/1.1 client that keeps its connection alive between calls.
+This allows hundreds of modules to be driven from a single event loop.
+"""
+
+import asyncio
+import time
+from typing import List, Optional, Tuple, Union
+from urllib.parse import urlencode, urlsplit
+
+from controlpyweb.errors import WebIOCircuitOpenError, WebIOConnectionError
+from controlpyweb.read_pipeline import AsyncSingleFlight
+from controlpyweb.reader_writer import BaseReaderWriter
+
+
+class _AsyncHttpConnection:
+    """ A minimal HTTP/1.1 client holding a single keep-alive connection. Requests are serialized, as the
+    embedded web servers of the modules do not support pipelining."""
+
+    def __init__(self, url: str, keep_alive: bool = True):
+        parts = urlsplit(url)
+        self._ssl = parts.scheme == 'https'
+        self._host = parts.hostname
+        self._port = parts.port or (443 if self._ssl else 80)
+        self._host_header = parts.netloc
+        self._path = parts.path or '/'
+        self._keep_alive = keep_alive
+        self._reader = None     # type: Optional[asyncio.StreamReader]
+        self._writer = None     # type: Optional[asyncio.StreamWriter]
+        self._lock = None       # type: Optional[asyncio.Lock]
+
+    @property
+    def is_connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    def _abort(self) -> Optional[asyncio.StreamWriter]:
+        """ Closes the connection without waiting for it to close, returning its writer (if any)"""
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+        return writer
+
+    async def close(self):
+        writer = self._abort()
+        if writer is None:
+            return
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+    async def get(self, params: dict = None, timeout: float = None) -> bytes:
+        """ Performs a GET of the url, with the given query parameters, returning the body of the response."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            try:
+                return await asyncio.wait_for(self._get(params), timeout)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as ex:
+                await self.close()
+                raise WebIOConnectionError(ex) from ex
+            except WebIOConnectionError:
+                raise       # an error status, whose reply has been read in full
+            except BaseException:
+                # cancelled (say) part way through, which would leave the reply to be read by the next request
+                self._abort()
+                raise
+
+    async def _get(self, params: Optional[dict]) -> bytes:
+        target = self._path if not params else '{}?{}'.format(self._path, urlencode(params))
+        request = ('GET {} HTTP/1.1\r\nHost: {}\r\nAccept: application/json\r\nConnection: {}\r\n\r\n'
+                   .format(target, self._host_header, 'keep-alive' if self._keep_alive else 'close')).encode('latin-1')
+        reused = self.is_connected
+        try:
+            return await self._round_trip(request)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            if not reused:
+                raise
+        # The module closed an idle keep-alive connection, try once more on a fresh one.
+        await self.close()
+        return await self._round_trip(request)
+
+    async def _round_trip(self, request: bytes) -> bytes:
+        if not self.is_connected:
+            self._reader, self._writer = await asyncio.open_connection(self._host, self._port, ssl=self._ssl or None)
+        self._writer.write(request)
+        await self._writer.drain()
+        status, headers = await self._read_head()
+        body = await self._read_body(headers)
+        if not self._keep_alive or headers.get('connection', '').lower() == 'close':
+            await self.close()
+        if not 200 <= status < 300:
+            raise WebIOConnectionError('The module responded with http status {}'.format(status))
+        return body
+
+    async def _read_head(self) -> Tuple[int, dict]:
+        status_line = await self._reader.readuntil(b'\r\n')
+        status = int(status_line.split(None, 2)[1])
+        headers = dict()
+        while True:
+            line = await self._reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                return status, headers
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+    async def _read_body(self, headers: dict) -> bytes:
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            body = bytearray()
+            while True:
+                size = int((await self._reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                if size == 0:
+                    await self._reader.readuntil(b'\r\n')
+                    return bytes(body)
+                body += await self._reader.readexactly(size)
+                await self._reader.readexactly(2)
+        if 'content-length' in headers:
+            return await self._reader.readexactly(int(headers['content-length']))
+        body = await self._reader.read()
+        await self.close()
+        return body
+
+
+class AsyncReaderWriter(BaseReaderWriter):
+
+    def __init__(self, url: str, demand_address_exists: bool = True, timeout: float = 10.0,
+                 keep_alive: bool = True, **kwargs):
+        """
+        :param url: The address of the IO Base module from/to which IO is written
+        """
+        super().__init__(url, demand_address_exists, timeout, **kwargs)
+        self._http = _AsyncHttpConnection(self._url, keep_alive)
+        self._immediate_read = AsyncSingleFlight(self._fetch_immediate, self.read_stats)
+        self._refreshing = None     # type: Optional[asyncio.Task]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        """ Closes the connection to the module"""
+        await self._http.close()
+
+    async def _http_get(self, params: dict = None, timeout: float = None) -> bytes:
+        """ Makes a request of the module, through its circuit breaker. While the circuit is open, the first
+        request made once the backoff has elapsed is let through as the probe."""
+        if not self._breaker.allow():
+            raise WebIOCircuitOpenError(self._url, self._breaker.retry_in)
+        metrics = self.metrics
+        start = time.perf_counter() if metrics is not None else 0.0
+        try:
+            body = await self._http.get(params, self.timeout if timeout is None else timeout)
+        except WebIOConnectionError as ex:
+            if metrics is not None:
+                # Errors of the connection carry their cause, a reply with a bad status has none
+                metrics.record_error(timeout=isinstance(ex.__cause__, asyncio.TimeoutError), http=ex.__cause__ is None)
+            self._breaker.record_failure(ex)
+            raise
+        except BaseException as ex:
+            # cancelled (say), which would otherwise leave a probe half open for good
+            self._breaker.record_failure(ex)
+            raise
+        if metrics is not None:
+            metrics.record_request(params is not None, time.perf_counter() - start)
+        self._breaker.record_success()
+        return body
+
+    async def _get(self, params: dict = None, timeout: float = None) -> Optional[dict]:
+        """ Does an http get and returns the results as key/value pairs"""
+        return self._decode(await self._http_get(params, timeout))
+
+    def _decode(self, body: bytes) -> Optional[dict]:
+        if not body:
+            return None
+        start = time.perf_counter()
+        try:
+            vals = self._loads(body)
+        except ValueError as ex:
+            raise WebIOConnectionError(ex)
+        if self.metrics is not None:
+            self.metrics.record_decode(time.perf_counter() - start, len(body))
+        return vals
+
+    async def _write_request(self, params: dict, timeout: float = None) -> bytes:
+        """ Sends a write request once the rate limit allows"""
+        delay = self._rate_limiter.reserve()
+        if delay > 0:
+            self.write_stats.throttled_time += delay
+            await asyncio.sleep(delay)
+        self.write_stats.requests += 1
+        return await self._http_get(params, timeout)
+
+    async def read_immediate(self, addr: str, timeout: float = None, max_age: float = None) -> object:
+        """
+        Makes a hardware call to the base module to retrieve the value of the IO. This is inefficient and should
+        be used sparingly. Calls made concurrently share one request, whose image is stored as the latest read.
+        :param max_age: Answers from the image instead, when it was read within this many seconds (defaults to
+        immediate_max_age).
+        """
+        self._check_for_address(addr)
+        vals = self._recent_image(max_age)
+        if vals is None:
+            vals = await self._immediate_read.get(timeout)
+        if vals is None:
+            return None
+        return vals.get(addr)
+
+    async def _fetch_immediate(self, timeout: float) -> Optional[dict]:
+        vals = await self._get(timeout=timeout)
+        self._store_hardware_read(vals)
+        return vals
+
+    async def refresh(self, timeout: float = None):
+        """ Reads the image from the hardware (or the shared image, when attached to one), sharing a request
+        already in flight. Unlike update_from_hardware, pending changes are kept."""
+        self.read_stats.refreshes += 1
+        if self._reads_shared:
+            self._store_shared_read()
+            return
+        await self._immediate_read.get(timeout)
+
+    def _refresh_stale(self, max_age: float) -> bool:
+        """ A read cannot wait on the hardware from within the event loop, so the refresh is started in the
+        background, for the reads that follow, and this read is left stale"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = loop.create_task(self.refresh())
+            self._refreshing.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return False
+
+    async def to_hardware(self, timeout: float = None):
+        """ Same as send_changes_to_hardware"""
+        return await self.send_changes_to_hardware(timeout)
+
+    async def send_changes_to_hardware(self, timeout: float = None):
+        """ Takes the collection of changes made using the write command and
+        sends them all to the hardware collectively. """
+        changes = self._pending_changes()
+        if changes is None:
+            return
+        self._record_flush(changes)
+        for batch in self._batches(changes):
+            await self._write_request(batch, timeout)
+            self._discard_changes(batch)
+
+    async def from_hardware(self, timeout: float = None):
+        """ Same as update_from_hardware"""
+        await self.update_from_hardware(timeout)
+
+    async def update_from_hardware(self, timeout: float = None):
+        """Makes a hardware call to the base module to retrieve the value of all IOs, storing their
+        results in memory."""
+        pending = self._pending_changes()
+        if self._reads_shared:
+            self._store_shared_read(discard=pending)
+            return
+        vals = await self._get(timeout=timeout)
+        self._store_hardware_read(vals, discard=pending)
+
+    async def sync(self, timeout: float = None):
+        """ Same as sync_with_hardware"""
+        await self.sync_with_hardware(timeout)
+
+    async def sync_with_hardware(self, timeout: float = None):
+        """Sends the pending changes and stores the state the module returns in reply as the new image, doing
+        the work of send_changes_to_hardware and update_from_hardware in a single round trip."""
+        if self._reads_shared:
+            await self.send_changes_to_hardware(timeout)
+            self._store_shared_read()
+            return
+        changes = self._pending_changes()
+        if changes is None:
+            self._store_hardware_read(await self._get(timeout=timeout))
+            return
+        self._record_flush(changes)
+        batches = self._batches(changes)
+        for batch in batches[:-1]:
+            await self._write_request(batch, timeout)
+            self._discard_changes(batch)
+        vals = await self._write_request(batches[-1], timeout)
+        self._store_hardware_read(self._decode(vals), discard=batches[-1])
+
+    async def write_immediate(self, addr: Union[str, List[str]],
+                              value: Union[object, List[object]], timeout: float = None):
+        """
+        Instead of waiting for a group write, writes the given value immediately. Note, this is not very efficient
+        and should be used sparingly. """
+        items = self._items_to_write(addr, value)
+        if len(items) == 0:
+            return
+        self.write_stats.immediate_writes += 1
+        for batch in self._batches(items):
+            await self._write_request(batch, timeout)
+            self._store_immediate_write(batch)
@@ -0,0 +1,17 @@
+"""
+Module Async Web IO:
+The asyncio counterpart of the WebIOModule. IO is declared the same way, and is read and written against the cached
+image the same way, while the hardware calls (update_from_hardware, send_changes_to_hardware and the immediate
+reads/writes) must be awaited.
+"""
+
+from controlpyweb.async_reader_writer import AsyncReaderWriter
+from controlpyweb.webio_module import WebIOContainer
+from abc import ABC
+
+
+class AsyncWebIOModule(WebIOContainer, AsyncReaderWriter, ABC):
+
+    def __init__(self, url: str, demand_address_exists: bool = True, **kwargs):
+        super().__init__(url, demand_address_exists, **kwargs)
+        self._register_members()
@@ -0,0 +1,100 @@
+"""
+Module Circuit Breaker
+The CircuitBreaker tracks the health of a single module. After a number of consecutive failed requests the circuit
+opens, and requests fail fast instead of each waiting out the full timeout. While open, the module is probed with an
+exponentially growing backoff; the first successful probe closes the circuit again.
+
+Probing is either inline, where the first request made after the backoff has elapsed is let through as the probe
+(HALF_OPEN), or done in the background by the owner of the breaker, which calls probe_due and records the outcome.
+"""
+
+import threading
+import time
+from typing import Optional
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitBreaker:
+
+    def __init__(self, failure_threshold: Optional[int] = 3, backoff: float = 1.0, max_backoff: float = 60.0,
+                 multiplier: float = 2.0, inline_probe: bool = True):
+        """
+        :param failure_threshold: The consecutive failures that open the circuit, None (or 0) to never open it.
+        :param backoff: The time before the first probe of an open circuit, in seconds.
+        :param max_backoff: The upper bound on the time between probes.
+        :param multiplier: The growth of the backoff after each failed probe.
+        :param inline_probe: If set, a request is let through once the backoff has elapsed, as the probe.
+        """
+        self.failure_threshold = failure_threshold
+        self.initial_backoff = backoff
+        self.max_backoff = max_backoff
+        self.multiplier = multiplier
+        self.inline_probe = inline_probe
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._backoff = backoff
+        self._next_probe = 0.0
+        self.last_error = None          # type: Optional[BaseException]
+        self.last_success_time = None   # type: Optional[float]
+        self.opened_count = 0
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def is_closed(self) -> bool:
+        return self._state == CLOSED
+
+    @property
+    def failures(self) -> int:
+        """ The number of consecutive failures"""
+        return self._failures
+
+    @property
+    def retry_in(self) -> float:
+        """ The time until the next probe, 0.0 if the circuit is closed or a probe is due"""
+        if self._state == CLOSED:
+            return 0.0
+        return max(0.0, self._next_probe - time.monotonic())
+
+    def allow(self) -> bool:
+        """ Returns whether a request may be made now"""
+        if self._state == CLOSED:
+            return True
+        with self._lock:
+            if self._state == OPEN and self.inline_probe and time.monotonic() >= self._next_probe:
+                self._state = HALF_OPEN
+                return True
+            return False
+
+    def probe_due(self) -> bool:
+        return self._state != CLOSED and time.monotonic() >= self._next_probe
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._backoff = self.initial_backoff
+            self.last_success_time = time.time()
+
+    def record_failure(self, error: BaseException = None) -> bool:
+        """ Records a failed request, returning True if it caused the circuit to open"""
+        with self._lock:
+            self._failures += 1
+            self.last_error = error
+            if self._state == CLOSED:
+                if not self.failure_threshold or self._failures < self.failure_threshold:
+                    return False
+                self.opened_count += 1
+                opened = True
+            else:
+                opened = False
+            self._state = OPEN
+            self._next_probe = time.monotonic() + self._backoff
+            self._backoff = min(self.max_backoff, self._backoff * self.multiplier)
+            return opened
@@ -3,6 +3,8 @@ Module: Errors
 Purpose: The purpose of this module is to define the errors that will be thrown by the application.
 """
 
+from typing import Optional
+
 
 class ControlPyWebReadOnlyError(Exception):
     def __init__(self):
@@ -16,3 +18,26 @@ class ControlPyWebAddressNotFoundError(Exception):
 
 class WebIOConnectionError(Exception):
     msg = "Unable to establish a connection with the Web IO Module."
+
+
+class WebIOCircuitOpenError(WebIOConnectionError):
+    msg = "The Web IO Module has stopped responding, requests fail fast until it responds to a probe."
+
+    def __init__(self, url: str, retry_in: float):
+        super().__init__("{} is unreachable, the next probe is in {:.1f}s.".format(url, retry_in))
+
+
+class WebIOStaleImageError(WebIOConnectionError):
+    msg = "The image of the Web IO Module is older than allowed, and could not be refreshed."
+
+    def __init__(self, url: str, age: Optional[float]):
+        super().__init__("The image of {} is {} old, and could not be refreshed.".format(
+            url, 'never read, so infinitely' if age is None else '{:.1f}s'.format(age)))
+
+
+class ControlPyWebSnapshotError(Exception):
+    pass
+
+
+class ControlPyWebSharedImageError(Exception):
+    pass
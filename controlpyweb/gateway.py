@@ -0,0 +1,338 @@
+"""
+Module Gateway
+The Gateway lets many local services share the modules of a site while each module is polled by just one process.
+The gateway owns the connections to the modules, and polls them all once per period (with a ScanScheduler). Clients
+connect to it over a unix socket (or loopback), and their modules are served from the images it last read.
+
+A client builds its modules as it always has, and hands each to a GatewayClient. Its reads (update_from_hardware,
+sync_with_hardware) then return the gateway's image instead of calling the hardware, and its writes (of any kind)
+are merged by the gateway into the pending changes of the module, which go out in one send_changes_to_hardware per
+module per cycle. A module that is watched is also pushed each image that differs from the last, which calls back
+its subscriptions as the gateway reads them. However many clients there are, each module sees one read and at most
+one write per cycle.
+
+    # the gateway process
+    with Gateway([Tank('192.168.1.10'), Boiler('192.168.1.11')], period=0.5, address='/run/webio.sock'):
+        ...
+
+    # any number of client processes
+    client = GatewayClient('/run/webio.sock')
+    tank = client.watch(Tank('192.168.1.10'))
+    tank.subscribe('level1', on_level)
+    tank.Pump = True
+    tank.send_changes_to_hardware()       # sent to the tank with the gateway's next cycle
+"""
+
+import itertools
+import json
+import socket
+import socketserver
+import threading
+from concurrent.futures import Future, TimeoutError
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from controlpyweb.reader_writer import BaseReaderWriter, ReaderWriter
+from controlpyweb.scan_scheduler import ScanScheduler
+
+Address = Union[str, Tuple[str, int]]     # the path of a unix socket, or a (host, port)
+
+
+class _Connection:
+    """ A client connection, on which replies and pushed images are written from different threads"""
+
+    def __init__(self, wfile):
+        self._wfile = wfile
+        self._lock = threading.Lock()
+
+    def send(self, message: dict):
+        data = json.dumps(message).encode() + b'\n'
+        with self._lock:
+            self._wfile.write(data)
+            self._wfile.flush()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    gateway = None      # type: Gateway
+
+    def handle(self):
+        connection = _Connection(self.wfile)
+        try:
+            for line in self.rfile:
+                request = json.loads(line)
+                reply = self.gateway._handle(request, connection)
+                reply['id'] = request.get('id')
+                connection.send(reply)
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.gateway._drop(connection)
+
+
+class Gateway:
+
+    def __init__(self, modules: Iterable[ReaderWriter], period: float, address: Address = ('127.0.0.1', 0),
+                 **kwargs):
+        """
+        :param modules: The modules polled by the gateway, which clients reach by their url.
+        :param period: The time between the start of each cycle, in seconds.
+        :param address: The path of the unix socket to listen on, or the (host, port) to listen on.
+        :param kwargs: Passed to the ScanScheduler, such as overrun and timeout.
+        """
+        self.modules = {module.url: module for module in modules}     # type: Dict[str, ReaderWriter]
+        self.scheduler = ScanScheduler(list(self.modules.values()), period, logic=self._cycle, **kwargs)
+        self.client_requests = 0
+        self.client_writes = 0
+        self._watchers = {url: [] for url in self.modules}        # type: Dict[str, List[_Connection]]
+        self._pushed = dict()       # type: Dict[str, dict]
+        self._writes = {url: dict() for url in self.modules}      # type: Dict[str, Dict[str, str]]
+        self._lock = threading.Lock()
+        handler = type('Handler', (_Handler,), dict(gateway=self))
+        if isinstance(address, str):
+            self._server = socketserver.ThreadingUnixStreamServer(address, handler)
+        else:
+            self._server = socketserver.ThreadingTCPServer(address, handler)
+        self._server.daemon_threads = True
+        self._thread = None         # type: Optional[threading.Thread]
+        self._scanning = False      # whether cycles are run by the scheduler, rather than by run_once
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def address(self) -> Address:
+        return self._server.server_address
+
+    def start(self, scan: bool = True):
+        """ Starts serving clients on a background thread, and the scan, unless told not to (in which case cycles
+        are run with run_once)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), name='webio-gateway',
+                                            daemon=True)
+            self._thread.start()
+        if scan:
+            self._scanning = True
+            self.scheduler.start()
+
+    def stop(self):
+        self._scanning = False
+        self.scheduler.stop()
+        if self._thread is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._thread = None
+
+    def run_once(self):
+        """ Runs a single read, push, write cycle over the modules"""
+        self.scheduler.run_once()
+
+    def _handle(self, request: dict, connection: _Connection) -> dict:
+        module = self.modules.get(request.get('url'))
+        if module is None:
+            return dict(status=404)
+        with self._lock:
+            self.client_requests += 1
+            if request.get('op') == 'watch':
+                self._watchers[module.url].append(connection)
+                return dict(status=200)
+        params = request.get('params')
+        if params:
+            with self._lock:
+                self._writes[module.url].update(params)
+                self.client_writes += len(params)
+        return self._image(module)
+
+    def _image(self, module: BaseReaderWriter) -> dict:
+        """ The reply to a read: the last image, unless the module is unreachable, has not been read yet, or is
+        no longer being read as the scan has stopped"""
+        if module.is_stale or module.last_hardware_read_time is None:
+            return dict(status=503)
+        if self._scanning and not self.scheduler.is_running:
+            return dict(status=503)
+        with module._lock:
+            return dict(status=200, image=dict(module._io), read_time=module.last_hardware_read_time)
+
+    def _cycle(self, scheduler: ScanScheduler):
+        """ Runs between the read and the write of each cycle. The writes of the clients are held until now, as
+        the read would otherwise discard them, then handed to the modules to go out with the write."""
+        self._push(scheduler)
+        with self._lock:
+            writes = self._writes
+            self._writes = {url: dict() for url in self.modules}
+        for url, changes in writes.items():
+            module = self.modules[url]
+            for addr, value in changes.items():
+                module.write(addr, value)
+
+    def _push(self, scheduler: ScanScheduler):
+        """ Pushes each watched module's image to its watchers, when it differs from the one last pushed"""
+        for url, module in self.modules.items():
+            with self._lock:
+                watchers = list(self._watchers[url])
+            if len(watchers) == 0 or scheduler.last_reads.get(module) is not None:
+                continue
+            message = self._image(module)
+            if message['status'] != 200 or message['image'] == self._pushed.get(url):
+                continue
+            self._pushed[url] = message['image']
+            message['push'] = url
+            for connection in watchers:
+                try:
+                    connection.send(message)
+                except OSError:
+                    self._drop(connection)
+
+    def _drop(self, connection: _Connection):
+        with self._lock:
+            for watchers in self._watchers.values():
+                if connection in watchers:
+                    watchers.remove(connection)
+
+
+class _Reply:
+    """ Stands in for the http response of a module, for the ReaderWriter"""
+
+    def __init__(self, status_code: int, image: dict = None, read_time: float = None):
+        self.status_code = status_code
+        self.ok = status_code == 200
+        self.read_time = read_time      # when the gateway read the image
+        self._image = image
+
+    def json(self) -> dict:
+        return self._image
+
+
+class _GatewaySession:
+    """ Stands in for the http session of a module, sending its requests to the gateway"""
+
+    def __init__(self, client: 'GatewayClient'):
+        self._client = client
+
+    def get(self, url: str, params: dict = None, timeout: float = None) -> _Reply:
+        reply = self._client.request(dict(op='get', url=url, params=params), timeout)
+        return _Reply(reply['status'], reply.get('image'), reply.get('read_time'))
+
+    def close(self):
+        pass
+
+
+class GatewayClient:
+
+    def __init__(self, address: Address, timeout: float = 10.0,
+                 on_error: Callable[['GatewayClient', Exception], None] = None):
+        """
+        :param address: The address the gateway listens on.
+        :param timeout: How long to wait for a reply when the module gives no timeout of its own.
+        :param on_error: Called with the client and the error when a subscription callback raises on an image pushed
+        to a watched module, which is otherwise only counted (in push_errors) and kept in last_error, as the
+        connection carries on.
+        """
+        self.timeout = timeout
+        self.on_error = on_error
+        self.push_errors = 0
+        self.last_error = None      # type: Optional[Exception]
+        self._socket = socket.socket(socket.AF_UNIX if isinstance(address, str) else socket.AF_INET)
+        self._socket.connect(address)
+        self._file = self._socket.makefile('rwb')
+        self._ids = itertools.count()
+        self._pending = dict()      # type: Dict[int, Future]
+        self._watched = dict()      # type: Dict[str, BaseReaderWriter]
+        self._lock = threading.Lock()
+        self._closed = False
+        self._reader = threading.Thread(target=self._read, name='webio-gateway-client', daemon=True)
+        self._reader.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self._closed = True
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._socket.close()
+        self._reader.join()
+
+    def attach(self, module: ReaderWriter) -> ReaderWriter:
+        """ Has the module read and write through the gateway, returning it"""
+        getattr(module._req, 'close', lambda: None)()
+        module._req = _GatewaySession(self)
+        return module
+
+    def watch(self, module: ReaderWriter) -> ReaderWriter:
+        """ Attaches the module, and has the gateway push it each new image as it is read, returning it"""
+        self.attach(module)
+        self._watched[module.url] = module
+        reply = self.request(dict(op='watch', url=module.url))
+        if reply['status'] != 200:
+            del self._watched[module.url]
+            raise ValueError("The gateway does not poll {}.".format(module.url))
+        return module
+
+    def request(self, message: dict, timeout: float = None) -> dict:
+        """ Sends a request to the gateway and waits for its reply. A reply that does not come in time, or a lost
+        connection, is returned as status 504 or 503."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                return dict(status=503)
+            message['id'] = next(self._ids)
+            self._pending[message['id']] = future
+            try:
+                self._file.write(json.dumps(message).encode() + b'\n')
+                self._file.flush()
+            except OSError:
+                del self._pending[message['id']]
+                return dict(status=503)
+        try:
+            return future.result(self.timeout if timeout is None else timeout)
+        except TimeoutError:
+            return dict(status=504)
+        finally:
+            with self._lock:
+                self._pending.pop(message['id'], None)
+
+    def _read(self):
+        try:
+            for line in self._file:
+                message = json.loads(line)
+                url = message.get('push')
+                if url is not None:
+                    module = self._watched.get(url)
+                    if module is not None:
+                        try:
+                            module._store_hardware_read(message['image'], read_time=message['read_time'])
+                        except Exception as ex:
+                            # raised by a subscription callback, which must not end the connection
+                            self._report(ex)
+                    continue
+                with self._lock:
+                    future = self._pending.get(message.get('id'))
+                if future is not None:
+                    future.set_result(message)
+        except (OSError, ValueError):
+            pass
+        with self._lock:
+            self._closed = True
+            pending, self._pending = self._pending, dict()
+        for future in pending.values():
+            future.set_result(dict(status=503))
+
+    def _report(self, error: Exception):
+        self.push_errors += 1
+        self.last_error = error
+        if self.on_error is not None:
+            try:
+                self.on_error(self, error)
+            except Exception as ex:
+                # nor may the callback: its error (in the context of the one reported) is kept instead
+                self.last_error = ex
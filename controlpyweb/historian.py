@@ -0,0 +1,249 @@
+"""
+Module Historian
+The Historian keeps a bounded, in-memory history of the analog and discrete tags of a module, for trending. Every
+poll is recorded, stamped with the module's last_hardware_read_time, as one row of a fixed-size NumPy ring buffer
+holding a column per tag, so the memory used is set when the historian is attached and does not grow with the run.
+
+Polls are also rolled up into coarser resolutions (by default one minute buckets), each keeping the min, max and
+mean of every tag over its interval in a ring buffer of its own. Queries over a long span can then be answered from
+the coarse history, long after the raw polls have been overwritten.
+
+NumPy is needed for the historian only; the rest of the library does not depend on it.
+
+    historian = Historian(capacity=3600, resolutions=((60, 24 * 60),))
+    module.attach_historian(historian)
+    ...
+    times, values = historian.window('temperature1', start=time.time() - 600)
+    historian.stats('temperature1', resolution=60)
+"""
+
+import threading
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+MEAN = 'mean'
+MIN = 'min'
+MAX = 'max'
+
+_REDUCERS = {MEAN: np.add, MIN: np.minimum, MAX: np.maximum}
+
+
+class RingBuffer:
+    """ A fixed number of timestamped rows, each a value per column, overwriting the oldest row once full"""
+
+    def __init__(self, capacity: int, width: int):
+        if capacity < 1:
+            raise ValueError("The capacity of a ring buffer must be at least 1.")
+        self.times = np.full(capacity, np.nan)
+        self.values = np.full((capacity, width), np.nan)
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def capacity(self) -> int:
+        return len(self.times)
+
+    @property
+    def nbytes(self) -> int:
+        return self.times.nbytes + self.values.nbytes
+
+    def append(self, timestamp: float, row: np.ndarray):
+        self.times[self._next] = timestamp
+        self.values[self._next] = row
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def ordered(self) -> Tuple[np.ndarray, np.ndarray]:
+        """ Returns the times and rows held, oldest first"""
+        if self._count < self.capacity:
+            return self.times[:self._count], self.values[:self._count]
+        order = np.r_[self._next:self.capacity, 0:self._next]
+        return self.times[order], self.values[order]
+
+    def window(self, start: float = None, end: float = None) -> Tuple[np.ndarray, np.ndarray]:
+        """ Returns the times and rows with start <= time <= end, oldest first"""
+        times, values = self.ordered()
+        lo = 0 if start is None else np.searchsorted(times, start, side='left')
+        hi = len(times) if end is None else np.searchsorted(times, end, side='right')
+        return times[lo:hi], values[lo:hi]
+
+
+class _Resolution:
+    """ Rolls the polls up into buckets of a fixed interval, keeping the mean, min, max and count of every column"""
+
+    def __init__(self, interval: float, capacity: int, width: int):
+        self.interval = float(interval)
+        self.mean = RingBuffer(capacity, width)
+        self.min = RingBuffer(capacity, width)
+        self.max = RingBuffer(capacity, width)
+        self.count = RingBuffer(capacity, width)
+        self._bucket = None         # type: Optional[float]
+        self._sum = np.zeros(width)
+        self._min = np.full(width, np.inf)
+        self._max = np.full(width, -np.inf)
+        self._count = np.zeros(width)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(ring.nbytes for ring in (self.mean, self.min, self.max, self.count)) + 4 * self._sum.nbytes
+
+    def add(self, timestamp: float, row: np.ndarray):
+        bucket = timestamp - timestamp % self.interval
+        if self._bucket is not None and bucket != self._bucket:
+            self.flush()
+        self._bucket = bucket
+        valid = ~np.isnan(row)
+        self._sum[valid] += row[valid]
+        np.minimum(self._min, row, out=self._min, where=valid)
+        np.maximum(self._max, row, out=self._max, where=valid)
+        self._count += valid
+
+    def flush(self):
+        """ Closes the current bucket, moving its figures into the ring buffers"""
+        if self._bucket is None:
+            return
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = self._sum / self._count
+        empty = self._count == 0
+        self.mean.append(self._bucket, mean)
+        self.min.append(self._bucket, np.where(empty, np.nan, self._min))
+        self.max.append(self._bucket, np.where(empty, np.nan, self._max))
+        self.count.append(self._bucket, self._count)
+        self._bucket = None
+        self._sum[:] = 0.0
+        self._min[:] = np.inf
+        self._max[:] = -np.inf
+        self._count[:] = 0.0
+
+
+class Historian:
+
+    def __init__(self, capacity: int = 3600, resolutions: Sequence[Tuple[float, int]] = ((60.0, 1440),)):
+        """
+        :param capacity: The number of raw polls kept.
+        :param resolutions: The (interval in seconds, number of buckets kept) of each coarser history.
+        """
+        self.capacity = capacity
+        self.resolutions = tuple((float(interval), int(size)) for interval, size in resolutions)
+        self.addresses = ()         # type: Tuple[str, ...]
+        self._columns = dict()      # type: Dict[str, int]
+        self._raw = None            # type: Optional[RingBuffer]
+        self._levels = dict()       # type: Dict[float, _Resolution]
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        """ The memory held by the history, in bytes, which is fixed once the addresses are set"""
+        if self._raw is None:
+            return 0
+        return self._raw.nbytes + sum(level.nbytes for level in self._levels.values())
+
+    def set_addresses(self, addresses: Iterable[str]):
+        """ Sets the addresses recorded, allocating the history (any history already recorded is dropped)"""
+        with self._lock:
+            self.addresses = tuple(addresses)
+            self._columns = {addr: i for i, addr in enumerate(self.addresses)}
+            self._raw = RingBuffer(self.capacity, len(self.addresses))
+            self._levels = {interval: _Resolution(interval, size, len(self.addresses))
+                            for interval, size in self.resolutions}
+
+    def record(self, timestamp: float, image):
+        """ Records a poll. The image is anything with a get(addr, default) method returning the typed values,
+        such as the typed image of a module; values that are missing or not numeric are recorded as NaN."""
+        if self._raw is None or timestamp is None:
+            return
+        row = np.array([_number(image.get(addr, None)) for addr in self.addresses], dtype=float)
+        with self._lock:
+            self._raw.append(timestamp, row)
+            for level in self._levels.values():
+                level.add(timestamp, row)
+
+    def _column(self, addr: str) -> int:
+        try:
+            return self._columns[addr]
+        except KeyError:
+            raise KeyError("{} is not recorded by the historian.".format(addr)) from None
+
+    def _source(self, resolution: Optional[float], kind: str = MEAN) -> RingBuffer:
+        if resolution is None:
+            return self._raw
+        try:
+            level = self._levels[float(resolution)]
+        except KeyError:
+            raise ValueError("No history is kept at a resolution of {}s.".format(resolution)) from None
+        return getattr(level, kind)
+
+    def last(self, addr: str, n: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """ Returns the times and values of the last n polls of the address, oldest first"""
+        column = self._column(addr)
+        with self._lock:
+            times, values = self._raw.ordered()
+            return times[-n:].copy(), values[-n:, column].copy()
+
+    def window(self, addr: str, start: float = None, end: float = None, resolution: float = None,
+               kind: str = MEAN) -> Tuple[np.ndarray, np.ndarray]:
+        """ Returns the times and values of the address between start and end (inclusive, either may be None).
+        With a resolution, the buckets of that history are returned instead of the raw polls, the kind (MEAN, MIN
+        or MAX) choosing which of their figures."""
+        column = self._column(addr)
+        with self._lock:
+            times, values = self._source(resolution, kind).window(start, end)
+            return times.copy(), values[:, column].copy()
+
+    def stats(self, addr: str, start: float = None, end: float = None, resolution: float = None) -> dict:
+        """ Returns the min, max, mean and count of the values of the address between start and end, from the raw
+        polls or the history of the given resolution. NaN values (missing polls) are left out."""
+        column = self._column(addr)
+        with self._lock:
+            if resolution is None:
+                values = self._raw.window(start, end)[1][:, column]
+                values = values[~np.isnan(values)]
+                count, total = len(values), values.sum()
+                low, high = (values.min(), values.max()) if count else (np.nan, np.nan)
+            else:
+                low = np.nanmin(self._source(resolution, MIN).window(start, end)[1][:, column], initial=np.inf)
+                high = np.nanmax(self._source(resolution, MAX).window(start, end)[1][:, column], initial=-np.inf)
+                means = self._source(resolution, MEAN).window(start, end)[1][:, column]
+                counts = self._source(resolution, 'count').window(start, end)[1][:, column]
+                count = int(counts.sum())
+                total = np.nansum(means * counts)
+                low, high = (low, high) if count else (np.nan, np.nan)
+        return dict(min=float(low), max=float(high), mean=float(total / count) if count else float('nan'),
+                    count=int(count))
+
+    def resample(self, addr: str, interval: float, start: float = None, end: float = None, how: str = MEAN,
+                 resolution: float = None) -> Tuple[np.ndarray, np.ndarray]:
+        """ Buckets the values of the address into fixed intervals (aligned to multiples of the interval),
+        returning the start time of each bucket that holds a value along with the MEAN, MIN or MAX of its values"""
+        if how not in _REDUCERS:
+            raise ValueError("Unknown aggregate {}.".format(how))
+        times, values = self.window(addr, start, end, resolution, how if resolution is not None else MEAN)
+        valid = ~np.isnan(values)
+        times, values = times[valid], values[valid]
+        if len(times) == 0:
+            return times, values
+        buckets = times - times % interval
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        result = _REDUCERS[how].reduceat(values, starts)
+        if how == MEAN:
+            result = result / np.diff(np.r_[starts, len(values)])
+        return buckets[starts], result
+
+    def flush(self):
+        """ Closes the open bucket of every resolution, so that it can be queried"""
+        with self._lock:
+            for level in self._levels.values():
+                level.flush()
+
+
+def _number(value) -> float:
+    if value is None:
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
@@ -4,12 +4,15 @@ The classes within this module, AnalogIn and AnalogOut represent analog IO or re
 provide specific implementation details for dealing with each.
 """
 
+from controlpyweb import tag_image
 from controlpyweb.io_definitions.single_io import SingleIO
 from controlpyweb.io_definitions.io_out import IOOut
 from controlpyweb.abstract_reader_writer import AbstractReaderWriter
 
 
 class AnalogIn(SingleIO):
+    __slots__ = ()
+    _kind = tag_image.ANALOG
     def __init__(self, name: str, addr: str, default: float = 0.0,
                  reader: AbstractReaderWriter = None, *args, **kwargs):
         super().__init__(name, addr, default, reader, *args, **kwargs)
@@ -18,6 +21,10 @@ class AnalogIn(SingleIO):
     def _convert_type(value):
         return float(value)
 
+    @classmethod
+    def _converter(cls):
+        return float
+
     def __mod__(self, other):
         if hasattr(other, 'value'):
             other = other.value
@@ -25,9 +32,27 @@ class AnalogIn(SingleIO):
 
 
 class AnalogOut(IOOut, AnalogIn):
+    __slots__ = ('deadband', 'deadband_pct')
     def __init__(self, name: str, addr: str, default: float = 0.0,
                  reader: AbstractReaderWriter = None, *args, **kwargs):
+        """
+        :param kwargs: Those of IOOut, and deadband (absolute) and deadband_pct (a percentage of the value the
+        output has), which skip writes that change the value by no more than the deadband.
+        """
         super().__init__(name, addr, default, reader, *args, **kwargs)
+        self.deadband = kwargs.get('deadband')
+        self.deadband_pct = kwargs.get('deadband_pct')
+
+    def _within_deadband(self, value, current) -> bool:
+        if self.deadband is None and self.deadband_pct is None:
+            return False
+        try:
+            change = abs(value - current)
+        except TypeError:
+            return False
+        if self.deadband is not None and change <= self.deadband:
+            return True
+        return self.deadband_pct is not None and change <= abs(current) * self.deadband_pct / 100.0
 
     @staticmethod
     def _convert_type(value):
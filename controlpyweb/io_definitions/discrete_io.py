@@ -4,6 +4,7 @@ The classes within this module, DiscreteIn and Discrete represent digital inputs
 provide specific implementation details for dealing with each.
 """
 
+from controlpyweb import tag_image
 from controlpyweb.io_definitions.single_io import SingleIO
 from controlpyweb.io_definitions.io_out import IOOut
 from controlpyweb.abstract_reader_writer import AbstractReaderWriter
@@ -11,6 +12,8 @@ from str2bool import str2bool
 
 
 class DiscreteIn(SingleIO):
+    __slots__ = ()
+    _kind = tag_image.DISCRETE
     def __init__(self, name: str, addr: str, default: bool = False,
                  reader: AbstractReaderWriter = None, *args, **kwargs):
         super().__init__(name, addr, default, reader, *args, **kwargs)
@@ -21,11 +24,22 @@ class DiscreteIn(SingleIO):
             return str2bool(value)
         return bool(value)
 
+    @classmethod
+    def _converter(cls):
+        known = {'0': False, '1': True, False: False, True: True}
+        convert = cls._convert_type
+
+        def converter(value):
+            result = known.get(value)
+            return convert(value) if result is None else result
+        return converter
+
     def __bool__(self):
         return bool(self.value)
 
 
 class DiscreteOut(IOOut, DiscreteIn):
+    __slots__ = ()
     def __init__(self, name: str, addr: str, default: bool = False,
                  reader: AbstractReaderWriter = None, *args, **kwargs):
         super().__init__(name, addr, default, reader, *args, **kwargs)
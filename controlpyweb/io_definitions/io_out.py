@@ -6,26 +6,67 @@ The IOOut class provides implementation specific to analog and discrete outputs.
 from controlpyweb.io_definitions.single_io import SingleIO
 from controlpyweb.abstract_reader_writer import AbstractReaderWriter
 from abc import ABC
+import time
+
+_UNREAD = object()
 
 
 class IOOut(SingleIO, ABC):
+    __slots__ = ('ignore_duplicate_writes', 'min_interval', 'refresh_interval', '_last_write_time')
 
     def __init__(self, name: str, addr: str, default, reader: AbstractReaderWriter = None, *args, **kwargs):
+        """
+        :param kwargs: ignore_duplicate_writes (default True) skips writes of the value the output already has
+        (analog outputs also take a deadband, see AnalogOut). min_interval is the least time between two writes, in
+        seconds, any write sooner being skipped; refresh_interval forces a write once the last one is older than
+        this, even of an unchanged value.
+        """
         super().__init__(name, addr, default, reader, *args, **kwargs)
         self.ignore_duplicate_writes = kwargs.get('ignore_duplicate_writes', True) if kwargs is not None else True
+        self.min_interval = kwargs.get('min_interval')
+        self.refresh_interval = kwargs.get('refresh_interval')
+        self._last_write_time = None
 
     def __set__(self, instance, value):
         if hasattr(value, 'value'):
             value = value.value
-        self.write(value)
+        self._bound_to(instance).write(value)
 
     def write(self, value):
         """ Stores the given value in a cache that will be written when the call to send hardware is made. """
-        if self.ignore_duplicate_writes and value == self.value:
+        if not self._should_write(value):
+            stats = getattr(self._reader_writer, 'write_stats', None)
+            if stats is not None:
+                stats.suppressed += 1
             return
         self._reader_writer.write(self.addr, self._convert_type(value))
 
+    def _should_write(self, value, current=_UNREAD) -> bool:
+        """ Whether the value is to be written, given the value the output has (which is read when not given)"""
+        if self.min_interval is None and self.refresh_interval is None:
+            return not self._is_duplicate(value, current)
+        now = time.monotonic()
+        last = self._last_write_time
+        refresh = self.refresh_interval is not None and (last is None or now - last >= self.refresh_interval)
+        if not refresh:
+            if self.min_interval is not None and last is not None and now - last < self.min_interval:
+                return False
+            if self._is_duplicate(value, current):
+                return False
+        self._last_write_time = now
+        return True
+
+    def _is_duplicate(self, value, current=_UNREAD) -> bool:
+        if not self.ignore_duplicate_writes:
+            return False
+        if current is _UNREAD:
+            current = self.value
+        return value == current or self._within_deadband(value, current)
+
+    def _within_deadband(self, value, current) -> bool:
+        return False
+
     def write_immediate(self, value):
         """ Immediately sends the value to the hardware. This method should be used sparingly given the round
-        trip time of appx 20ms."""
-        self._reader_writer.write_immediate(self.addr, self._convert_type(value))
\ No newline at end of file
+        trip time of appx 20ms. When the reader is asynchronous, the returned awaitable must be awaited."""
+        return self._reader_writer.write_immediate(self.addr, self._convert_type(value))
\ No newline at end of file
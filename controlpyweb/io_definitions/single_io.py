@@ -4,13 +4,25 @@ The SingleIO class provides a base for all IO type. It adds common functionality
 be inherited by all.
 """
 
+from controlpyweb import tag_image
 from controlpyweb.abstract_reader_writer import AbstractReaderWriter
+import inspect
 import threading
 from controlpyweb.errors import ControlPyWebReadOnlyError
 from abc import ABC, abstractmethod
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def _slot_names(cls) -> tuple:
+    """ Returns the names of all the slots of an IO class, including those of its bases"""
+    return tuple(name for klass in cls.__mro__ for name in getattr(klass, '__slots__', ())
+                 if name not in ('__dict__', '__weakref__'))
 
 
 class SingleIO(ABC):
+    __slots__ = ('units', 'name', 'addr', 'namespace', '_reader_writer', '_default', '_attr_name')
+    _kind = tag_image.OBJECT       # selects the storage of the typed value in the TagImage
 
     def __init__(self, name: str, addr: str, default: object, namespace: str = None,
                  reader: AbstractReaderWriter = None, *args, **kwargs):
@@ -20,6 +32,29 @@ class SingleIO(ABC):
         self.namespace = namespace
         self._reader_writer = reader
         self._default = default
+        self._attr_name = None      # the name of the attribute it is declared as, on a module
+
+    def __set_name__(self, owner, name):
+        self._attr_name = name
+
+    def bind(self, reader: AbstractReaderWriter) -> 'SingleIO':
+        """ Returns a copy of this IO that reads and writes through the given reader. Modules bind a copy of each
+        declared IO per instance, leaving the declaration (shared by all instances) untouched."""
+        cls = type(self)
+        bound = cls.__new__(cls)
+        for name in _slot_names(cls):
+            if hasattr(self, name):
+                setattr(bound, name, getattr(self, name))
+        if hasattr(self, '__dict__'):
+            bound.__dict__.update(self.__dict__)
+        bound._reader_writer = reader
+        return bound
+
+    def _bound_to(self, instance) -> 'SingleIO':
+        bound_io = getattr(instance, '_bound_io', None)
+        if bound_io is None:
+            return self
+        return bound_io.get(self._attr_name, self)
 
     def __and__(self, other):
         if hasattr(other, 'value'):
@@ -63,8 +98,13 @@ class SingleIO(ABC):
         return self.value <= other
 
     def __get__(self, instance, owner):
-        self.read()
-        return self
+        if instance is None:
+            return self
+        io = self._bound_to(instance)
+        # only the address is checked: the value is read (and its freshness checked) once, when it is asked for
+        if io._reader_writer is not None:
+            io._reader_writer._check_for_address(io.addr)
+        return io
 
     def __set__(self, obj, value):
         raise ControlPyWebReadOnlyError
@@ -107,7 +147,7 @@ class SingleIO(ABC):
         val = self.read()
         if val is None:
             return self._default
-        return self._convert_type(val)
+        return val
 
     @staticmethod
     @abstractmethod
@@ -116,6 +156,12 @@ class SingleIO(ABC):
         specif IO """
         pass
 
+    @classmethod
+    def _converter(cls):
+        """ Returns the callable used to convert raw values into the typed image. Derived classes may return a
+        faster equivalent of _convert_type."""
+        return cls._convert_type
+
     def read(self):
         """
         Retrieves the last value of the IO after reading from hardware or after last write.
@@ -123,20 +169,33 @@ class SingleIO(ABC):
         """
         if self._reader_writer is None:
             return None
-        val = self._reader_writer.read(self.addr)
-        val = self._convert_type(val)
-        return val
+        return self._reader_writer.read_value(self.addr, self._convert_type)
+
+    def subscribe(self, callback, edge: str = 'change', deadband: float = None):
+        """
+        Registers a callback, called as callback(addr, old, new) with the converted values, when a read from the
+        hardware changes this IO. The edge may be 'change', 'rising' or 'falling'. For analog IO, a deadband
+        suppresses changes smaller than it.
+        """
+        return self._reader_writer.subscribe(self.addr, callback, edge, deadband, self._converter())
 
     def read_immediate(self):
         """
         Makes an immediate call to the hardware to read the value. This method should be used sparingly as it
         generally takes in order of 20ms to do a read.
-        :return: Returns the latest value retrieved from hardware.
+        :return: Returns the latest value retrieved from hardware. When the reader is asynchronous, this is an
+        awaitable of that value.
         """
         val = self._reader_writer.read_immediate(self.addr)
+        if inspect.isawaitable(val):
+            return self._convert_awaited(val)
         val = self._convert_type(val)
         return val
 
+    async def _convert_awaited(self, awaitable):
+        """ Awaits an immediate read from an asynchronous reader and converts the result"""
+        return self._convert_type(await awaitable)
+
 
 
 
@@ -0,0 +1,68 @@
+"""
+Module JSON Backend
+Chooses the library used to decode the customState.json replies of the modules. orjson or ujson are used when
+installed, as both decode such documents markedly faster than the standard library, which remains the fallback.
+
+The Projection keeps only the addresses a module uses from a decoded image: those registered by its IO, those
+subscribed to, and the few read by serial_number, vin and time_of_read. The image held (and the previous image kept
+for change detection) then stays small however many fields the device reports.
+"""
+
+import json
+from typing import Callable, Dict, FrozenSet, Iterable, Optional, Tuple
+
+# The addresses read by the WebIOContainer properties (serial_number, vin, time_of_read)
+COMMON_ADDRESSES = ('serialNumber', 'vin', 'utcTime')
+
+BACKENDS = ('orjson', 'ujson', 'json')
+
+
+def _import(name: str) -> Optional[Callable[[bytes], object]]:
+    try:
+        module = __import__(name)
+    except ImportError:
+        return None
+    return module.loads
+
+
+def get_loads(backend: str = 'auto') -> Tuple[str, Callable[[bytes], object]]:
+    """ Returns the name and the loads function of the backend. 'auto' picks the fastest one installed; naming a
+    backend that is not installed raises an ImportError."""
+    if backend == 'auto':
+        for name in BACKENDS:
+            loads = _import(name)
+            if loads is not None:
+                return name, loads
+    if backend not in BACKENDS:
+        raise ValueError("Unknown json backend {}, expected one of {}.".format(backend, ', '.join(BACKENDS)))
+    loads = _import(backend)
+    if loads is None:
+        raise ImportError("The json backend {} is not installed.".format(backend))
+    return backend, loads
+
+
+class Projection:
+
+    def __init__(self, extra: Iterable[str] = ()):
+        """
+        :param extra: Addresses kept besides those in use by the module.
+        """
+        self.extra = frozenset(extra).union(COMMON_ADDRESSES)
+        self._keys = None       # type: Optional[FrozenSet[str]]
+
+    @property
+    def keys(self) -> Optional[FrozenSet[str]]:
+        """ The addresses kept, None when they need to be set again"""
+        return self._keys
+
+    def update(self, addresses: Iterable[str]):
+        """ Sets the addresses in use by the module"""
+        self._keys = self.extra.union(addresses)
+
+    def invalidate(self):
+        """ Marks the addresses in use as changed, to be set again before the next image is projected"""
+        self._keys = None
+
+    def apply(self, vals: Dict[str, object]) -> Dict[str, object]:
+        keys = self._keys
+        return {addr: vals[addr] for addr in keys if addr in vals}
@@ -0,0 +1,203 @@
+"""
+Module Metrics
+ModuleMetrics records, per module, what its reader/writer does on the wire: the round trip time of reads and writes,
+the time spent decoding the json replies and their size, timeouts, connection and http errors, and the number of
+changes sent per flush. A reader/writer only keeps metrics when created with metrics=True; otherwise its metrics are
+None and the instrumentation costs a single attribute test per request.
+
+The figures are pulled with BaseReaderWriter.collect_metrics, or rendered for Prometheus (text exposition format) by
+prometheus_text, which MetricsServer serves over http.
+
+    server = MetricsServer([module1, module2], port=9100)
+    server.start()
+"""
+
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Upper bounds of the histogram buckets, in seconds for the timings and in changes for the flush sizes
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DECODE_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+CHANGES_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+COUNTERS = ('reads', 'writes', 'timeouts', 'connection_errors', 'http_errors', 'payload_bytes', 'flushes')
+HISTOGRAMS = ('read_seconds', 'write_seconds', 'decode_seconds', 'changes_per_flush')
+
+
+class Histogram:
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)      # the last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """ Returns the (upper bound, count of observations at or below it) of each bucket, ending with +Inf"""
+        result, total = [], 0
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def as_dict(self) -> dict:
+        return dict(count=self.count, sum=self.sum, mean=self.sum / self.count if self.count else None,
+                    buckets=self.cumulative())
+
+
+class ModuleMetrics:
+    """ The counters and histograms of a single module. The reader/writer records into them as requests complete,
+    from whichever thread made the request."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reads = 0                  # read requests (update_from_hardware, read_immediate, sync without changes)
+        self.writes = 0                 # write requests, including sync_with_hardware
+        self.timeouts = 0
+        self.connection_errors = 0      # failures to connect, other than timeouts
+        self.http_errors = 0            # replies with a non-2xx status
+        self.payload_bytes = 0          # size of the json replies decoded
+        self.flushes = 0                # send_changes_to_hardware / sync_with_hardware calls that sent changes
+        self.read_seconds = Histogram(LATENCY_BUCKETS)
+        self.write_seconds = Histogram(LATENCY_BUCKETS)
+        self.decode_seconds = Histogram(DECODE_BUCKETS)
+        self.changes_per_flush = Histogram(CHANGES_BUCKETS)
+
+    def record_request(self, write: bool, seconds: float):
+        with self._lock:
+            if write:
+                self.writes += 1
+                self.write_seconds.observe(seconds)
+            else:
+                self.reads += 1
+                self.read_seconds.observe(seconds)
+
+    def record_error(self, timeout: bool = False, http: bool = False):
+        with self._lock:
+            if timeout:
+                self.timeouts += 1
+            elif http:
+                self.http_errors += 1
+            else:
+                self.connection_errors += 1
+
+    def record_decode(self, seconds: float, size: int):
+        with self._lock:
+            self.payload_bytes += size
+            self.decode_seconds.observe(seconds)
+
+    def record_flush(self, changes: int):
+        with self._lock:
+            self.flushes += 1
+            self.changes_per_flush.observe(changes)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            result = {name: getattr(self, name) for name in COUNTERS}
+            result.update({name: getattr(self, name).as_dict() for name in HISTOGRAMS})
+        return result
+
+
+def _labels(**labels) -> str:
+    escaped = ('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+               for k, v in labels.items())
+    return '{' + ','.join(escaped) + '}'
+
+
+def _bound(bound: float) -> str:
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+def prometheus_text(readers: Iterable, prefix: str = 'controlpyweb') -> str:
+    """ Renders the metrics of the given reader/writers in the Prometheus text exposition format, labelled by the
+    url of each module. Readers created without metrics only report the age of their image and their circuit."""
+    families = dict()       # type: Dict[str, Tuple[str, List[str]]]
+
+    def add(family: str, kind: str, sample: str, labels: str, value):
+        families.setdefault(family, (kind, []))[1].append('{}{} {}'.format(sample, labels, value))
+
+    for reader in readers:
+        collected = reader.collect_metrics()
+        module = collected['module']
+        labels = _labels(module=module)
+        age = collected['image_age_seconds']
+        name = prefix + '_image_age_seconds'
+        add(name, 'gauge', name, labels, 'NaN' if age is None else age)
+        name = prefix + '_circuit_open'
+        add(name, 'gauge', name, labels, int(collected['circuit'] != 'closed'))
+        for counter in COUNTERS:
+            if counter in collected:
+                name = '{}_{}_total'.format(prefix, counter)
+                add(name, 'counter', name, labels, collected[counter])
+        for histogram in HISTOGRAMS:
+            if histogram not in collected:
+                continue
+            name, values = '{}_{}'.format(prefix, histogram), collected[histogram]
+            for bound, count in values['buckets']:
+                add(name, 'histogram', name + '_bucket', _labels(module=module, le=_bound(bound)), count)
+            add(name, 'histogram', name + '_sum', labels, values['sum'])
+            add(name, 'histogram', name + '_count', labels, values['count'])
+
+    lines = []
+    for name, (kind, samples) in families.items():
+        lines.append('# TYPE {} {}'.format(name, kind))
+        lines.extend(samples)
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+
+    def __init__(self, readers: Iterable, host: str = '0.0.0.0', port: int = 9100, prefix: str = 'controlpyweb'):
+        """
+        :param readers: The reader/writers (or a callable returning them) whose metrics are served at /metrics.
+        :param host: The interface to listen on.
+        :param port: The port to listen on, 0 to have one assigned.
+        """
+        source = readers if callable(readers) else (lambda: readers)     # type: Callable[[], Iterable]
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = prometheus_text(source(), prefix).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None         # type: Optional[threading.Thread]
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self):
+        """ Starts serving on a background thread"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), name='webio-metrics',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._thread = None
@@ -0,0 +1,115 @@
+"""
+Module Pinned Image
+A pinned image holds one version of the image of a module still for the length of a block, typically one scan of
+the control logic, so that every read in it comes from the same poll however many polls complete on other threads
+in the meantime.
+
+    with module.pinned():
+        if module.Level.value > module.HighLevel.value:     # both from the same poll, read without the lock
+            module.Pump = False                             # staged, and written with the others at the end
+    module.send_changes_to_hardware()
+
+Reads within the block are served from the pinned version without taking the lock of the module. Writes are staged,
+and written together (under a single acquisition of the lock) when the block ends, or dropped should it raise. When
+the module updates reads on write, the staged writes show up in the reads of the block as they are made.
+
+The module never changes a pinned version. Loading a new image swaps it in whole, and anything that would change
+the image in place (a write updating the reads, a derived value) copies it first, once for each version pinned
+(copy on write), so that pinning costs nothing but the reference to the version while no such change is made.
+
+Pins belong to the thread (or asyncio task) that made them. Immediate reads and writes go to the hardware as ever.
+"""
+
+import contextvars
+from typing import Callable, Dict, List, Optional, Sequence
+
+from controlpyweb.errors import ControlPyWebAddressNotFoundError
+
+_MISSING = object()
+
+# The images pinned in the current context, by module
+_PINNED = contextvars.ContextVar('controlpyweb_pinned', default=None)
+
+
+def pinned_image(module) -> Optional['PinnedImage']:
+    """ Returns the image of the module pinned in the current thread (or task), if any"""
+    pins = _PINNED.get()
+    return None if pins is None else pins.get(module)
+
+
+class PinnedImage:
+    """ The context returned by pinned. Entering it again in the same context (nested) uses the same version."""
+
+    def __init__(self, module):
+        self.module = module
+        self.io = None              # type: Optional[dict]
+        self.typed = None
+        self.first_read = False
+        self.read_time = None       # type: Optional[float]
+        self.writes = dict()        # type: Dict[str, object]
+        self._outer = None          # type: Optional[PinnedImage]
+        self._token = None
+
+    def __enter__(self) -> 'PinnedImage':
+        outer = pinned_image(self.module)
+        if outer is not None:
+            self._outer = outer
+            return outer
+        self.module._pin(self)
+        pins = _PINNED.get()
+        pins = dict() if pins is None else dict(pins)
+        pins[self.module] = self
+        self._token = _PINNED.set(pins)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._outer is not None:
+            self._outer = None
+            return
+        _PINNED.reset(self._token)
+        self._token = None
+        writes, self.writes = self.writes, dict()
+        self.module._unpin(writes if exc_type is None else None)
+
+    def _check_for_address(self, addr: str):
+        if self.module.demand_address_exists and self.first_read and addr not in self.io \
+                and addr not in self.writes:
+            raise ControlPyWebAddressNotFoundError(addr)
+
+    def read(self, addr: str):
+        if not self.first_read:
+            return None
+        self._check_for_address(addr)
+        if self.module.update_reads_on_write:
+            val = self.writes.get(addr, _MISSING)
+            if val is not _MISSING:
+                return val
+        return self.io.get(addr)
+
+    def read_value(self, addr: str, converter: Optional[Callable[[object], object]]) -> object:
+        """ As read_value of the module, returning the raw value of an address that is neither registered nor
+        given a converter"""
+        if not (self.module.update_reads_on_write and addr in self.writes):
+            val = self.typed.get(addr, _MISSING)
+            if val is not _MISSING:
+                return val
+        val = self.read(addr)
+        return None if val is None or converter is None else converter(val)
+
+    def read_many(self, addrs: Sequence[str], converters: Sequence[Callable[[object], object]] = None) \
+            -> List[object]:
+        if not self.first_read:
+            return [None] * len(addrs)
+        for addr in addrs:
+            self._check_for_address(addr)
+        if converters is None:
+            return [self.read_value(addr, None) for addr in addrs]
+        return [self.read_value(addr, converter) for addr, converter in zip(addrs, converters)]
+
+    def write(self, addr: str, value: object):
+        """ Stages a write, to be made when the block ends"""
+        if addr in self.writes:
+            stats = self.module.write_stats
+            stats.writes += 1
+            stats.coalesced += 1
+        self.writes[addr] = value
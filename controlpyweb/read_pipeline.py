@@ -0,0 +1,108 @@
+"""
+Module Read Pipeline
+The pieces used by the reader/writers to keep immediate reads of a module under control:
+ - SingleFlight shares one request between the read_immediate calls made on a module while it is in flight, as each
+   would otherwise fetch the whole image of the module just to return a single value from it.
+ - AsyncSingleFlight does the same for the coroutines of an AsyncReaderWriter.
+ - ReadStats counts what the pipeline did, including how many reads shared a request or reused a recent image,
+   and how many found the image older than their max_age.
+"""
+
+import asyncio
+import threading
+from typing import Awaitable, Callable, Optional, Tuple
+
+
+class ReadStats:
+    __slots__ = ('immediate_reads', 'immediate_requests', 'immediate_shared', 'immediate_reused', 'refreshes',
+                 'stale_reads')
+
+    def __init__(self):
+        self.immediate_reads = 0        # calls to read_immediate
+        self.immediate_requests = 0     # requests made for them (and for refreshes)
+        self.immediate_shared = 0       # calls that shared a request already in flight
+        self.immediate_reused = 0       # calls served from an image read within the freshness window
+        self.refreshes = 0              # calls to refresh, by reads finding the image too old or a Refresher
+        self.stale_reads = 0            # reads that found the image too old, and could not refresh it in time
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = False
+        self.result = None
+        self.error = None       # type: Optional[BaseException]
+
+
+class SingleFlight:
+    """ The first caller to find no request in flight makes it; callers arriving while it is in flight wait for it
+    and receive its result (or its error) as well.
+    The fetch returns its result along with a callable (or None), which the caller that made the request calls once
+    the request is no longer in flight. Anything that may itself make a request, such as calling back the subscribers
+    of the module, is done there, so that it never waits on its own request."""
+
+    def __init__(self, fetch: Callable[..., Tuple[object, Optional[Callable[[], None]]]], stats: ReadStats = None):
+        self._fetch = fetch
+        self._stats = stats if stats is not None else ReadStats()
+        self._cond = threading.Condition()
+        self._flight = None     # type: Optional[_Flight]
+
+    def get(self, *args):
+        """ Returns the result of the request in flight, or of a new one made with the arguments given"""
+        with self._cond:
+            flight = self._flight
+            leader = flight is None
+            if leader:
+                flight = self._flight = _Flight()
+                self._stats.immediate_requests += 1
+            else:
+                self._stats.immediate_shared += 1
+        if leader:
+            landed = None
+            try:
+                flight.result, landed = self._fetch(*args)
+            except BaseException as ex:
+                flight.error = ex
+            with self._cond:
+                flight.done = True
+                self._flight = None
+                self._cond.notify_all()
+            if landed is not None:
+                landed()
+        else:
+            with self._cond:
+                while not flight.done:
+                    self._cond.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+
+class AsyncSingleFlight:
+    """ SingleFlight for coroutines. The request runs as a task of its own, so that a caller being cancelled does
+    not cancel it for the others."""
+
+    def __init__(self, fetch: Callable[..., Awaitable[object]], stats: ReadStats = None):
+        self._fetch = fetch
+        self._stats = stats if stats is not None else ReadStats()
+        self._flight = None     # type: Optional[asyncio.Future]
+
+    async def get(self, *args):
+        flight = self._flight
+        if flight is None:
+            flight = self._flight = asyncio.ensure_future(self._fetch(*args))
+            flight.add_done_callback(self._landed)
+            self._stats.immediate_requests += 1
+        else:
+            self._stats.immediate_shared += 1
+        return await asyncio.shield(flight)
+
+    def _landed(self, flight: asyncio.Future):
+        if self._flight is flight:
+            self._flight = None
+        if not flight.cancelled():
+            flight.exception()      # retrieved, so an error no one awaited is not reported as never retrieved
@@ -2,26 +2,72 @@
 Module Reader Writer
 This module provide the ReaderWriter class as a concrete implemenation of the AbstractReaderWriter. It handles
 the implementation details of interfacing with the hardware.
+
+The in-memory image, the pending changes and their locking live in BaseReaderWriter so that they can be shared with
+other transports, such as the AsyncReaderWriter.
 """
 
 from controlpyweb.abstract_reader_writer import AbstractReaderWriter
 import requests
 import json
-from typing import Union, Optional, List
+from typing import Callable, Dict, Union, Optional, List, Sequence, Tuple
+from abc import ABC
 import time
 import threading
 
 
-from controlpyweb.errors import ControlPyWebAddressNotFoundError, WebIOConnectionError
+from controlpyweb import snapshot, tag_image
+from controlpyweb.circuit_breaker import CircuitBreaker
+from controlpyweb.errors import ControlPyWebAddressNotFoundError, ControlPyWebSnapshotError, WebIOCircuitOpenError, \
+    WebIOConnectionError, WebIOStaleImageError
+from controlpyweb.json_backend import Projection, get_loads
+from controlpyweb.metrics import ModuleMetrics
+from controlpyweb.pinned_image import PinnedImage, pinned_image
+from controlpyweb.read_pipeline import ReadStats, SingleFlight
+from controlpyweb.subscriptions import ON_CHANGE, Callback, Subscription, SubscriptionTable
+from controlpyweb.tag_image import DictTagImage, TagImage
+from controlpyweb.write_pipeline import ImmediateWriteBatcher, RateLimiter, WriteStats, split_changes
 
-lock = threading.Lock()
+_MISSING = object()
 
-class ReaderWriter(AbstractReaderWriter):
+DICT = 'dict'
+TUPLE = 'tuple'
+ARRAY = 'array'
 
-    def __init__(self, url: str, demand_address_exists: bool = True, timeout: float = 10.0,
-                 keep_alive: bool = True, **kwargs):
+
+def shape_values(keys: Sequence, values: List[object], into: str = DICT):
+    """ Returns the values read in bulk as a dictionary by key, a tuple, or a NumPy array of floats (with NaN for
+    the values that are None, and requiring numpy)"""
+    if into == DICT:
+        return dict(zip(keys, values))
+    if into == TUPLE:
+        return tuple(values)
+    if into == ARRAY:
+        import numpy as np
+        return np.array([np.nan if value is None else value for value in values], dtype=float)
+    raise ValueError("Unknown result type {}, expected one of {}, {} or {}.".format(into, DICT, TUPLE, ARRAY))
+
+
+class BaseReaderWriter(AbstractReaderWriter, ABC):
+
+    def __init__(self, url: str, demand_address_exists: bool = True, timeout: float = 10.0, **kwargs):
         """
         :param url: The address of the IO Base module from/to which IO is written
+        :param kwargs: update_reads_on_write, to have writes show up in reads before they are sent, and
+        compact_image, to keep the typed image in compact (array/bitset backed) storage for very large tag counts,
+        max_url_length, the longest request url used to send changes (larger sets of changes are split over
+        several requests), max_request_rate, the most write requests per second made to the module, and
+        failure_threshold (default 3), probe_backoff (default 1s) and max_probe_backoff (default 60s), which
+        configure the circuit breaker that makes requests to an unreachable module fail fast, metrics, to keep
+        the request timings and counters returned by collect_metrics, json_backend, the library used to decode the
+        replies ('auto', the default, picks the fastest installed, see json_backend), and project_reads, to keep
+        only the addresses in use by the module from each image read (True, or the other addresses to keep too),
+        and immediate_max_age, the age in seconds under which the image is recent enough to answer read_immediate
+        without a request (by default every call makes one, or shares one in flight), max_age, the oldest the
+        image may be for read and read_value to be served from it (see is_fresh), and serve_stale, to have reads
+        count an image that cannot be refreshed in time as a stale read and serve it anyway, rather than raise a
+        WebIOStaleImageError.
+        Note that with project_reads, read only finds the addresses that are kept.
         """
         url = 'http://{}'.format(url) if 'http' not in url else url
         url = '{}/customState.json'.format(url)
@@ -29,17 +75,118 @@ class ReaderWriter(AbstractReaderWriter):
         self._io = dict()
         self._previous_read_io = dict()
         self._changes = dict()
+        self._converters = dict()     # type: Dict[str, Callable[[object], object]]
+        # the registered addresses of _io, already converted
+        self._typed = TagImage() if kwargs.get('compact_image', False) else DictTagImage()
+        self._subscriptions = SubscriptionTable()
         self._first_read = False
         self._last_hardware_read_time = None            # type: time.time
-        self._req = requests if not keep_alive else requests.Session()
+        self._lock = threading.Lock()     # guards _io/_changes only, never held across an http call
+        self._pins = 0                    # the images pinned (see pinned), which must be copied before changed
+        self._image_pinned = False        # whether _io/_typed are those of a pinned image
         self.update_reads_on_write = bool(kwargs.get('update_reads_on_write', False))
+        self.max_url_length = kwargs.get('max_url_length', 2048)     # type: Optional[int]
+        self.write_stats = WriteStats()
+        self._rate_limiter = RateLimiter(kwargs.get('max_request_rate'))
+        self._breaker = CircuitBreaker(kwargs.get('failure_threshold', 3), kwargs.get('probe_backoff', 1.0),
+                                       kwargs.get('max_probe_backoff', 60.0))
+        self.metrics = ModuleMetrics() if kwargs.get('metrics', False) else None    # type: Optional[ModuleMetrics]
+        self.historian = None     # records every poll when attached, see the historian module
+        self.shared_image = None  # publishes every poll, or serves them to this module, see the shared_image module
+        self.read_stats = ReadStats()
+        self.immediate_max_age = kwargs.get('immediate_max_age', 0.0)     # type: float
+        self.max_age = kwargs.get('max_age')        # type: Optional[float]
+        self.serve_stale = bool(kwargs.get('serve_stale', False))
+        self.json_backend, self._loads = get_loads(kwargs.get('json_backend', 'auto'))
+        project = kwargs.get('project_reads', False)
+        self._projection = None if not project else Projection(() if project is True else project)
         self.demand_address_exists = demand_address_exists
         self.timeout = timeout
 
+    @property
+    def url(self) -> str:
+        """ The url of the state of the module (its customState.json)"""
+        return self._url
+
     @property
     def last_hardware_read_time(self):
         return self._last_hardware_read_time
 
+    @property
+    def image_age(self) -> Optional[float]:
+        """ The time since the image was last read from the hardware, in seconds, None if it never was"""
+        read_time = self._last_hardware_read_time
+        return None if read_time is None else time.time() - read_time
+
+    def collect_metrics(self) -> dict:
+        """ Returns the url of the module, the age of its image and the state of its circuit, along with the
+        counters and histograms of its metrics when they are kept"""
+        result = dict(module=self._url, image_age_seconds=self.image_age, circuit=self._breaker.state)
+        if self.metrics is not None:
+            result.update(self.metrics.as_dict())
+        return result
+
+    def _record_flush(self, changes: Optional[dict]):
+        if self.metrics is not None and changes is not None:
+            self.metrics.record_flush(len(changes))
+
+    @property
+    def is_stale(self) -> bool:
+        """ True while the module is unreachable (its circuit is not closed), meaning that reads are being served
+        from the last image that was read, however old it is"""
+        return not self._breaker.is_closed
+
+    @property
+    def health(self) -> dict:
+        """ Returns the state of the connection to the module"""
+        breaker = self._breaker
+        return dict(state=breaker.state, consecutive_failures=breaker.failures, retry_in=breaker.retry_in,
+                    times_opened=breaker.opened_count, last_error=breaker.last_error,
+                    last_success_time=breaker.last_success_time)
+
+    def is_fresh(self, max_age: float = None) -> bool:
+        """ True when the image was read from the hardware within max_age seconds (by default the max_age of the
+        module, without which any image that has been read is fresh)"""
+        max_age = self.max_age if max_age is None else max_age
+        read_time = self._last_hardware_read_time
+        if read_time is None:
+            return False
+        return max_age is None or time.time() - read_time <= max_age
+
+    def _ensure_fresh(self, max_age: float):
+        """ Refreshes an image older than max_age before it is read. Should it not be refreshed in time, the read
+        is counted as stale, and either served from the image (serve_stale) or refused."""
+        if self.is_fresh(max_age):
+            return
+        error = None
+        try:
+            if self._refresh_stale(max_age):
+                return
+        except WebIOConnectionError as ex:
+            error = ex
+        self.read_stats.stale_reads += 1
+        if not self.serve_stale:
+            raise WebIOStaleImageError(self._url, self.image_age) from error
+
+    def _refresh_stale(self, max_age: float) -> bool:
+        """ Refreshes the image for a read that found it older than max_age, returning whether it is now within
+        it. Transports that cannot refresh from within a read return False."""
+        return False
+
+    def _recent_image(self, max_age: Optional[float]) -> Optional[dict]:
+        """ Returns the image if it was read from the hardware within max_age seconds (immediate_max_age when
+        None), counting it as a reuse, otherwise None"""
+        max_age = self.immediate_max_age if max_age is None else max_age
+        self.read_stats.immediate_reads += 1
+        if not max_age:
+            return None
+        with self._lock:
+            read_time = self._last_hardware_read_time
+            if read_time is None or not self._first_read or time.time() - read_time > max_age:
+                return None
+            self.read_stats.immediate_reused += 1
+            return self._io
+
     def _check_for_address(self, addr: str):
         if not self.demand_address_exists:
             return
@@ -50,20 +197,190 @@ class ReaderWriter(AbstractReaderWriter):
         if addr not in self._io:
             raise ControlPyWebAddressNotFoundError(addr)
 
-    def _get(self, timeout: float = None) -> dict:
-        """ Does an http get and returns the results as key/value pairs"""
-        timeout = self.timeout if timeout is None else timeout
-        self._first_read = True
-        r = self._req.get(self._url, timeout=timeout)
-        r = None if r is None else r.json()
-        return r
-
     @staticmethod
     def _value_to_str(value):
         if isinstance(value, bool):
             value = '1' if value else '0'
         return str(value)
 
+    def _batches(self, changes: dict) -> List[dict]:
+        batches = list(split_changes(self._url, changes, self.max_url_length))
+        self.write_stats.batches += len(batches) - 1
+        return batches
+
+    def _items_to_write(self, addr: Union[str, List[str]], value: Union[object, List[object]]) -> dict:
+        """ Converts the address(es) and value(s) given to write_immediate into address/string pairs"""
+        if isinstance(addr, list):
+            if isinstance(value, list):
+                return {addr: self._value_to_str(val) for addr, val in zip(addr, value)}
+            value = self._value_to_str(value)
+            return {addr: value for addr in addr}
+        return {addr: self._value_to_str(value)}
+
+    def register_converter(self, addr: str, converter: Callable[[object], object], kind: str = tag_image.OBJECT):
+        """ Registers the conversion of an address, so that its value is converted once when the image is loaded
+        rather than on every read_value. The kind (see tag_image) selects the compact storage used for it."""
+        with self._lock:
+            self._own_image()
+            self._converters[addr] = converter
+            self._typed.add(addr, kind)
+            if self._projection is not None:
+                self._projection.invalidate()
+            if addr in self._io:
+                self._set_typed(addr, self._io[addr])
+
+    def register_derived(self, addr: str, kind: str = tag_image.ANALOG):
+        """ Registers an address whose typed value is derived in the process (by the analog processor, say) rather
+        than read from the hardware. It is served by read_value, and kept as it is when a new image is loaded."""
+        with self._lock:
+            self._own_image()
+            self._typed.add(addr, kind)
+
+    def _store_derived(self, addrs: List[str], values: List[object]):
+        with self._lock:
+            self._own_image()
+            self._typed.set_many(addrs, values)
+
+    def _own_image(self):
+        """ Copies the image, when it is pinned, before it is changed in place (copy on write)"""
+        if self._image_pinned:
+            self._io = dict(self._io)
+            self._typed = self._typed.copy()
+            self._image_pinned = False
+
+    def _set_typed(self, addr: str, value, typed=None):
+        converter = self._converters.get(addr)
+        if converter is None:
+            return
+        typed = self._typed if typed is None else typed
+        try:
+            typed.set(addr, converter(value))
+        except (TypeError, ValueError):
+            # Left for read_value to convert, so any error surfaces to the reader as it always has
+            typed.invalidate(addr)
+
+    def _load_typed(self, vals: dict):
+        """ Overwrites the typed image of the registered addresses from a raw image: in place, or into a copy
+        swapped in once loaded when the image is pinned"""
+        typed = self._typed.copy() if self._image_pinned else self._typed
+        for addr in self._converters:
+            if addr in vals:
+                self._set_typed(addr, vals[addr], typed)
+            else:
+                typed.invalidate(addr)
+        self._typed = typed
+        self._image_pinned = False
+
+    def _pending_changes(self) -> Optional[dict]:
+        """ Returns a copy of the changes to be sent, or None if there are none"""
+        with self._lock:
+            if self._changes is None or len(self._changes) == 0:
+                return None
+            return dict(self._changes)
+
+    def _discard_changes(self, changes: dict):
+        """ Removes the given changes (those sent, or superseded by a read), leaving any that were written (or
+        re-written) while the request was in flight so they go out with the next send."""
+        with self._lock:
+            self._discard_changes_locked(changes)
+
+    def _discard_changes_locked(self, changes: dict):
+        for addr, value in changes.items():
+            if self._changes.get(addr) == value:
+                del self._changes[addr]
+
+    def _store_hardware_read(self, vals: Optional[dict], discard: dict = None, read_time: float = None):
+        """ Swaps in the image returned by the hardware, then calls back the subscriptions whose value changed.
+        See _load_hardware_read for the parameters."""
+        events = self._load_hardware_read(vals, discard, read_time)
+        if events:
+            self._subscriptions.dispatch(events)
+
+    def _load_hardware_read(self, vals: Optional[dict], discard: dict = None, read_time: float = None) -> list:
+        """ Swaps in the image returned by the hardware, returning the subscription events to call back.
+        :param discard: The changes that are settled by this image. Any others still pending are laid over the
+        new image when reads are updated on write, so they are not lost from view before they are sent.
+        :param read_time: When the image was read, if not just now (as for one taken from a shared image).
+        """
+        events = None
+        with self._lock:
+            if discard:
+                self._discard_changes_locked(discard)
+            if vals is not None:
+                if self._projection is not None:
+                    vals = self._project(vals)
+                self._first_read = True
+                self._previous_read_io = self._io
+                if self.update_reads_on_write and len(self._changes) > 0:
+                    vals = dict(vals, **self._changes)
+                self._io = vals
+                self._load_typed(vals)
+                events = self._subscriptions.collect(vals)
+            self._last_hardware_read_time = time.time() if read_time is None else read_time
+            if self.historian is not None and vals is not None:
+                self.historian.record(self._last_hardware_read_time, self._typed)
+            if self.shared_image is not None and self.shared_image.publisher and vals is not None:
+                self.shared_image.publish(self._typed, vals, self._last_hardware_read_time)
+        return events
+
+    @property
+    def _reads_shared(self) -> bool:
+        """ True when attached to the shared image of another process, which then stands in for the hardware"""
+        return self.shared_image is not None and not self.shared_image.publisher
+
+    def _store_shared_read(self, discard: dict = None):
+        """ Stores the latest image published to the shared image, unless it has been stored already"""
+        sequence, read_time, vals = self.shared_image.read_raw()
+        if read_time is None or read_time == self._last_hardware_read_time:
+            if discard:
+                self._discard_changes(discard)
+            return
+        self._store_hardware_read(vals, discard, read_time)
+
+    def _project(self, vals: dict) -> dict:
+        if self._projection.keys is None:
+            self._projection.update(list(self._converters) + self._subscriptions.addresses())
+        return self._projection.apply(vals)
+
+    def _store_immediate_write(self, items: dict):
+        with self._lock:
+            self._own_image()
+            for addr, value in items.items():
+                self._io[addr] = value
+                self._set_typed(addr, value)
+
+    def subscribe(self, addr: str, callback: Callback, edge: str = ON_CHANGE, deadband: float = None,
+                  converter: Callable[[object], object] = None) -> Subscription:
+        """
+        Registers a callback, called as callback(addr, old, new) after a read from the hardware changes the value
+        of the address. See the subscriptions module for the meaning of the edge and deadband.
+        :param converter: Converts the raw value before it is compared, defaults to the registered converter.
+        :return: The subscription, which may be passed to unsubscribe.
+        """
+        with self._lock:
+            converter = self._converters.get(addr) if converter is None else converter
+            subscription = Subscription(addr, callback, edge, deadband, converter)
+            if self._first_read:
+                subscription.update(self._io.get(addr))
+            self._subscriptions.add(subscription)
+            if self._projection is not None:
+                self._projection.invalidate()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions.remove(subscription)
+            if self._projection is not None:
+                self._projection.invalidate()
+
+    def changed_since_last_read(self) -> dict:
+        """ Returns the addresses whose raw value differs between the last two reads from the hardware, each
+        with its (previous, current) value"""
+        with self._lock:
+            previous, current = self._previous_read_io, self._io
+            keys = previous.keys() | current.keys()
+            return {k: (previous.get(k), current.get(k)) for k in keys if previous.get(k) != current.get(k)}
+
     @property
     def changes(self):
         """Returns a dictionary of all changes made since the last read or write"""
@@ -71,7 +388,7 @@ class ReaderWriter(AbstractReaderWriter):
 
     def dumps(self, changes_only: bool = False):
         """Returns the current IO key/values as json string"""
-        with lock:
+        with self._lock:
             if changes_only:
                 if len(self._changes) == 0:
                     return ''
@@ -80,57 +397,369 @@ class ReaderWriter(AbstractReaderWriter):
 
     def flush_changes(self):
         """ Erases the collection of changes stored in memory"""
-        with lock:
+        with self._lock:
             self._changes = dict()
 
     def loads(self, json_str: str):
         """Replaces the current IO key/values with that from the json string"""
-        with lock:
+        vals = self._loads(json_str)
+        with self._lock:
+            self._first_read = True
+            self._io = vals
+            self._load_typed(vals)
+
+    def snapshot(self) -> bytes:
+        """ Returns a compact binary snapshot of the state of the module (see the snapshot module)"""
+        with self._lock:
+            return snapshot.encode(dict(url=self._url, module=type(self).__qualname__), self._io, self._changes,
+                                   self._typed.to_dict(), self._last_hardware_read_time)
+
+    def restore(self, data: bytes):
+        """ Restores the state of the module from a snapshot of it, taken by this or an earlier process. The
+        subscriptions take the restored values as those last seen, so only later changes are called back."""
+        state = snapshot.decode(data)
+        if state['identity'].get('url') != self._url:
+            raise ControlPyWebSnapshotError("The snapshot is of {}, not {}.".format(state['identity'].get('url'),
+                                                                                   self._url))
+        io, typed = state['io'], state['typed']
+        with self._lock:
+            self._own_image()
             self._first_read = True
-            self._io = json.loads(json_str)
+            self._previous_read_io = io
+            self._io = io
+            self._changes = state['changes']
+            self._load_typed({addr: value for addr, value in io.items() if addr not in typed})
+            for addr, value in typed.items():
+                self._typed.set(addr, value)
+            self._subscriptions.collect(io)
+            self._last_hardware_read_time = state['read_time']
 
-    def read(self, addr: str) -> Optional[Union[bool, int, float, str]]:
+    def pinned(self) -> PinnedImage:
+        """ Returns a context within which the reads of the module are served from the image as it is on entering
+        it, without locking, and its writes are staged to be written together on leaving it (see pinned_image)"""
+        return PinnedImage(self)
+
+    def _pin(self, pin: PinnedImage):
+        if self.max_age is not None:
+            self._ensure_fresh(self.max_age)
+        with self._lock:
+            if self._reads_shared:
+                # the typed values of a shared image change under it, so it is pinned as a copy
+                pin.io, pin.typed = dict(self._io), self._typed.copy()
+            else:
+                pin.io, pin.typed = self._io, self._typed
+                self._image_pinned = True
+            pin.first_read, pin.read_time = self._first_read, self._last_hardware_read_time
+            self._pins += 1
+
+    def _unpin(self, writes: Optional[dict]):
+        with self._lock:
+            self._pins -= 1
+            if self._pins == 0:
+                self._image_pinned = False
+        if writes:
+            self._write_many(writes)
+
+    def read(self, addr: str, max_age: float = None) -> Optional[Union[bool, int, float, str]]:
         """
         Returns the value of a single IO from the memory store
+        :param max_age: The oldest the image may be, in seconds, before it is refreshed for the read (defaults to
+        the max_age of the module).
         """
-        with lock:
+        if self._pins:
+            pin = pinned_image(self)
+            if pin is not None:
+                return pin.read(addr)
+        max_age = self.max_age if max_age is None else max_age
+        if max_age is not None:
+            self._ensure_fresh(max_age)
+        with self._lock:
             if not self._first_read:
                 return None
             self._check_for_address(addr)
             val = self._io.get(addr)
             return val
 
-    def read_immediate(self, addr: str, timeout: float = None) -> object:
+    def read_value(self, addr: str, converter: Callable[[object], object]) -> object:
         """
-        Makes a hardware call to the base module to retrieve the value of the IO. This is inefficient and should
-        be used sparingly.
+        Returns the converted value of a single IO from the memory store. Registered addresses are served from
+        the typed image without locking or converting, anything else is read and converted.
+        """
+        if self._pins:
+            pin = pinned_image(self)
+            if pin is not None:
+                return pin.read_value(addr, converter)
+        if self.max_age is not None:
+            self._ensure_fresh(self.max_age)
+        val = self._typed.get(addr, _MISSING)
+        if val is not _MISSING:
+            return val
+        val = self.read(addr)
+        return None if val is None else converter(val)
+
+    def _read_many(self, addrs: Sequence[str], converters: Sequence[Callable[[object], object]] = None,
+                   max_age: float = None) -> List[object]:
+        if self._pins:
+            pin = pinned_image(self)
+            if pin is not None:
+                return pin.read_many(addrs, converters)
+        max_age = self.max_age if max_age is None else max_age
+        if max_age is not None:
+            self._ensure_fresh(max_age)
+        get = self._typed.get
+        with self._lock:
+            if not self._first_read:
+                return [None] * len(addrs)
+            io = self._io
+            if self.demand_address_exists:
+                for addr in addrs:
+                    if addr not in io:
+                        raise ControlPyWebAddressNotFoundError(addr)
+            values = [get(addr, _MISSING) for addr in addrs]
+            for i, val in enumerate(values):
+                if val is _MISSING:
+                    val = io.get(addrs[i])
+                    if val is not None and converters is not None and converters[i] is not None:
+                        val = converters[i](val)
+                    values[i] = val
+            return values
+
+    def read_many(self, addrs: Sequence[str], converters: Sequence[Callable[[object], object]] = None,
+                  into: str = DICT, max_age: float = None):
+        """
+        Returns the values of many addresses from the memory store, under a single acquisition of the lock.
+        Registered addresses are served from the typed image, anything else is returned raw, or converted by the
+        converter at the same position, when one is given.
+        :param into: DICT (by address), TUPLE, or ARRAY (a NumPy array of floats).
+        :param max_age: As for read.
+        """
+        return shape_values(addrs, self._read_many(addrs, converters, max_age), into)
+
+    def write_many(self, items: Dict[str, object]) -> None:
+        """ Stores many write values in memory, under a single acquisition of the lock, to be written as part of
+        the group write when changes are sent to hardware"""
+        if self._pins:
+            pin = pinned_image(self)
+            if pin is not None:
+                for addr, value in items.items():
+                    pin.write(addr, value)
+                return
+        self._write_many(items)
+
+    def _write_many(self, items: Dict[str, object]):
+        to_str = {addr: self._value_to_str(value) for addr, value in items.items()}
+        with self._lock:
+            stats = self.write_stats
+            stats.writes += len(to_str)
+            for addr in to_str:
+                if addr in self._changes:
+                    stats.coalesced += 1
+            if self.update_reads_on_write:
+                self._own_image()
+                for addr, value in items.items():
+                    self._io[addr] = value
+                    self._set_typed(addr, value)
+            self._changes.update(to_str)
+
+    def write(self, addr: str, value: object) -> None:
+        """
+        Stores the write value in memory to be written as part of a group write when changes are sent to
+        hardware."""
+        if self._pins:
+            pin = pinned_image(self)
+            if pin is not None:
+                pin.write(addr, value)
+                return
+        to_str = self._value_to_str(value)
+        with self._lock:
+            self.write_stats.writes += 1
+            if addr in self._changes:
+                self.write_stats.coalesced += 1
+            if self.update_reads_on_write:
+                self._own_image()
+                self._io[addr] = value
+                self._set_typed(addr, value)
+            self._changes[addr] = to_str
+
+
+class ReaderWriter(BaseReaderWriter):
+
+    def __init__(self, url: str, demand_address_exists: bool = True, timeout: float = 10.0,
+                 keep_alive: bool = True, **kwargs):
         """
+        :param url: The address of the IO Base module from/to which IO is written
+        :param kwargs: Along with those of the BaseReaderWriter, background_probe: when set (the default), an
+        unreachable module is probed from a background thread while its circuit is open, so that no call made
+        by the application waits on it.
+        """
+        super().__init__(url, demand_address_exists, timeout, **kwargs)
+        self._req = requests if not keep_alive else requests.Session()
+        self._immediate = ImmediateWriteBatcher(self._send_immediate, self.write_stats)
+        self._immediate_read = SingleFlight(self._fetch_immediate, self.read_stats)
+        self._breaker.inline_probe = not kwargs.get('background_probe', True)
+        self._prober = None         # type: Optional[threading.Thread]
+        self._closed = threading.Event()
+
+    def close(self):
+        """ Stops any background probing and closes the connection to the module"""
+        self._closed.set()
+        if self._prober is not None and self._prober is not threading.current_thread():
+            self._prober.join()
+        if self._req is not requests:
+            self._req.close()
+
+    def _http_get(self, params: dict = None, timeout: float = None):
+        """ Makes a request of the module, through its circuit breaker"""
+        if not self._breaker.allow():
+            raise WebIOCircuitOpenError(self._url, self._breaker.retry_in)
         try:
-            self._check_for_address(addr)
-            timeout = self.timeout if timeout is None else timeout
-            vals = self._get(timeout=timeout)
-            if vals is None:
-                return None
-            return vals.get(addr)
-        except (requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout) as ex:
+            r = self._request(params, timeout)
+        except WebIOConnectionError:
+            raise       # recorded by _request
+        except BaseException as ex:
+            # an error of the session itself (say), which would otherwise leave a probe half open for good
+            self._breaker.record_failure(ex)
+            raise
+        self._breaker.record_success()
+        return r
+
+    def _request(self, params: dict = None, timeout: float = None):
+        """ Makes a request of the module, recording (and raising as a WebIOConnectionError) any failure, which
+        includes a reply with an error status"""
+        timeout = self.timeout if timeout is None else timeout
+        metrics = self.metrics
+        start = time.perf_counter() if metrics is not None else 0.0
+        try:
+            if params is None:
+                r = self._req.get(self._url, timeout=timeout)
+            else:
+                r = self._req.get(self._url, params=params, timeout=timeout)
+        except requests.exceptions.Timeout as ex:
+            self._record_failure(ex, timeout=True)
+            raise WebIOConnectionError(ex)
+        except requests.exceptions.RequestException as ex:
+            self._record_failure(ex)
             raise WebIOConnectionError(ex)
+        if not getattr(r, 'ok', True):
+            error = WebIOConnectionError('The module responded with http status {}'.format(r.status_code))
+            self._record_failure(error, http=True)
+            raise error
+        if metrics is not None:
+            metrics.record_request(params is not None, time.perf_counter() - start)
+        return r
+
+    def _record_failure(self, error: BaseException, timeout: bool = False, http: bool = False):
+        if self.metrics is not None:
+            self.metrics.record_error(timeout, http)
+        if self._breaker.record_failure(error) and not self._breaker.inline_probe:
+            self._start_prober()
+
+    def _decode(self, r) -> Optional[dict]:
+        """ Returns the json content of a reply as key/value pairs, decoded by the json backend, and timing the
+        decode when keeping metrics. A reply that cannot be decoded raises a WebIOConnectionError."""
+        if r is None:
+            return None
+        body = getattr(r, 'content', None)
+        try:
+            if not isinstance(body, bytes):
+                return r.json()
+            metrics = self.metrics
+            if metrics is None:
+                return self._loads(body)
+            start = time.perf_counter()
+            vals = self._loads(body)
+        except ValueError as ex:
+            raise WebIOConnectionError(ex)
+        metrics.record_decode(time.perf_counter() - start, len(body))
+        return vals
+
+    def _start_prober(self):
+        if self._prober is not None and self._prober.is_alive():
+            return
+        self._prober = threading.Thread(target=self._probe, name="webio-probe", daemon=True)
+        self._prober.start()
+
+    def _probe(self):
+        """ Probes the module while its circuit is open, storing the image read once it responds"""
+        while not self._breaker.is_closed:
+            if self._closed.wait(self._breaker.retry_in):
+                return
+            try:
+                r = self._request()
+            except WebIOConnectionError:
+                continue
+            try:
+                vals = self._decode(r)
+            except WebIOConnectionError as ex:
+                self._record_failure(ex)
+                continue
+            self._breaker.record_success()
+            self._store_hardware_read(vals, read_time=self._reply_time(r))
+
+    @staticmethod
+    def _reply_time(r) -> Optional[float]:
+        """ Returns the time the image in a reply was read when the reply gives it (as those of a gateway do),
+        otherwise None, for an image read just now"""
+        read_time = getattr(r, 'read_time', None)
+        return read_time if isinstance(read_time, float) else None
+
+    def read_immediate(self, addr: str, timeout: float = None, max_age: float = None) -> object:
+        """
+        Makes a hardware call to the base module to retrieve the value of the IO. This is inefficient and should
+        be used sparingly. Calls made concurrently from several threads share one request, whose image is stored
+        as the latest read.
+        :param max_age: Answers from the image instead, when it was read within this many seconds (defaults to
+        immediate_max_age).
+        """
+        self._check_for_address(addr)
+        vals = self._recent_image(max_age)
+        if vals is None:
+            vals = self._immediate_read.get(timeout)
+        if vals is None:
+            return None
+        return vals.get(addr)
+
+    def _fetch_immediate(self, timeout: float) -> Tuple[Optional[dict], Optional[Callable[[], None]]]:
+        r = self._http_get(timeout=timeout)
+        vals = self._decode(r)
+        events = self._load_hardware_read(vals, read_time=self._reply_time(r))
+        # the subscribers are called back once the request is no longer in flight, as they may read immediately
+        return vals, (lambda: self._subscriptions.dispatch(events)) if events else None
+
+    def refresh(self, timeout: float = None):
+        """ Reads the image from the hardware (or the shared image, when attached to one), sharing a request
+        already in flight. Unlike update_from_hardware, pending changes are kept."""
+        self.read_stats.refreshes += 1
+        if self._reads_shared:
+            self._store_shared_read()
+            return
+        self._immediate_read.get(timeout)
+
+    def _refresh_stale(self, max_age: float) -> bool:
+        self.refresh()
+        # a shared image whose publisher has stopped (say) refreshes to the same old image
+        return self.is_fresh(max_age)
 
     def to_hardware(self, timeout: float = None):
         """ Same as send_changes_to_hardware"""
         return self.send_changes_to_hardware(timeout)
 
+    def _write_request(self, params: dict, timeout: float):
+        """ Sends a write request once the rate limit allows"""
+        self.write_stats.throttled_time += self._rate_limiter.wait()
+        self.write_stats.requests += 1
+        return self._http_get(params, timeout)
+
     def send_changes_to_hardware(self, timeout: float = None):
         """ Takes the collection of changes made using the write command and
         sends them all to the hardware collectively. """
-        try:
-            with lock:
-                if self._changes is None or len(self._changes) == 0:
-                    return
-                timeout = self.timeout if timeout is None else timeout
-                self._req.get(self._url, params=self._changes, timeout=timeout)
-            self.flush_changes()
-        except (requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout) as ex:
-            raise WebIOConnectionError(ex)
+        changes = self._pending_changes()
+        if changes is None:
+            return
+        self._record_flush(changes)
+        for batch in self._batches(changes):
+            self._write_request(batch, timeout)
+            self._discard_changes(batch)
 
     def from_hardware(self, timeout: float = None):
         """ Same as update_from_hardware"""
@@ -139,49 +768,48 @@ class ReaderWriter(AbstractReaderWriter):
     def update_from_hardware(self, timeout: float = None):
         """Makes a hardware call to the base module to retrieve the value of all IOs, storing their
         results in memory."""
-        try:
-            timeout = self.timeout if timeout is None else timeout
-            with lock:
-                vals = self._get(timeout)
-                self._last_hardware_read_time = time.time()
-                if vals is not None:
-                    self._io = vals
-            self.flush_changes()
-        except (requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout) as ex:
-            raise WebIOConnectionError(ex)
+        pending = self._pending_changes()
+        if self._reads_shared:
+            self._store_shared_read(discard=pending)
+            return
+        r = self._http_get(timeout=timeout)
+        self._store_hardware_read(self._decode(r), pending, self._reply_time(r))
 
-    def write(self, addr: str, value: object) -> None:
-        """
-        Stores the write value in memory to be written as part of a group write when changes are sent to
-        hardware."""
-        with lock:
-            to_str = self._value_to_str(value)
-            if self.update_reads_on_write:
-                self._io[addr] = value
-            self._changes[addr] = to_str
+    def sync(self, timeout: float = None):
+        """ Same as sync_with_hardware"""
+        self.sync_with_hardware(timeout)
+
+    def sync_with_hardware(self, timeout: float = None):
+        """Sends the pending changes and stores the state the module returns in reply as the new image, doing
+        the work of send_changes_to_hardware and update_from_hardware in a single round trip. Changes written
+        while the request is in flight are kept for the next send."""
+        if self._reads_shared:
+            self.send_changes_to_hardware(timeout)
+            self._store_shared_read()
+            return
+        changes = self._pending_changes()
+        self._record_flush(changes)
+        batches = [None] if changes is None else self._batches(changes)
+        for batch in batches[:-1]:
+            self._write_request(batch, timeout)
+            self._discard_changes(batch)
+        if batches[-1] is None:
+            r = self._http_get(timeout=timeout)
+        else:
+            r = self._write_request(batches[-1], timeout)
+        self._store_hardware_read(self._decode(r), batches[-1], self._reply_time(r))
 
     def write_immediate(self, addr: Union[str, List[str]],
                         value: Union[object, List[object]], timeout: float = None):
         """
         Instead of waiting for a group write, writes the given value immediately. Note, this is not very efficient
-        and should be used sparingly. """
-
-        if isinstance(addr, list):
-            if isinstance(value, list):
-                items = {addr: self._value_to_str(val) for addr, val in zip(addr, value)}
-            else:
-                value = self._value_to_str(value)
-                items = {addr: value for addr in addr}
-        else:
-            items = {addr: self._value_to_str(value)}
-
-        try:
-            timeout = self.timeout if timeout is None else timeout
-            with lock:
-                self._req.get(self._url, params=items, timeout=timeout)
-                for addr, value in items.items():
-                    self._io[addr] = value
-        except (requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout) as ex:
-            raise WebIOConnectionError(ex)
-
+        and should be used sparingly. Calls made concurrently from several threads are merged into one request. """
+        items = self._items_to_write(addr, value)
+        if len(items) == 0:
+            return
+        self._immediate.write(items, timeout)
 
+    def _send_immediate(self, items: dict, timeout: float):
+        for batch in self._batches(items):
+            self._write_request(batch, timeout)
+            self._store_immediate_write(batch)
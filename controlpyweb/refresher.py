@@ -0,0 +1,119 @@
+"""
+Module Refresher
+The Refresher keeps the image of each module within its freshness budget (its max_age) from a background thread, so
+that reads are served from the image rather than waiting on a refresh of their own. A module is refreshed once a
+fraction (the margin) of its max_age has passed since it was last read, by whatever means: a module that is also
+scanned, or read immediately, is refreshed no more often than it needs to be.
+
+Refreshes keep the pending changes of a module, and share any request already in flight for it.
+
+    tank = Tank('192.168.1.10', max_age=2.0)
+    boiler = Boiler('192.168.1.11', max_age=10.0, serve_stale=True)
+    with Refresher([tank, boiler]):
+        ...
+        level = tank.Level.value        # never older than 2s, refreshed on the spot should the refresher fall behind
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from controlpyweb.reader_writer import ReaderWriter
+
+
+class Refresher:
+
+    def __init__(self, modules: Iterable[ReaderWriter], margin: float = 0.5, max_workers: int = 8,
+                 timeout: float = None):
+        """
+        :param modules: The modules kept fresh, each of which must have a max_age.
+        :param margin: The fraction (0-1) of its max_age after which a module is refreshed, leaving the rest of it
+        for the request to complete in.
+        :param max_workers: The upper bound on the number of refreshes in flight at once.
+        :param timeout: The timeout of each refresh, defaulting to the timeout of the module.
+        """
+        self.modules = list(modules)    # type: List[ReaderWriter]
+        for module in self.modules:
+            if module.max_age is None:
+                raise ValueError("{} has no max_age to keep it within.".format(module.url))
+        if not 0.0 < margin <= 1.0:
+            raise ValueError("The margin must be greater than 0 and at most 1.")
+        self.margin = margin
+        self.timeout = timeout
+        self.refreshes = 0
+        self.errors = 0
+        self._retry = dict()        # type: Dict[ReaderWriter, float]
+        self._max_workers = max(1, int(max_workers))
+        self._pool = None           # type: Optional[ThreadPoolExecutor]
+        self._stop = threading.Event()
+        self._thread = None         # type: Optional[threading.Thread]
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _budget(self, module: ReaderWriter) -> float:
+        return module.max_age * self.margin
+
+    def due(self, module: ReaderWriter) -> float:
+        """ Returns the time (as time.time) at which the module is next to be refreshed"""
+        read_time = module.last_hardware_read_time
+        due = 0.0 if read_time is None else read_time + self._budget(module)
+        return max(due, self._retry.get(module, 0.0))
+
+    def run_once(self) -> Dict[ReaderWriter, Optional[Exception]]:
+        """ Refreshes the modules that are due, concurrently. Returns a dictionary of each module refreshed to None
+        on success, or to the error that was raised (a WebIOConnectionError, when it could not be reached). A module
+        that failed is next tried once its budget has passed again."""
+        now = time.time()
+        due = [module for module in self.modules if self.due(module) <= now]
+        if len(due) == 0:
+            return dict()
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="webio-refresh")
+        futures = [(module, self._pool.submit(module.refresh, self.timeout)) for module in due]
+        results = dict()     # type: Dict[ReaderWriter, Optional[Exception]]
+        for module, future in futures:
+            try:
+                future.result()
+                results[module] = None
+                self._retry.pop(module, None)
+            except Exception as ex:
+                results[module] = ex
+                self._retry[module] = time.time() + self._budget(module)
+                self.errors += 1
+            self.refreshes += 1
+        return results
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_once()
+            delay = min(self.due(module) for module in self.modules) - time.time() if self.modules else 1.0
+            if self._stop.wait(max(0.001, delay)):
+                break
+
+    def start(self):
+        """ Starts refreshing on a background thread"""
+        if self.is_running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="webio-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        """ Stops refreshing, once the refreshes in flight complete"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
@@ -0,0 +1,185 @@
+"""
+Module Scan Scheduler
+The ScanScheduler runs the usual PLC style scan (update_from_hardware -> logic -> send_changes_to_hardware) at a
+fixed period. Cycles are released against monotonic deadlines, so the scan does not drift, and every cycle is timed
+so that overruns and jitter are visible through the ScanStatistics.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, Optional, Union
+
+from controlpyweb.reader_writer import ReaderWriter
+from controlpyweb.webio_module_group import GroupResult, WebIOModuleGroup
+
+OVERRUN_SKIP = 'skip'
+OVERRUN_COMPRESS = 'compress'
+
+PHASES = ('read', 'logic', 'write', 'cycle', 'jitter')
+
+
+class ScanStatistics:
+    """ Keeps the timings of the most recent cycles, and running counts over the life of the scheduler. All times
+    are in seconds."""
+
+    def __init__(self, history: int = 1000):
+        self._lock = threading.Lock()
+        self._samples = {phase: deque(maxlen=history) for phase in PHASES}     # type: Dict[str, deque]
+        self.cycles = 0
+        self.overruns = 0
+        self.skipped_cycles = 0
+        self.connection_errors = 0
+        self.errors = 0                 # cycles cut short by any other error
+        self.max_cycle_time = 0.0
+
+    def record(self, read: float, logic: float, write: float, jitter: float, overrun: bool):
+        cycle = read + logic + write
+        with self._lock:
+            for phase, value in zip(PHASES, (read, logic, write, cycle, jitter)):
+                self._samples[phase].append(value)
+            self.cycles += 1
+            self.overruns += int(overrun)
+            self.max_cycle_time = max(self.max_cycle_time, cycle)
+
+    def percentile(self, pct: float, phase: str = 'cycle') -> Optional[float]:
+        """ Returns the nearest-rank percentile (0-100) of the recent samples of the given phase, None when there
+        are no samples yet"""
+        with self._lock:
+            samples = sorted(self._samples[phase])
+        if len(samples) == 0:
+            return None
+        index = min(len(samples) - 1, max(0, math.ceil(pct / 100.0 * len(samples)) - 1))
+        return samples[index]
+
+    def mean(self, phase: str = 'cycle') -> Optional[float]:
+        with self._lock:
+            samples = list(self._samples[phase])
+        return sum(samples) / len(samples) if len(samples) > 0 else None
+
+    def summary(self) -> dict:
+        """ Returns the counters, along with the mean, p50, p99 and max of each phase"""
+        result = dict(cycles=self.cycles, overruns=self.overruns, skipped_cycles=self.skipped_cycles,
+                      connection_errors=self.connection_errors, errors=self.errors,
+                      max_cycle_time=self.max_cycle_time)
+        for phase in PHASES:
+            result[phase] = dict(mean=self.mean(phase), p50=self.percentile(50, phase),
+                                 p99=self.percentile(99, phase), max=self.percentile(100, phase))
+        return result
+
+
+class ScanScheduler:
+
+    def __init__(self, modules: Union[WebIOModuleGroup, Iterable[ReaderWriter]], period: float,
+                 logic: Callable[['ScanScheduler'], None] = None, overrun: str = OVERRUN_SKIP,
+                 max_catch_up: int = 3, history: int = 1000, timeout: float = None,
+                 on_error: Callable[['ScanScheduler', Exception], None] = None):
+        """
+        :param modules: A WebIOModuleGroup, or the modules to be scanned (which are then scanned concurrently).
+        :param period: The time between the start of each cycle, in seconds.
+        :param logic: Called with the scheduler between the read and write phase of each cycle.
+        :param overrun: What to do when a cycle runs past the start of the next one. OVERRUN_SKIP drops the
+        missed cycles and stays on the original schedule. OVERRUN_COMPRESS runs the missed cycles back to back
+        until caught up, skipping any beyond max_catch_up.
+        :param history: The number of recent cycles kept for the statistics.
+        :param timeout: The timeout of each hardware call, defaulting to the period.
+        :param on_error: Called with the scheduler and the error when a cycle raises anything other than a
+        connection error (from the logic, say), which is otherwise only counted and kept in last_error, as the
+        scan carries on with the next cycle.
+        """
+        if period <= 0:
+            raise ValueError("The scan period must be greater than zero.")
+        if overrun not in (OVERRUN_SKIP, OVERRUN_COMPRESS):
+            raise ValueError("Unknown overrun policy {}.".format(overrun))
+        self.group = modules if isinstance(modules, WebIOModuleGroup) else WebIOModuleGroup(modules)
+        self.period = period
+        self.logic = logic
+        self.overrun = overrun
+        self.max_catch_up = max(0, int(max_catch_up))
+        self.timeout = period if timeout is None else timeout
+        self.stats = ScanStatistics(history)
+        self.last_reads = dict()       # type: GroupResult
+        self.last_writes = dict()      # type: GroupResult
+        self.last_error = None         # type: Optional[Exception]
+        self.on_error = on_error
+        self._stop = threading.Event()
+        self._thread = None            # type: Optional[threading.Thread]
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _count_errors(self, results: GroupResult):
+        self.stats.connection_errors += len(WebIOModuleGroup.failed(results))
+
+    def run_once(self, deadline: float = None):
+        """ Runs a single read, logic, write cycle, recording its timings. When given the (monotonic) time the
+        cycle was due, its jitter and any overrun of the period are recorded as well."""
+        t0 = time.monotonic()
+        self.last_reads = self.group.update_from_hardware(self.timeout)
+        t1 = time.monotonic()
+        if self.logic is not None:
+            self.logic(self)
+        t2 = time.monotonic()
+        self.last_writes = self.group.send_changes_to_hardware(self.timeout)
+        t3 = time.monotonic()
+        self._count_errors(self.last_reads)
+        self._count_errors(self.last_writes)
+        jitter = 0.0 if deadline is None else t0 - deadline
+        overrun = deadline is not None and t3 > deadline + self.period
+        self.stats.record(t1 - t0, t2 - t1, t3 - t2, jitter, overrun)
+
+    def _report(self, error: Exception):
+        self.stats.errors += 1
+        self.last_error = error
+        if self.on_error is not None:
+            try:
+                self.on_error(self, error)
+            except Exception as ex:
+                # nor may the callback stop the scan: its error (in the context of the cycle's) is kept instead
+                self.last_error = ex
+
+    def _next_deadline(self, deadline: float, now: float) -> float:
+        missed = int((now - deadline) // self.period)
+        if missed <= 0:
+            return deadline + self.period
+        if self.overrun == OVERRUN_COMPRESS and missed <= self.max_catch_up:
+            return deadline + self.period
+        skip = missed if self.overrun == OVERRUN_SKIP else missed - self.max_catch_up
+        self.stats.skipped_cycles += skip
+        return deadline + (skip + 1) * self.period
+
+    def run(self, cycles: int = None):
+        """ Runs the scan in the calling thread until stop is called, or for the given number of cycles"""
+        self._stop.clear()
+        self._run(cycles)
+
+    def _run(self, cycles: int = None):
+        deadline = time.monotonic()
+        count = 0
+        while not self._stop.is_set() and (cycles is None or count < cycles):
+            delay = deadline - time.monotonic()
+            if delay > 0 and self._stop.wait(delay):
+                break
+            try:
+                self.run_once(deadline)
+            except Exception as ex:
+                self._report(ex)
+            deadline = self._next_deadline(deadline, time.monotonic())
+            count += 1
+
+    def start(self):
+        """ Starts the scan on a background thread"""
+        if self.is_running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="webio-scan", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        """ Stops the scan after the current cycle. May be called from within the logic."""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,360 @@
+"""
+Module Shared Image
+The SharedImage lets several processes work from the image of a module polled by just one of them. The poller
+publishes every image it reads into a memory-mapped file, and the other processes attach to that file with the same
+WebIOModule subclass, instead of each polling the module itself.
+
+    # the poller process
+    module = Tank('192.168.1.10')
+    module.share_image('/dev/shm/tank.image')
+    while True:
+        module.update_from_hardware()
+        ...
+
+    # any number of other processes
+    module = Tank('192.168.1.10')
+    module.attach_shared_image('/dev/shm/tank.image')
+    level = module.Level.value                  # always the latest published, read straight from the mapping
+    module.update_from_hardware()               # takes the latest raw image (for read and subscriptions)
+
+The analog and discrete IO declared on the module each have a fixed slot in the file (a double and a validity byte),
+so an attached process reads their typed values in place: without a lock, a copy or any conversion. The raw image,
+which read and the subscriptions need, follows the slots, encoded with marshal (see the snapshot module).
+
+Updates are guarded by a sequence lock. The publisher makes the sequence number odd before writing and even again
+after, and a reader retries any read that saw an odd number, or a different number after reading than before. A
+single value read is always whole, while values read one after the other may come from different polls; read_typed
+returns all of them from the same one. Writes made by an attached process still go straight to the module.
+
+Should the publisher die part way through an update, a reader waits for it once (for a second), then takes the image
+to be stale: until the update completes, the typed values read as missing, and read_raw returns the last image read
+(so the read time of the module no longer moves, and it is not fresh). A new publisher replaces the file and marks the
+one it replaces as retired; readers attach to the new file at their next read (or at their next poll, should the
+earlier file have been removed rather than replaced).
+"""
+
+import marshal
+import math
+import mmap
+import os
+import struct
+import time
+import zlib
+from typing import Dict, Iterable, Optional, Tuple
+
+from controlpyweb import tag_image
+from controlpyweb.errors import ControlPyWebSharedImageError
+
+MAGIC = b'CPWI'
+
+# The sequence number and read time come first, 8 byte aligned, so that each is read and written whole
+_STATE = struct.Struct('<dI')           # last read time (NaN if none), length of the raw image (_NO_RAW if none)
+_LAYOUT = struct.Struct('<4sIII')       # magic, crc32 of the layout, number of slots, capacity of the raw image
+_RETIRED = struct.Struct('<I')         # set once a new publisher has replaced the file
+_STATE_OFFSET = 8
+_LAYOUT_OFFSET = 20
+_RETIRED_OFFSET = 36
+_SLOTS_OFFSET = 40
+_NO_RAW = 0xFFFFFFFF
+_STALLED = 1.0          # seconds an update may be seen in progress before the publisher is taken to have died
+
+_MISSING = object()
+
+
+def _layout_crc(layout: Tuple[Tuple[str, str], ...]) -> int:
+    return zlib.crc32(';'.join('{}:{}'.format(addr, kind) for addr, kind in layout).encode())
+
+
+def _retire(f):
+    """ Marks the shared image in the open (and replaced) file as retired, so that its readers attach again"""
+    try:
+        with mmap.mmap(f.fileno(), 0) as m:
+            if len(m) >= _SLOTS_OFFSET and m[_LAYOUT_OFFSET:_LAYOUT_OFFSET + len(MAGIC)] == MAGIC:
+                _RETIRED.pack_into(m, _RETIRED_OFFSET, 1)
+    except (OSError, ValueError):
+        pass        # not a shared image (an empty file, say)
+
+
+class SharedImage:
+
+    def __init__(self, path: str, layout: Iterable[Tuple[str, str]], publisher: bool = False,
+                 raw_capacity: int = 1 << 20):
+        """
+        Use SharedImage.create (the publisher) or SharedImage.attach (a reader) rather than this directly.
+        :param path: The file mapped, ideally on a memory backed file system such as /dev/shm.
+        :param layout: The (address, kind) of the analog and discrete values given a slot.
+        :param raw_capacity: The largest raw image published, in bytes (once encoded). An image that does not fit
+        is counted in raw_overflows, and only its typed values are published.
+        """
+        self.path = path
+        self.layout = tuple(sorted(set((addr, kind) for addr, kind in layout
+                                       if kind in (tag_image.ANALOG, tag_image.DISCRETE))))
+        self.publisher = publisher
+        self.raw_overflows = 0
+        self._slots = {addr: (kind, index) for index, (addr, kind) in enumerate(self.layout)}
+        self._addrs = [addr for addr, _ in self.layout]
+        n = len(self.layout)
+        self._valid_offset = _SLOTS_OFFSET + 8 * n
+        self._raw_offset = self._valid_offset + n
+        self._crc = _layout_crc(self.layout)
+        self._stalled = None        # the sequence number of an update the publisher stopped part way through
+
+        if publisher:
+            # A new file replaces any earlier one, so that readers still mapping the earlier one are never left with a
+            # mapping cut short. The earlier one is then retired, for its readers to attach to the new one.
+            self.raw_capacity = raw_capacity
+            try:
+                previous = open(path, 'r+b')
+            except OSError:
+                previous = None
+            temp = path + '.tmp'
+            with open(temp, 'w+b') as f:
+                f.truncate(self._raw_offset + raw_capacity)
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE)
+                self._file_id = self._id(os.fstat(f.fileno()))
+            _LAYOUT.pack_into(self._map, _LAYOUT_OFFSET, MAGIC, self._crc, n, raw_capacity)
+            _STATE.pack_into(self._map, _STATE_OFFSET, math.nan, _NO_RAW)
+            os.replace(temp, path)
+            if previous is not None:
+                with previous:
+                    _retire(previous)
+            self._map_views()
+        else:
+            self._attach()
+
+    @staticmethod
+    def _id(stat) -> Tuple[int, int]:
+        return stat.st_dev, stat.st_ino
+
+    def _attach(self):
+        """ Maps the file at the path, as a reader"""
+        with open(self.path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            file_id = self._id(os.fstat(f.fileno()))
+        if len(mapped) < _SLOTS_OFFSET:
+            mapped.close()
+            raise ControlPyWebSharedImageError("{} is not a shared image.".format(self.path))
+        magic, file_crc, _, raw_capacity = _LAYOUT.unpack_from(mapped, _LAYOUT_OFFSET)
+        if magic != MAGIC or file_crc != self._crc:
+            mapped.close()
+            raise ControlPyWebSharedImageError(
+                "{} holds the image of a module declaring other IO.".format(self.path))
+        # the earlier mapping (if any) is left to be unmapped once no read still in progress on another thread uses it
+        self._map, self._file_id, self.raw_capacity = mapped, file_id, raw_capacity
+        self._stalled = None
+        self._map_views()
+
+    def _map_views(self):
+        view = memoryview(self._map)
+        self._retired = view[_RETIRED_OFFSET:_RETIRED_OFFSET + 4].cast('I')
+        self._values = view[_SLOTS_OFFSET:self._valid_offset].cast('d')
+        self._valid = view[self._valid_offset:self._raw_offset]
+        self._view = view
+        self._seen = None           # the sequence number and raw image last decoded by read_raw
+        # set last, as it is the sequence number a read checks to see whether the mapping has changed under it
+        self._sequence = view[0:8].cast('Q')
+
+    def _replaced(self) -> bool:
+        """ True when a new publisher has replaced the file mapped, or a new file has been created in its place"""
+        if self._retired[0]:
+            return True
+        try:
+            return self._id(os.stat(self.path)) != self._file_id
+        except OSError:
+            return False            # removed, and not (yet) replaced
+
+    @classmethod
+    def create(cls, path: str, layout: Iterable[Tuple[str, str]], raw_capacity: int = 1 << 20) -> 'SharedImage':
+        """ Creates (or replaces) the file, to publish images into"""
+        return cls(path, layout, True, raw_capacity)
+
+    @classmethod
+    def attach(cls, path: str, layout: Iterable[Tuple[str, str]]) -> 'SharedImage':
+        """ Maps the file of a publisher, which must have been created with the same layout"""
+        return cls(path, layout, False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """ Unmaps the file. Typed values can no longer be read from a module attached to it."""
+        if self._view is None:
+            return
+        for view in (self._sequence, self._retired, self._values, self._valid, self._view):
+            view.release()
+        self._view = None
+        self._map.close()
+
+    def unlink(self):
+        """ Closes and removes the file"""
+        self.close()
+        os.remove(self.path)
+
+    @property
+    def sequence(self) -> int:
+        """ Even and counting up by 2 with each image published, odd while one is being published"""
+        return self._sequence[0]
+
+    @property
+    def stalled(self) -> bool:
+        """ True while the image is stale, its publisher having stopped part way through an update"""
+        return self._stalled is not None and self._sequence[0] == self._stalled
+
+    def _begin_read(self) -> Optional[int]:
+        """ Returns the sequence number to read at, once no update is in progress, or None while the image is stale.
+        An update is waited for once; should it not complete, the publisher is taken to have died and later reads
+        return at once (as long as it stays incomplete)."""
+        if self._retired[0] and not self.publisher:
+            self._attach()
+        start = self._sequence[0]
+        if not start & 1:
+            return start
+        if start != self._stalled:
+            deadline = time.monotonic() + _STALLED
+            while start & 1 and time.monotonic() < deadline:
+                time.sleep(0)
+                start = self._sequence[0]
+            if not start & 1:
+                return start
+            self._stalled = start
+        if not self.publisher and self._replaced():
+            self._attach()
+            return self._begin_read()
+        return None
+
+    def publish(self, typed, raw: Optional[dict], read_time: Optional[float]):
+        """ Publishes an image: the typed values of the slots, taken from the typed image of the module (anything
+        with a get(addr, default) method), along with its raw image and the time it was read"""
+        raw_bytes = None if raw is None else marshal.dumps(raw)
+        if raw_bytes is not None and len(raw_bytes) > self.raw_capacity:
+            self.raw_overflows += 1
+            raw_bytes = None
+        get, values, valid = typed.get, self._values, self._valid
+        sequence = self._sequence
+        sequence[0] += 1
+        for index, addr in enumerate(self._addrs):
+            value = get(addr, _MISSING)
+            if value is _MISSING or value is None:
+                valid[index] = 0
+            else:
+                values[index] = float(value)
+                valid[index] = 1
+        _STATE.pack_into(self._map, _STATE_OFFSET, math.nan if read_time is None else read_time,
+                         _NO_RAW if raw_bytes is None else len(raw_bytes))
+        if raw_bytes is not None:
+            self._view[self._raw_offset:self._raw_offset + len(raw_bytes)] = raw_bytes
+        sequence[0] += 1
+
+    def get(self, addr: str, default=None):
+        """ Returns the latest published value of the address, or the default if it has no slot or value"""
+        entry = self._slots.get(addr)
+        if entry is None:
+            return default
+        kind, index = entry
+        while True:
+            start = self._begin_read()
+            if start is None:
+                return default
+            is_valid, value = self._valid[index], self._values[index]
+            if self._sequence[0] == start:
+                break
+        if not is_valid:
+            return default
+        return bool(value) if kind is tag_image.DISCRETE else value
+
+    def read_typed(self) -> Dict[str, object]:
+        """ Returns the typed values of every slot that has one, all from the same image"""
+        while True:
+            start = self._begin_read()
+            if start is None:
+                return dict()
+            values, valid = self._values.tolist(), bytes(self._valid)
+            if self._sequence[0] == start:
+                break
+        return {addr: bool(values[i]) if kind == tag_image.DISCRETE else values[i]
+                for i, (addr, kind) in enumerate(self.layout) if valid[i]}
+
+    def read_raw(self) -> Tuple[int, Optional[float], Optional[dict]]:
+        """ Returns the sequence number of the latest image, the time it was read and its raw image (None when
+        nothing has been published, or the image was too large to be). The raw image is decoded once per image.
+        While the image is stale, the last image read is returned again."""
+        if not self.publisher and self._replaced():
+            self._attach()
+        while True:
+            start = self._begin_read()
+            if start is None:
+                return self._seen if self._seen is not None else (self._stalled, None, None)
+            if self._seen is not None and self._seen[0] == start:
+                return self._seen
+            read_time, length = _STATE.unpack_from(self._map, _STATE_OFFSET)
+            data = None if length == _NO_RAW else bytes(self._view[self._raw_offset:self._raw_offset + length])
+            if self._sequence[0] == start:
+                break
+        self._seen = (start, None if math.isnan(read_time) else read_time,
+                      None if data is None else marshal.loads(data))
+        return self._seen
+
+    def view(self, local) -> 'SharedTagImage':
+        """ Returns a typed image for a module attached to this one, see SharedTagImage"""
+        return SharedTagImage(self, local)
+
+
+class SharedTagImage:
+    """ The typed image of a module attached to a shared image. The values of the slots are read from the shared
+    image, and cannot be set locally; any other address (of object IO, or derived values) is kept in the module's
+    own typed image, as before it was attached."""
+    __slots__ = ('shared', 'local')
+
+    def __init__(self, shared: SharedImage, local):
+        self.shared = shared
+        self.local = local
+
+    def __contains__(self, addr: str) -> bool:
+        return self.get(addr, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return len(self.local)
+
+    @property
+    def addresses(self):
+        return self.local.addresses
+
+    @property
+    def nbytes(self) -> int:
+        return self.local.nbytes
+
+    def add(self, addr: str, kind: str = tag_image.OBJECT):
+        self.local.add(addr, kind)
+
+    def get(self, addr: str, default=None):
+        if addr in self.shared._slots:
+            return self.shared.get(addr, default)
+        return self.local.get(addr, default)
+
+    def set(self, addr: str, value) -> bool:
+        if addr in self.shared._slots:
+            return True
+        return self.local.set(addr, value)
+
+    def set_many(self, addrs, values):
+        for addr, value in zip(addrs, values):
+            self.set(addr, value)
+
+    def invalidate(self, addr: str):
+        if addr not in self.shared._slots:
+            self.local.invalidate(addr)
+
+    def copy(self):
+        """ Returns an independent (local) copy of the image as it is now"""
+        image = self.local.copy()
+        for addr, value in self.shared.read_typed().items():
+            image.set(addr, value)
+        return image
+
+    def to_dict(self) -> dict:
+        result = self.local.to_dict()
+        result.update(self.shared.read_typed())
+        return result
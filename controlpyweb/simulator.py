@@ -0,0 +1,190 @@
+"""
+Module Simulator
+The DeviceSimulator is a local http server standing in for one or many ControlByWeb modules, so that the library can
+be exercised (and sized) over real http without the hardware. Each SimulatedModule serves its state as
+customState.json and applies the addr=value pairs of the query string as writes, the same as the hardware does.
+Latency, jitter and failures can be injected per module.
+
+A module added without a name is served at the root (host:port), a named one under its name (host:port/name), so
+the url returned by DeviceSimulator.url can be handed straight to a WebIOModule.
+
+    python -m controlpyweb.simulator --port 8080 --modules 4 --latency 0.01
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+STATE_FILE = 'customState.json'
+
+
+class SimulatedModule:
+
+    def __init__(self, state: dict = None, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0,
+                 drop_rate: float = 0.0, seed: int = None):
+        """
+        :param state: The initial addresses and (string) values of the module.
+        :param latency: The time taken to answer each request, in seconds.
+        :param jitter: A random extra time, up to this many seconds, added to each request.
+        :param failure_rate: The fraction (0-1) of requests answered with an http 500, without applying the writes.
+        :param drop_rate: The fraction (0-1) of requests whose connection is closed without an answer.
+        :param seed: Seeds the random jitter and failures, for repeatable runs.
+        """
+        self.state = dict(state or {})      # type: Dict[str, str]
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.drop_rate = drop_rate
+        self.offline = False                # when set, every connection is dropped
+        self.requests = 0
+        self.writes = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        """ Returns the time the next request should take to answer"""
+        with self._lock:
+            return self.latency + (self._random.uniform(0.0, self.jitter) if self.jitter > 0 else 0.0)
+
+    def outcome(self) -> Optional[str]:
+        """ Decides the fate of a request, returning 'drop', 'fail', or None to answer it"""
+        with self._lock:
+            self.requests += 1
+            if self.offline or (self.drop_rate > 0 and self._random.random() < self.drop_rate):
+                self.failures += 1
+                return 'drop'
+            if self.failure_rate > 0 and self._random.random() < self.failure_rate:
+                self.failures += 1
+                return 'fail'
+            return None
+
+    def apply(self, writes: Dict[str, str]) -> bytes:
+        """ Applies the writes, returning the resulting state as json"""
+        with self._lock:
+            self.state.update(writes)
+            self.writes += len(writes)
+            return json.dumps(self.state).encode()
+
+    def reset_counts(self):
+        with self._lock:
+            self.requests = self.writes = self.failures = 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True      # headers and body go out separately, don't hold the body for an ack
+    simulator = None        # type: DeviceSimulator
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        name, _, file = parts.path.strip('/').rpartition('/')
+        module = self.simulator.modules.get(name) if file == STATE_FILE else None
+        if module is None:
+            self._reply(404, b'')
+            return
+        outcome = module.outcome()
+        delay = module.delay()
+        if delay > 0:
+            time.sleep(delay)
+        if outcome == 'drop':
+            self.close_connection = True
+            return
+        if outcome == 'fail':
+            self._reply(500, b'')
+            return
+        self._reply(200, module.apply(dict(parse_qsl(parts.query))))
+
+    def _reply(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class DeviceSimulator:
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        """
+        :param host: The interface to listen on.
+        :param port: The port to listen on, 0 to have one assigned.
+        """
+        handler = type('Handler', (_Handler,), dict(simulator=self))
+        self.modules = dict()       # type: Dict[str, SimulatedModule]
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = None         # type: Optional[threading.Thread]
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def address(self) -> str:
+        host, port = self._server.server_address[:2]
+        return '{}:{}'.format(host, port)
+
+    def url(self, name: str = '') -> str:
+        """ Returns the url of the named module, in the form taken by a WebIOModule"""
+        return self.address if name == '' else '{}/{}'.format(self.address, name)
+
+    def add_module(self, name: str = '', state: dict = None, **kwargs) -> SimulatedModule:
+        """ Adds a module, served under the given name. The keyword arguments are those of SimulatedModule."""
+        if '/' in name:
+            raise ValueError("A module name may not contain '/'.")
+        module = SimulatedModule(state, **kwargs)
+        self.modules[name] = module
+        return module
+
+    def start(self):
+        """ Starts serving on a background thread"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), name='webio-simulator',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._thread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--modules', type=int, default=1, help='modules served as /module0, /module1, ...')
+    parser.add_argument('--tags', type=int, default=16, help='discrete relays (relay1...) per module')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--drop-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    simulator = DeviceSimulator(args.host, args.port)
+    state = {'relay{}'.format(i): '0' for i in range(1, args.tags + 1)}
+    for i in range(args.modules):
+        simulator.add_module('module{}'.format(i), state, latency=args.latency, jitter=args.jitter,
+                             failure_rate=args.failure_rate, drop_rate=args.drop_rate)
+    print('Serving {} modules at {}'.format(args.modules, ', '.join(simulator.url(n) for n in simulator.modules)))
+    simulator._server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
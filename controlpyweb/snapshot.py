@@ -0,0 +1,120 @@
+"""
+Module Snapshot
+A snapshot is a compact binary copy of the state of a module: its identity (url and class), the raw and typed images,
+the pending changes and the time of its last read from the hardware. Snapshots serialize and deserialize in
+microseconds, and can be appended to a file as a module runs.
+
+On restart, warm_start restores every module from the latest snapshot of it in the file, so that its control loop can
+begin straight away, working from the last known state (and its pending writes), before the first poll completes.
+image_age tells how old that state is.
+
+    for module in modules:
+        append_snapshot('state.snap', module)       # each scan, or every few
+    ...
+    warm_start(modules, 'state.snap')               # on restart
+
+The payload is encoded with marshal, which is fast and only holds plain values, but is specific to the version of
+python. A snapshot written by another version (or damaged in a crash) is rejected, and the module simply starts cold.
+"""
+
+import marshal
+import math
+import os
+import struct
+import zlib
+from typing import Dict, Iterable, List
+
+from controlpyweb.errors import ControlPyWebSnapshotError
+
+MAGIC = b'CPWS'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sBBd')        # magic, format version, marshal version, last read time (NaN if none)
+_RECORD = struct.Struct('<II')           # length and crc32 of a snapshot appended to a file
+
+_PLAIN = (bool, int, float, str, type(None))
+
+
+def encode(identity: dict, io: dict, changes: dict, typed: dict, read_time: float = None) -> bytes:
+    """ Encodes the state of a module. Typed values that are not plain (bool, int, float, str) are left out, and
+    are converted from the raw image again on decoding."""
+    typed = {addr: value for addr, value in typed.items() if isinstance(value, _PLAIN)}
+    header = _HEADER.pack(MAGIC, VERSION, marshal.version, math.nan if read_time is None else read_time)
+    return header + marshal.dumps((identity, io, changes, typed))
+
+
+def decode(data: bytes) -> dict:
+    """ Decodes a snapshot into its identity, io, changes, typed and read_time"""
+    if len(data) < _HEADER.size:
+        raise ControlPyWebSnapshotError("The snapshot is truncated.")
+    magic, version, marshal_version, read_time = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or marshal_version != marshal.version:
+        raise ControlPyWebSnapshotError("The snapshot is not of a format this version can read.")
+    try:
+        identity, io, changes, typed = marshal.loads(data[_HEADER.size:])
+    except (EOFError, ValueError, TypeError) as ex:
+        raise ControlPyWebSnapshotError("The snapshot is damaged: {}".format(ex)) from ex
+    return dict(identity=identity, io=io, changes=changes, typed=typed,
+                read_time=None if math.isnan(read_time) else read_time)
+
+
+def append_snapshot(path: str, module, flush: bool = True):
+    """ Appends the snapshot of a module (or the bytes of one) to a file"""
+    data = module if isinstance(module, bytes) else module.snapshot()
+    with open(path, 'ab') as f:
+        f.write(_RECORD.pack(len(data), zlib.crc32(data)) + data)
+        if flush:
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def read_snapshots(path: str) -> Dict[str, bytes]:
+    """ Returns the latest snapshot in the file of each module, by url. Reading stops at the first damaged record,
+    as left by a crash during an append."""
+    latest = dict()
+    with open(path, 'rb') as f:
+        buffer = f.read()
+    offset = 0
+    while offset + _RECORD.size <= len(buffer):
+        length, crc = _RECORD.unpack_from(buffer, offset)
+        start, end = offset + _RECORD.size, offset + _RECORD.size + length
+        data = buffer[start:end]
+        if len(data) != length or zlib.crc32(data) != crc:
+            break
+        try:
+            latest[decode(data)['identity']['url']] = data
+        except ControlPyWebSnapshotError:
+            pass
+        offset = end
+    return latest
+
+
+def compact_snapshots(path: str):
+    """ Rewrites the file with only the latest snapshot of each module"""
+    latest = read_snapshots(path)
+    temp = path + '.tmp'
+    with open(temp, 'wb') as f:
+        for data in latest.values():
+            f.write(_RECORD.pack(len(data), zlib.crc32(data)) + data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+
+
+def warm_start(modules: Iterable, path: str) -> List:
+    """ Restores each module from its latest snapshot in the file, returning those that were restored. Modules
+    with no usable snapshot (or none at all, when the file does not exist) are left to start cold."""
+    if not os.path.exists(path):
+        return []
+    latest = read_snapshots(path)
+    restored = []
+    for module in modules:
+        data = latest.get(module.url)
+        if data is None:
+            continue
+        try:
+            module.restore(data)
+        except ControlPyWebSnapshotError:
+            continue
+        restored.append(module)
+    return restored
@@ -0,0 +1,121 @@
+"""
+Module Subscriptions
+Subscriptions allow callbacks to be registered against individual addresses of a module, to be called when a read
+from the hardware changes their value (ON_CHANGE), or when a discrete value turns on (RISING) or off (FALLING).
+Only the subscribed addresses are looked at on each read, and a raw value equal to the last one seen is skipped
+before any conversion, so the cost of a poll follows the number of subscriptions and changes rather than the size of
+the module.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+ON_CHANGE = 'change'
+RISING = 'rising'
+FALLING = 'falling'
+
+_MISSING = object()
+
+Callback = Callable[[str, object, object], None]
+
+
+class Subscription:
+    __slots__ = ('addr', 'callback', 'edge', 'deadband', 'converter', '_raw', '_value')
+
+    def __init__(self, addr: str, callback: Callback, edge: str = ON_CHANGE, deadband: float = None,
+                 converter: Callable[[object], object] = None):
+        """
+        :param addr: The address being watched.
+        :param callback: Called with the address, the old value and the new value.
+        :param edge: ON_CHANGE, RISING or FALLING.
+        :param deadband: For ON_CHANGE only, changes of a numeric value no larger than this (relative to the last
+        value reported) are ignored.
+        :param converter: Converts the raw value before it is compared and reported.
+        """
+        if edge not in (ON_CHANGE, RISING, FALLING):
+            raise ValueError("Unknown edge {}.".format(edge))
+        self.addr = addr
+        self.callback = callback
+        self.edge = edge
+        self.deadband = deadband
+        self.converter = converter
+        self._raw = _MISSING
+        self._value = None
+
+    def update(self, raw) -> Optional[Tuple[object, object]]:
+        """ Takes the latest raw value, returning the (old, new) values if the callback is due, None otherwise"""
+        if raw == self._raw:
+            return None
+        if raw is None or self.converter is None:
+            new = raw
+        else:
+            try:
+                new = self.converter(raw)
+            except (TypeError, ValueError):
+                # Left unconverted, as in the typed image: nothing is reported, and it is converted again next read
+                self._raw = _MISSING
+                return None
+        self._raw = raw
+        old = self._value
+        if self.edge == ON_CHANGE:
+            if new == old:
+                return None
+            if self.deadband is not None and old is not None and new is not None and abs(new - old) <= self.deadband:
+                return None
+            self._value = new
+            return old, new
+        self._value = new
+        if old is None or new is None:
+            return None
+        if self.edge == RISING and not old and new:
+            return old, new
+        if self.edge == FALLING and old and not new:
+            return old, new
+        return None
+
+
+class SubscriptionTable:
+
+    def __init__(self):
+        self._by_addr = dict()      # type: Dict[str, List[Subscription]]
+
+    def __len__(self):
+        return sum(len(subscriptions) for subscriptions in self._by_addr.values())
+
+    def addresses(self) -> List[str]:
+        return list(self._by_addr)
+
+    def add(self, subscription: Subscription):
+        # Lists are replaced rather than appended to, so a collect running on another thread is not disturbed
+        self._by_addr[subscription.addr] = self._by_addr.get(subscription.addr, []) + [subscription]
+
+    def remove(self, subscription: Subscription):
+        subscriptions = [s for s in self._by_addr.get(subscription.addr, []) if s is not subscription]
+        if len(subscriptions) > 0:
+            self._by_addr[subscription.addr] = subscriptions
+        else:
+            self._by_addr.pop(subscription.addr, None)
+
+    def collect(self, vals: dict) -> List[Tuple[Subscription, object, object]]:
+        """ Compares the subscribed addresses of a new image against the last values seen, returning the
+        callbacks that are due along with their old and new values"""
+        events = []
+        for addr, subscriptions in self._by_addr.items():
+            raw = vals.get(addr)
+            for subscription in subscriptions:
+                change = subscription.update(raw)
+                if change is not None:
+                    events.append((subscription, change[0], change[1]))
+        return events
+
+    @staticmethod
+    def dispatch(events: List[Tuple[Subscription, object, object]]):
+        """ Calls back each event. Should a callback raise, the remaining ones are still called, and the first
+        error is raised afterwards."""
+        error = None
+        for subscription, old, new in events:
+            try:
+                subscription.callback(subscription.addr, old, new)
+            except Exception as ex:
+                error = error or ex
+        if error is not None:
+            raise error
@@ -0,0 +1,192 @@
+"""
+Module Tag Image
+The TagImage class holds the typed values of the registered addresses of a module in compact, preallocated storage.
+Each address is assigned a slot when it is registered; analog values live in a contiguous array of doubles, discrete
+values in a bitset, and anything else in a plain list. Loading a new poll overwrites the slots in place, so keeping
+the typed image current allocates next to nothing per poll, however many tags there are.
+
+The DictTagImage offers the same interface over a plain dictionary. It uses more memory per tag, but its lookups
+are faster, which makes it the better fit (and the default) for modules with a modest number of tags.
+"""
+
+from array import array
+from typing import Dict, Set, Tuple
+import sys
+
+ANALOG = 'analog'
+DISCRETE = 'discrete'
+OBJECT = 'object'
+
+_MISSING = object()
+
+
+class TagImage:
+    __slots__ = ('_slots', '_floats', '_floats_valid', '_bits', '_bits_valid', '_objects', '_bit_count')
+
+    def __init__(self):
+        self._slots = dict()                # type: Dict[str, Tuple[str, int]]
+        self._floats = array('d')
+        self._floats_valid = bytearray()
+        self._bits = bytearray()
+        self._bits_valid = bytearray()
+        self._objects = []
+        self._bit_count = 0
+
+    def __contains__(self, addr: str) -> bool:
+        return self.get(addr, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return len(self._slots)
+
+    @property
+    def addresses(self):
+        return self._slots.keys()
+
+    @property
+    def nbytes(self) -> int:
+        """ The size of the value storage, in bytes (excluding the address index)"""
+        return (self._floats.itemsize * len(self._floats) + len(self._floats_valid) + len(self._bits)
+                + len(self._bits_valid) + sys.getsizeof(self._objects))
+
+    def add(self, addr: str, kind: str = OBJECT):
+        """ Assigns a slot for the address. An address keeps the slot (and kind) it was first given."""
+        if addr in self._slots:
+            return
+        addr = sys.intern(addr)
+        if kind == ANALOG:
+            self._slots[addr] = (ANALOG, len(self._floats))
+            self._floats.append(0.0)
+            self._floats_valid.append(0)
+        elif kind == DISCRETE:
+            index = self._bit_count
+            self._bit_count += 1
+            if index >> 3 >= len(self._bits):
+                self._bits.append(0)
+                self._bits_valid.append(0)
+            self._slots[addr] = (DISCRETE, index)
+        else:
+            self._slots[addr] = (OBJECT, len(self._objects))
+            self._objects.append(_MISSING)
+
+    def get(self, addr: str, default=None):
+        """ Returns the typed value of the address, or the default if the address is not registered or has no
+        value"""
+        entry = self._slots.get(addr)
+        if entry is None:
+            return default
+        kind, index = entry
+        if kind is ANALOG:
+            return self._floats[index] if self._floats_valid[index] else default
+        if kind is DISCRETE:
+            byte, mask = index >> 3, 1 << (index & 7)
+            if not self._bits_valid[byte] & mask:
+                return default
+            return bool(self._bits[byte] & mask)
+        value = self._objects[index]
+        return default if value is _MISSING else value
+
+    def set(self, addr: str, value) -> bool:
+        """ Stores an (already converted) value in the slot of the address, returning False if it has none"""
+        entry = self._slots.get(addr)
+        if entry is None:
+            return False
+        kind, index = entry
+        if kind is ANALOG:
+            self._floats[index] = value
+            self._floats_valid[index] = 1
+        elif kind is DISCRETE:
+            byte, mask = index >> 3, 1 << (index & 7)
+            self._bits_valid[byte] |= mask
+            if value:
+                self._bits[byte] |= mask
+            else:
+                self._bits[byte] &= ~mask
+        else:
+            self._objects[index] = value
+        return True
+
+    def set_many(self, addrs, values):
+        """ Stores the (already converted) values in the slots of their addresses, which must be registered"""
+        for addr, value in zip(addrs, values):
+            self.set(addr, value)
+
+    def invalidate(self, addr: str):
+        """ Marks the address as having no value"""
+        entry = self._slots.get(addr)
+        if entry is None:
+            return
+        kind, index = entry
+        if kind is ANALOG:
+            self._floats_valid[index] = 0
+        elif kind is DISCRETE:
+            self._bits_valid[index >> 3] &= ~(1 << (index & 7))
+        else:
+            self._objects[index] = _MISSING
+
+    def copy(self) -> 'TagImage':
+        """ Returns an independent copy, with the same slot assignments"""
+        image = TagImage.__new__(TagImage)
+        image._slots = dict(self._slots)
+        image._floats = array('d', self._floats)
+        image._floats_valid = bytearray(self._floats_valid)
+        image._bits = bytearray(self._bits)
+        image._bits_valid = bytearray(self._bits_valid)
+        image._objects = list(self._objects)
+        image._bit_count = self._bit_count
+        return image
+
+    def to_dict(self) -> dict:
+        """ Returns the addresses that have a value, with their typed values"""
+        result = dict()
+        for addr in self._slots:
+            value = self.get(addr, _MISSING)
+            if value is not _MISSING:
+                result[addr] = value
+        return result
+
+
+class DictTagImage:
+    __slots__ = ('_values', '_addresses', 'get')
+
+    def __init__(self):
+        self._values = dict()
+        self._addresses = set()     # type: Set[str]
+        self.get = self._values.get
+
+    def __contains__(self, addr: str) -> bool:
+        return addr in self._values
+
+    def __len__(self):
+        return len(self._addresses)
+
+    @property
+    def addresses(self):
+        return frozenset(self._addresses)
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self._values) + sum(sys.getsizeof(v) for v in self._values.values())
+
+    def add(self, addr: str, kind: str = OBJECT):
+        self._addresses.add(sys.intern(addr))
+
+    def set(self, addr: str, value) -> bool:
+        if addr not in self._addresses:
+            return False
+        self._values[addr] = value
+        return True
+
+    def set_many(self, addrs, values):
+        self._values.update(zip(addrs, values))
+
+    def invalidate(self, addr: str):
+        self._values.pop(addr, None)
+
+    def copy(self) -> 'DictTagImage':
+        image = DictTagImage()
+        image._values.update(self._values)
+        image._addresses.update(self._addresses)
+        return image
+
+    def to_dict(self) -> dict:
+        return dict(self._values)
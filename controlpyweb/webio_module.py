@@ -4,29 +4,135 @@ This class provides a base container for IO. Generally, the user will inherit fr
 individual IO within. See test cases for examples of use.
 """
 
-from controlpyweb.errors import ControlPyWebAddressNotFoundError
-from controlpyweb.reader_writer import ReaderWriter
+from controlpyweb.errors import ControlPyWebAddressNotFoundError, ControlPyWebReadOnlyError
+from controlpyweb.reader_writer import DICT, TUPLE, ReaderWriter, shape_values
 from abc import ABC
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
 import datetime
 
+from controlpyweb.io_definitions.io_out import IOOut
 from controlpyweb.io_definitions.single_io import SingleIO
+from controlpyweb.shared_image import SharedImage
+from controlpyweb.tag_image import ANALOG, DISCRETE
 
 
-class WebIOModule(ReaderWriter, ABC):
+class WebIOContainer:
+    """ The IO container behaviour shared by all module types, independent of how they talk to the hardware.
 
-    def __init__(self, url: str, demand_address_exists: bool = True):
-        super().__init__(url, demand_address_exists)
-        self.members = []
-        all_members = [d for d in dir(self) if not d.startswith('__')]
-        for member in all_members:
-            try:
-                attr = getattr(self, member)
-                if not isinstance(attr, SingleIO):
-                    continue
-                attr._reader_writer = self
-                self.members.append(member)
-            except AttributeError:
-                pass
+    The IO declared on a container class is collected into a tag table once, when the class is defined. Each
+    instance then binds its own copy of every IO, so that many instances of the same class can coexist."""
+
+    _io_table = dict()      # type: Dict[str, SingleIO]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        table = dict()
+        for klass in reversed(cls.__mro__):
+            for name, attr in vars(klass).items():
+                if isinstance(attr, SingleIO) and not name.startswith('__'):
+                    table[name] = attr
+                elif name in table:
+                    del table[name]
+        cls._io_table = dict(sorted(table.items()))
+
+    def _register_members(self):
+        self._bound_io = {name: io.bind(self) for name, io in self._io_table.items()}     # type: Dict[str, SingleIO]
+        self._io_by_addr = {io.addr: io for io in self._bound_io.values()}                 # type: Dict[str, SingleIO]
+        # the (address, converter, default) read_many uses for each IO, by member name and by address
+        self._read_plans = {key: (io.addr, io._convert_type, io._default)
+                            for io in self._bound_io.values() for key in (io.addr, io._attr_name)}
+        self.members = list(self._bound_io)
+        for io in self._bound_io.values():
+            self.register_converter(io.addr, io._converter(), io._kind)
+
+    def attach_historian(self, historian, addresses: Iterable[str] = None):
+        """ Has the historian record every poll of the module, from then on. By default, it records every analog
+        and discrete IO declared on the module.
+        :param historian: A controlpyweb.historian.Historian, or None to detach the current one.
+        """
+        if historian is not None:
+            if addresses is None:
+                addresses = [io.addr for io in self._bound_io.values() if io._kind in (ANALOG, DISCRETE)]
+            historian.set_addresses(addresses)
+        self.historian = historian
+
+    def _member(self, member: Union[SingleIO, str]) -> Optional[SingleIO]:
+        """ Returns the bound IO given as an IO of the module, a member name or an address, None for an address of
+        no member"""
+        if isinstance(member, str):
+            io = self._bound_io.get(member)
+            return io if io is not None else self._io_by_addr.get(member)
+        return self._bound_io.get(member._attr_name, member)
+
+    def read_many(self, members: Sequence[Union[SingleIO, str]], into: str = DICT, max_age: float = None):
+        """
+        Returns the values of many IO at once, under a single acquisition of the lock. Each is converted (and
+        defaulted) as its value would be; addresses of no member are returned raw.
+        :param members: The IO, given as members of the module, member names or addresses.
+        :param into: DICT (keyed by member name for members, otherwise as given), TUPLE or ARRAY (a NumPy array
+        of floats).
+        :param max_age: As for read.
+        """
+        plans = self._read_plans
+        keys = [member if isinstance(member, str) else member._attr_name for member in members]
+        plan = [plans.get(key) or (key, None, None) for key in keys]
+        addrs, converters, defaults = zip(*plan) if len(plan) > 0 else ((), (), ())
+        values = self._read_many(addrs, converters, max_age)
+        values = [default if value is None else value for value, default in zip(values, defaults)]
+        return shape_values(keys, values, into)
+
+    def write_many(self, values: Union[Dict[str, object], Iterable[Tuple[Union[SingleIO, str], object]]],
+                   immediate: bool = False):
+        """
+        Writes many IO at once, under a single acquisition of the lock. Each output skips the writes it would skip
+        were it written on its own (duplicates, deadbands, min_interval), and writing an input raises a
+        ControlPyWebReadOnlyError.
+        :param values: The values by member name or address, or (IO, value) pairs, the IO given as a member of the
+        module, member name or address.
+        :param immediate: Sends the writes straight away through write_immediate, as one batched request, returning
+        its result (an awaitable, for asynchronous modules).
+        """
+        outputs, items = [], dict()
+        for member, value in (values.items() if isinstance(values, dict) else values):
+            if hasattr(value, 'value'):
+                value = value.value
+            io = self._member(member)
+            if io is None:
+                items[member] = value
+            elif not isinstance(io, IOOut):
+                raise ControlPyWebReadOnlyError
+            else:
+                outputs.append((io, value))
+        # the values the outputs have, read in one go for the duplicate checks
+        currents = self.read_many([io.addr for io, _ in outputs], TUPLE)
+        for (io, value), current in zip(outputs, currents):
+            if io._should_write(value, current):
+                items[io.addr] = io._convert_type(value)
+            else:
+                self.write_stats.suppressed += 1
+        if immediate:
+            return self.write_immediate(list(items), list(items.values()))
+        super().write_many(items)
+
+    def _shared_layout(self) -> List[Tuple[str, str]]:
+        return [(io.addr, io._kind) for io in self._bound_io.values() if io._kind in (ANALOG, DISCRETE)]
+
+    def share_image(self, path: str, raw_capacity: int = 1 << 20) -> SharedImage:
+        """ Publishes every poll of the module to a shared image at the path (replacing any file there), from
+        which other processes read it with attach_shared_image. See the shared_image module."""
+        self.shared_image = SharedImage.create(path, self._shared_layout(), raw_capacity)
+        with self._lock:
+            if self._first_read:
+                self.shared_image.publish(self._typed, self._io, self.last_hardware_read_time)
+        return self.shared_image
+
+    def attach_shared_image(self, path: str) -> SharedImage:
+        """ Serves the module from the shared image another process publishes at the path, rather than from the
+        hardware: the typed values of its analog and discrete IO are read from the image as they are published,
+        and update_from_hardware takes the latest raw image from it. Writes still go to the hardware."""
+        self.shared_image = SharedImage.attach(path, self._shared_layout())
+        self._typed = self.shared_image.view(getattr(self._typed, 'local', self._typed))
+        return self.shared_image
 
     def _read_safe(self, addr: str):
         try:
@@ -53,7 +159,13 @@ class WebIOModule(ReaderWriter, ABC):
         return datetime.datetime.fromtimestamp(int(response))
 
 
+class WebIOModule(WebIOContainer, ReaderWriter, ABC):
+
+    def __init__(self, url: str, demand_address_exists: bool = True, **kwargs):
+        super().__init__(url, demand_address_exists, **kwargs)
+        self._register_members()
+
+
 if __name__ == '__main__':
     pass
 
-
@@ -0,0 +1,110 @@
+"""
+Module Web IO Module Group
+The WebIOModuleGroup class holds many modules and talks to them concurrently over a bounded pool of worker threads,
+so that a scan over all of the modules costs about as much as the slowest one rather than the sum of them all.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from controlpyweb.errors import WebIOConnectionError
+from controlpyweb.reader_writer import ReaderWriter
+
+GroupResult = Dict[ReaderWriter, Optional[WebIOConnectionError]]
+
+
+class ScanResult(NamedTuple):
+    reads: GroupResult
+    writes: GroupResult
+
+
+class WebIOModuleGroup:
+
+    def __init__(self, modules: Iterable[ReaderWriter] = None, max_workers: int = 8, timeout: float = None):
+        """
+        :param modules: The modules (or any ReaderWriter) to be scanned together.
+        :param max_workers: The upper bound on the number of requests in flight at once.
+        :param timeout: If given, overrides the timeout of each module for calls made through the group.
+        """
+        self._modules = list(modules) if modules is not None else []    # type: List[ReaderWriter]
+        self._max_workers = max(1, int(max_workers))
+        self._pool = None       # type: Optional[ThreadPoolExecutor]
+        self.timeout = timeout
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __iter__(self):
+        return iter(self._modules)
+
+    def __len__(self):
+        return len(self._modules)
+
+    @property
+    def modules(self) -> List[ReaderWriter]:
+        return list(self._modules)
+
+    def add(self, module: ReaderWriter):
+        self._modules.append(module)
+
+    def remove(self, module: ReaderWriter):
+        self._modules.remove(module)
+
+    def close(self):
+        """ Shuts down the worker threads. The group may still be used afterwards, a new pool is started on demand."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def _map(self, action: Callable[[ReaderWriter], None]) -> GroupResult:
+        """ Runs the action against every module in parallel, collecting connection errors per module. Any other
+        exception is raised once all modules have completed."""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="webio-group")
+        futures = [(module, self._pool.submit(action, module)) for module in self._modules]
+        results = dict()     # type: GroupResult
+        error = None
+        for module, future in futures:
+            try:
+                future.result()
+                results[module] = None
+            except WebIOConnectionError as ex:
+                results[module] = ex
+            except Exception as ex:
+                error = error or ex
+        if error is not None:
+            raise error
+        return results
+
+    def update_from_hardware(self, timeout: float = None) -> GroupResult:
+        """ Reads all modules concurrently. Returns a dictionary of module to None on success, or to the
+        WebIOConnectionError that was raised on failure."""
+        timeout = self.timeout if timeout is None else timeout
+        return self._map(lambda module: module.update_from_hardware(timeout))
+
+    def send_changes_to_hardware(self, timeout: float = None) -> GroupResult:
+        """ Sends the pending changes of all modules concurrently. Returns the same form as update_from_hardware."""
+        timeout = self.timeout if timeout is None else timeout
+        return self._map(lambda module: module.send_changes_to_hardware(timeout))
+
+    def sync_with_hardware(self, timeout: float = None) -> GroupResult:
+        """ Sends the pending changes of all modules and reads back their state, one round trip per module, all
+        concurrently. Returns the same form as update_from_hardware."""
+        timeout = self.timeout if timeout is None else timeout
+        return self._map(lambda module: module.sync_with_hardware(timeout))
+
+    def scan(self, logic: Callable[['WebIOModuleGroup'], None] = None, timeout: float = None) -> ScanResult:
+        """ Performs one full scan: reads every module, runs the (optional) logic, then writes every module."""
+        reads = self.update_from_hardware(timeout)
+        if logic is not None:
+            logic(self)
+        writes = self.send_changes_to_hardware(timeout)
+        return ScanResult(reads, writes)
+
+    @staticmethod
+    def failed(results: GroupResult) -> List[ReaderWriter]:
+        """ Returns the modules that failed in the given results"""
+        return [module for module, error in results.items() if error is not None]
@@ -0,0 +1,129 @@
+"""
+Module Write Pipeline
+The pieces used by the reader/writers to keep writes to a module under control:
+ - split_changes breaks a large set of changes into batches that each fit within a maximum url length, as the
+   changes are sent in the query string of a GET.
+ - RateLimiter spaces out the requests made to a module to a maximum rate.
+ - ImmediateWriteBatcher merges write_immediate calls made concurrently from several threads into one request.
+ - WriteStats counts what the pipeline did, including how many writes were coalesced.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Iterator, Optional
+from urllib.parse import urlencode
+
+
+def split_changes(url: str, changes: Dict[str, str], max_url_length: int = None) -> Iterator[Dict[str, str]]:
+    """ Yields the changes in batches whose request url (url?addr=val&...) is no longer than max_url_length. A
+    single change that does not fit on its own is still sent, in a batch of its own."""
+    if max_url_length is None or len(changes) == 0:
+        yield changes
+        return
+    budget = max_url_length - len(url) - 1
+    batch, used = dict(), 0
+    for addr, value in changes.items():
+        size = len(urlencode({addr: value})) + (1 if len(batch) > 0 else 0)
+        if len(batch) > 0 and used + size > budget:
+            yield batch
+            batch, used = dict(), 0
+            size -= 1
+        batch[addr] = value
+        used += size
+    yield batch
+
+
+class RateLimiter:
+
+    def __init__(self, max_rate: float = None):
+        """
+        :param max_rate: The maximum number of requests per second, None (or 0) for no limit.
+        """
+        self.interval = 1.0 / max_rate if max_rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """ Reserves the next slot, returning how long (in seconds) the caller must wait before using it"""
+        if self.interval == 0.0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+            return start - now
+
+    def wait(self) -> float:
+        """ Blocks until the next slot, returning the time waited"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class WriteStats:
+    __slots__ = ('writes', 'coalesced', 'suppressed', 'requests', 'batches', 'immediate_writes', 'immediate_merged',
+                 'throttled_time')
+
+    def __init__(self):
+        self.writes = 0                 # calls to write
+        self.coalesced = 0              # writes that replaced a pending change to the same address
+        self.suppressed = 0             # output writes skipped as duplicates, within a deadband or too soon
+        self.requests = 0               # write requests made to the module
+        self.batches = 0                # extra requests needed to keep within the maximum url length
+        self.immediate_writes = 0       # calls to write_immediate
+        self.immediate_merged = 0       # write_immediate calls that shared a request with another
+        self.throttled_time = 0.0       # total seconds spent waiting on the rate limit
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class _Batch:
+    __slots__ = ('items', 'callers', 'done', 'error')
+
+    def __init__(self):
+        self.items = dict()
+        self.callers = 0
+        self.done = False
+        self.error = None       # type: Optional[BaseException]
+
+
+class ImmediateWriteBatcher:
+    """ Merges concurrent immediate writes. The first caller to find no request in flight sends everything queued
+    so far on behalf of all callers; callers arriving while a request is in flight queue up for the next one. Every
+    caller returns once the request holding its items completes, and receives its error, if any."""
+
+    def __init__(self, send: Callable[..., None], stats: WriteStats = None):
+        self._send = send
+        self._stats = stats if stats is not None else WriteStats()
+        self._cond = threading.Condition()
+        self._open = _Batch()
+        self._in_flight = False
+
+    def write(self, items: Dict[str, str], *args):
+        """ Writes the items, along with any queued by other callers. Should this caller send the request, the
+        extra arguments are passed on to the send function."""
+        with self._cond:
+            batch = self._open
+            batch.items.update(items)
+            batch.callers += 1
+            self._stats.immediate_writes += 1
+            while not batch.done and (self._in_flight or batch is not self._open):
+                self._cond.wait()
+            leader = not batch.done
+            if leader:
+                self._open = _Batch()
+                self._in_flight = True
+                self._stats.immediate_merged += batch.callers - 1
+        if leader:
+            try:
+                self._send(batch.items, *args)
+            except BaseException as ex:
+                batch.error = ex
+            with self._cond:
+                batch.done = True
+                self._in_flight = False
+                self._cond.notify_all()
+        if batch.error is not None:
+            raise batch.error
@@ -14,6 +14,7 @@ setuptools.setup(
     url="https://github.com/washad/ControlPyWeb",
     packages=setuptools.find_packages(),
     install_requires=['wheel', 'requests', 'str2bool'],
+    extras_require={'historian': ['numpy']},
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
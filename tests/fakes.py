@@ -0,0 +1,52 @@
+"""
+The stand-in for the http session of a module shared by the tests, set on a module as its _req.
+"""
+
+import time
+
+
+class Response:
+    def __init__(self, state: dict, status_code: int = 200):
+        self.state = dict(state)
+        self.status_code = status_code
+        self.ok = status_code == 200
+
+    def json(self):
+        return self.state
+
+
+class FakeDevice:
+    """ Applies the query string of each request to its state, and replies with the full state"""
+
+    def __init__(self, state: dict = None, latency: float = 0.0):
+        self.state = dict(state or {})
+        self.latency = latency
+        self.error = None               # raised instead of replying, when set
+        self.status_code = 200
+        self.hold = None                # a threading.Event each request waits on (for up to 5s), when set
+        self.during_request = None      # called while each request is in flight, when set
+        self.requests = []              # the params of each request, None for a read
+
+    @property
+    def reads(self) -> int:
+        return sum(1 for params in self.requests if not params)
+
+    @property
+    def writes(self) -> list:
+        return [params for params in self.requests if params]
+
+    def get(self, url, params=None, timeout=None):
+        self.requests.append(dict(params) if params else None)
+        if self.latency:
+            time.sleep(self.latency)
+        if self.hold is not None:
+            self.hold.wait(5.0)
+        if self.error is not None:
+            raise self.error
+        self.state.update(params or {})
+        if self.during_request is not None:
+            self.during_request()
+        return Response(self.state, self.status_code)
+
+    def close(self):
+        pass
@@ -0,0 +1,103 @@
+from controlpyweb.analog_processing import AnalogProcessor, HIGH, LOW
+from controlpyweb.io_definitions.analog_io import AnalogIn
+from controlpyweb.io_definitions.discrete_io import DiscreteIn
+from controlpyweb.reader_writer import ReaderWriter
+from controlpyweb.webio_module import WebIOModule
+from assertpy import assert_that
+import json
+import math
+import unittest
+
+
+class Module(WebIOModule):
+    Level = AnalogIn("Level", "level1")
+    Temp = AnalogIn("Temp", "temperature1")
+    Button = DiscreteIn("Button", "device1DigitalInput1")
+
+
+def poll(module: Module, level, temp="20.0"):
+    module.loads(json.dumps({"level1": level, "temperature1": temp, "device1DigitalInput1": "0"}))
+
+
+class TestAnalogProcessing(unittest.TestCase):
+
+    def setUp(self):
+        self.module = Module("testme")
+        self.processor = AnalogProcessor()
+
+    def test_scaling_is_written_back_as_a_derived_value(self):
+        self.processor.add(self.module, "level1", scale=0.1, offset=-5.0)
+        poll(self.module, "1000")
+        self.processor.process()
+        assert_that(self.processor.value(self.module, "level1")).is_equal_to(95.0)
+        assert_that(self.module.read_value("level1_eu", float)).is_equal_to(95.0)
+        poll(self.module, "500")
+        assert_that(self.module.read_value("level1_eu", float)).is_equal_to(95.0)
+        self.processor.process()
+        assert_that(self.module.read_value("level1_eu", float)).is_equal_to(45.0)
+
+    def test_filter_and_deadband(self):
+        self.processor.add(self.module, "level1", alpha=0.5, deadband=1.5)
+        for level in ("10", "20", "20"):
+            poll(self.module, level)
+            self.processor.process()
+        assert_that(self.processor.value(self.module, "level1")).is_equal_to(17.5)
+        poll(self.module, "20")
+        self.processor.process()        # filtered 18.75, within the deadband of 17.5
+        assert_that(self.processor.value(self.module, "level1")).is_equal_to(17.5)
+
+    def test_missing_values_hold_the_filter(self):
+        self.processor.add(self.module, "level1", alpha=0.5)
+        self.processor.process()
+        assert_that(math.isnan(self.processor.value(self.module, "level1"))).is_true()
+        poll(self.module, "10")
+        self.processor.process()
+        self.module.loads(json.dumps({"temperature1": "1"}))
+        self.processor.process()
+        assert_that(self.processor.value(self.module, "level1")).is_equal_to(10.0)
+
+    def test_alarms_with_hysteresis(self):
+        self.processor.add(self.module, "level1", high=90.0, low=10.0, hysteresis=5.0)
+        poll(self.module, "95")
+        events = self.processor.process()
+        assert_that(events).is_length(1)
+        assert_that(events[0][1:4]).is_equal_to(("level1", HIGH, True))
+        poll(self.module, "88")
+        assert_that(self.processor.process()).is_empty()
+        assert_that(self.processor.alarms(self.module, "level1")).is_equal_to((True, False))
+        poll(self.module, "5")
+        events = self.processor.process()
+        assert_that([(e.limit, e.active) for e in events]).contains_only((HIGH, False), (LOW, True))
+        assert_that(self.processor.active_alarms()).is_equal_to([(self.module, "level1", LOW)])
+
+    def test_many_modules_keep_their_state(self):
+        other = Module("other")
+        self.processor.add_module(self.module, alpha=0.5)
+        poll(self.module, "10", "30")
+        self.processor.process()
+        self.processor.add_module(other)
+        poll(self.module, "20", "30")
+        poll(other, "7", "8")
+        self.processor.process()
+        assert_that(len(self.processor)).is_equal_to(4)
+        assert_that(self.processor.value(self.module, "level1")).is_equal_to(15.0)
+        assert_that(self.processor.value(other, "temperature1")).is_equal_to(8.0)
+        self.processor.remove_module(self.module)
+        self.processor.process()
+        assert_that(len(self.processor)).is_equal_to(2)
+        assert_that(other.read_value("level1_eu", float)).is_equal_to(7.0)
+
+
+    def test_undeclared_addresses_are_registered(self):
+        reader = ReaderWriter("plain")
+        self.processor.add(self.module, "level2", scale=2.0)
+        self.processor.add(reader, "level1")
+        self.module.loads(json.dumps({"level1": "1", "level2": "4"}))
+        reader.loads(json.dumps({"level1": "3"}))
+        self.processor.process()
+        assert_that(self.processor.value(self.module, "level2")).is_equal_to(8.0)
+        assert_that(self.processor.value(reader, "level1")).is_equal_to(3.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
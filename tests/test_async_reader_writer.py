@@ -0,0 +1,113 @@
+from controlpyweb.async_webio_module import AsyncWebIOModule
+from controlpyweb.errors import WebIOConnectionError
+from controlpyweb.io_definitions.analog_io import AnalogOut
+from controlpyweb.io_definitions.discrete_io import DiscreteIn, DiscreteOut
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+from assertpy import assert_that
+import asyncio
+import json
+import threading
+import time
+import unittest
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = dict()
+    connections = set()
+    delay = 0.0
+
+    def do_GET(self):
+        Handler.connections.add(self.client_address)
+        Handler.state.update(parse_qsl(urlsplit(self.path).query))
+        body = json.dumps(Handler.state).encode()
+        time.sleep(Handler.delay)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Module(AsyncWebIOModule):
+    Button1 = DiscreteIn("Button1", "device1DigitalInput1")
+    Lamp1 = DiscreteOut("Lamp1", "redLamp")
+    Temp1 = AnalogOut("Temp1", "temperature1")
+
+
+class TestAsyncReaderWriter(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = "127.0.0.1:{}".format(cls.server.server_address[1])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        Handler.state.clear()
+        Handler.state.update({"device1DigitalInput1": "1", "redLamp": "0", "temperature1": "72.5"})
+        Handler.connections.clear()
+        Handler.delay = 0.0
+
+    def test_update_and_send_changes(self):
+        async def scan():
+            async with Module(self.url) as module:
+                await module.update_from_hardware()
+                assert_that(module.Button1.value).is_true()
+                assert_that(module.Temp1.value).is_equal_to(72.5)
+                module.Lamp1 = True
+                module.Temp1 = 80
+                await module.send_changes_to_hardware()
+                assert_that(module.changes).is_empty()
+                await module.update_from_hardware()
+                assert_that(module.Lamp1.value).is_true()
+        asyncio.run(scan())
+        assert_that(Handler.state["redLamp"]).is_equal_to("1")
+        assert_that(Handler.state["temperature1"]).is_equal_to("80.0")
+        assert_that(Handler.connections).is_length(1)
+
+    def test_immediate_reads_and_writes(self):
+        async def immediate():
+            async with Module(self.url) as module:
+                await module.Lamp1.write_immediate(True)
+                return await module.Lamp1.read_immediate(), await module.read_immediate("temperature1")
+        lamp, temp = asyncio.run(immediate())
+        assert_that(lamp).is_true()
+        assert_that(temp).is_equal_to("72.5")
+
+    def test_cancelled_request_does_not_leave_its_reply_to_the_next(self):
+        async def scan():
+            async with Module(self.url) as module:
+                Handler.delay = 0.2
+                with self.assertRaises(asyncio.TimeoutError):
+                    await asyncio.wait_for(module.update_from_hardware(), 0.05)
+                Handler.delay = 0.0
+                Handler.state["temperature1"] = "80.0"
+                await module.update_from_hardware()
+                return module.Temp1.value
+        assert_that(asyncio.run(scan())).is_equal_to(80.0)
+
+    def test_many_modules_on_one_loop(self):
+        async def scan_all():
+            modules = [Module(self.url) for _ in range(20)]
+            await asyncio.gather(*[m.update_from_hardware() for m in modules])
+            await asyncio.gather(*[m.close() for m in modules])
+            return modules
+        modules = asyncio.run(scan_all())
+        assert_that([m.read("redLamp") for m in modules]).contains_only("0")
+
+    def test_unreachable_module_raises_connection_error(self):
+        async def read():
+            async with Module("127.0.0.1:1", timeout=1) as module:
+                await module.update_from_hardware()
+        with self.assertRaises(WebIOConnectionError):
+            asyncio.run(read())
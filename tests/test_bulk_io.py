@@ -0,0 +1,78 @@
+from controlpyweb.errors import ControlPyWebAddressNotFoundError, ControlPyWebReadOnlyError
+from controlpyweb.io_definitions.analog_io import AnalogIn, AnalogOut
+from controlpyweb.io_definitions.discrete_io import DiscreteIn, DiscreteOut
+from controlpyweb.reader_writer import ARRAY, TUPLE
+from controlpyweb.webio_module import WebIOModule
+from tests.fakes import FakeDevice
+from assertpy import assert_that
+import math
+import unittest
+
+
+STATE = {"device1DigitalInput1": "1", "temperature1": "72.5", "redLamp": "0", "register1": "1.0",
+         "serialNumber": "00:0C"}
+
+
+class Module(WebIOModule):
+    Button1 = DiscreteIn("Button1", "device1DigitalInput1")
+    Temp1 = AnalogIn("Temp1", "temperature1")
+    Lamp1 = DiscreteOut("Lamp1", "redLamp")
+    Setpoint = AnalogOut("Setpoint", "register1", deadband=0.5)
+    Missing = AnalogIn("Missing", "notThere", default=-1.0)
+
+
+class TestBulkIO(unittest.TestCase):
+
+    def setUp(self):
+        self.device = FakeDevice(STATE)
+        self.module = Module("testme", demand_address_exists=False)
+        self.module._req = self.device
+        self.module.update_from_hardware()
+
+    def test_read_many(self):
+        module = self.module
+        values = module.read_many([module.Temp1, "Button1", "redLamp", "serialNumber", module.Missing])
+        assert_that(values).is_equal_to({"Temp1": 72.5, "Button1": True, "redLamp": False, "serialNumber": "00:0C",
+                                         "Missing": -1.0})
+        assert_that(module.read_many(["Temp1", "Setpoint"], TUPLE)).is_equal_to((72.5, 1.0))
+        array = module.read_many(["Temp1", "Button1", "notThere"], ARRAY)
+        assert_that(array.tolist()).is_equal_to([72.5, 1.0, -1.0])
+        self.assertRaises(ValueError, module.read_many, ["Temp1"], "list")
+
+    def test_read_many_of_addresses(self):
+        values = self.module._read_many(["temperature1", "serialNumber", "other"], [None, None, None])
+        assert_that(values).is_equal_to([72.5, "00:0C", None])
+        array = super(Module, self.module).read_many(["temperature1", "other"], into=ARRAY)
+        assert_that(array[0]).is_equal_to(72.5)
+        assert_that(math.isnan(array[1])).is_true()
+
+    def test_read_many_demands_addresses(self):
+        self.module.demand_address_exists = True
+        self.assertRaises(ControlPyWebAddressNotFoundError, self.module.read_many, ["Temp1", "Missing"])
+
+    def test_write_many(self):
+        module = self.module
+        module.write_many([(module.Lamp1, True), ("Setpoint", 4.0), ("register2", 7)])
+        assert_that(module.changes).is_equal_to({"redLamp": "1", "register1": "4.0", "register2": "7"})
+        module.send_changes_to_hardware()
+        assert_that(self.device.requests[-1]).is_equal_to({"redLamp": "1", "register1": "4.0", "register2": "7"})
+
+    def test_write_many_skips_what_writes_would(self):
+        module = self.module
+        module.write_many({"Lamp1": False, "register1": 1.2})
+        assert_that(module.changes).is_empty()
+        assert_that(module.write_stats.suppressed).is_equal_to(2)
+        self.assertRaises(ControlPyWebReadOnlyError, module.write_many, {"Temp1": 1.0})
+
+    def test_write_many_immediately(self):
+        module = self.module
+        module.write_many({"Lamp1": True, "Setpoint": 4.0}, immediate=True)
+        assert_that(self.device.requests[-1]).is_equal_to({"redLamp": "1", "register1": "4.0"})
+        assert_that(module.changes).is_empty()
+        requests = len(self.device.requests)
+        module.write_many({"Lamp1": True}, immediate=True)
+        assert_that(self.device.requests).is_length(requests)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+from controlpyweb import reader_writer
+from controlpyweb.async_webio_module import AsyncWebIOModule
+from controlpyweb.circuit_breaker import CircuitBreaker, CLOSED, HALF_OPEN, OPEN
+from controlpyweb.errors import WebIOCircuitOpenError, WebIOConnectionError
+from controlpyweb.io_definitions.discrete_io import DiscreteOut
+from controlpyweb.webio_module import WebIOModule
+from tests.fakes import FakeDevice
+from assertpy import assert_that
+import asyncio
+import time
+import unittest
+
+
+UNREACHABLE = reader_writer.requests.exceptions.ConnectTimeout("unreachable")
+
+
+class Module(WebIOModule):
+    Lamp = DiscreteOut("Lamp", "redLamp")
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker(failure_threshold=2, backoff=10)
+        assert_that(breaker.record_failure()).is_false()
+        assert_that(breaker.allow()).is_true()
+        assert_that(breaker.record_failure()).is_true()
+        assert_that(breaker.state).is_equal_to(OPEN)
+        assert_that(breaker.allow()).is_false()
+        assert_that(breaker.retry_in).is_greater_than(9)
+
+    def test_inline_probe_after_backoff(self):
+        breaker = CircuitBreaker(failure_threshold=1, backoff=0.0)
+        breaker.record_failure()
+        assert_that(breaker.allow()).is_true()
+        assert_that(breaker.state).is_equal_to(HALF_OPEN)
+        assert_that(breaker.allow()).is_false()
+        breaker.record_success()
+        assert_that(breaker.state).is_equal_to(CLOSED)
+
+    def test_backoff_grows_to_maximum(self):
+        breaker = CircuitBreaker(failure_threshold=1, backoff=1.0, max_backoff=3.0)
+        for _ in range(4):
+            breaker.record_failure()
+        assert_that(breaker.retry_in).is_less_than_or_equal_to(3.0)
+        assert_that(breaker.retry_in).is_greater_than(2.0)
+        assert_that(breaker.opened_count).is_equal_to(1)
+
+    def test_no_threshold_never_opens(self):
+        breaker = CircuitBreaker(failure_threshold=None)
+        for _ in range(10):
+            breaker.record_failure()
+        assert_that(breaker.is_closed).is_true()
+
+
+class TestModuleCircuit(unittest.TestCase):
+
+    def setUp(self):
+        self.device = FakeDevice({"redLamp": "1"})
+        self.module = Module("testme", failure_threshold=2, probe_backoff=0.01)
+        self.module._req = self.device
+        self.module.update_from_hardware()
+
+    def tearDown(self):
+        self.module.close()
+
+    def test_fails_fast_once_open(self):
+        self.device.error = UNREACHABLE
+        for _ in range(2):
+            self.assertRaises(WebIOConnectionError, self.module.update_from_hardware)
+        self.module._closed.set()       # keep the background probe from running
+        requests = len(self.device.requests)
+        self.assertRaises(WebIOCircuitOpenError, self.module.update_from_hardware)
+        assert_that(len(self.device.requests)).is_equal_to(requests)
+        assert_that(self.module.is_stale).is_true()
+        assert_that(self.module.health["state"]).is_equal_to(OPEN)
+
+    def test_last_image_served_while_open(self):
+        self.device.error = UNREACHABLE
+        for _ in range(2):
+            self.assertRaises(WebIOConnectionError, self.module.update_from_hardware)
+        assert_that(self.module.Lamp.value).is_true()
+
+    def test_background_probe_recovers(self):
+        self.device.error = UNREACHABLE
+        for _ in range(2):
+            self.assertRaises(WebIOConnectionError, self.module.update_from_hardware)
+        self.device.state["redLamp"] = "0"
+        self.device.error = None
+        deadline = time.monotonic() + 2.0
+        while self.module.is_stale and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert_that(self.module.is_stale).is_false()
+        assert_that(self.module.Lamp.value).is_false()
+        self.module.update_from_hardware()
+
+    def wait_for_probes(self, count: int):
+        deadline = time.monotonic() + 2.0
+        while len(self.device.requests) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_probe_survives_other_request_errors(self):
+        self.device.error = UNREACHABLE
+        for _ in range(2):
+            self.assertRaises(WebIOConnectionError, self.module.update_from_hardware)
+        self.device.error = reader_writer.requests.exceptions.ChunkedEncodingError("cut short")
+        self.wait_for_probes(len(self.device.requests) + 2)
+        assert_that(self.module.is_stale).is_true()
+        self.device.error = None
+        deadline = time.monotonic() + 2.0
+        while self.module.is_stale and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert_that(self.module.is_stale).is_false()
+
+    def test_probe_answered_with_an_error_status_fails(self):
+        self.device.error = UNREACHABLE
+        for _ in range(2):
+            self.assertRaises(WebIOConnectionError, self.module.update_from_hardware)
+        self.device.error = None
+        self.device.status_code = 503
+        self.wait_for_probes(len(self.device.requests) + 2)
+        assert_that(self.module.is_stale).is_true()
+        assert_that(self.module.Lamp.value).is_true()
+        self.device.status_code = 200
+        self.device.state["redLamp"] = "0"
+        deadline = time.monotonic() + 2.0
+        while self.module.is_stale and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert_that(self.module.Lamp.value).is_false()
+
+
+class AsyncModule(AsyncWebIOModule):
+    Lamp = DiscreteOut("Lamp", "redLamp")
+
+
+class AsyncConnection:
+    """ Stands in for the http connection of an async module, replying (or failing) as told"""
+
+    def __init__(self):
+        self.error = None
+        self.hang = False
+
+    async def get(self, params=None, timeout=None):
+        if self.hang:
+            await asyncio.sleep(10.0)
+        if self.error is not None:
+            raise self.error
+        return b'{"redLamp": "1"}'
+
+    async def close(self):
+        pass
+
+
+class TestAsyncModuleCircuit(unittest.TestCase):
+
+    def test_cancelled_probe_reopens_the_circuit(self):
+        async def scan():
+            module = AsyncModule("testme", failure_threshold=2, probe_backoff=0.01)
+            module._http = connection = AsyncConnection()
+            connection.error = WebIOConnectionError("down")
+            for _ in range(2):
+                with self.assertRaises(WebIOConnectionError):
+                    await module.update_from_hardware()
+            await asyncio.sleep(0.02)
+            connection.error, connection.hang = None, True
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(module.update_from_hardware(), 0.05)
+            assert_that(module.health["state"]).is_equal_to(OPEN)
+            connection.hang = False
+            await asyncio.sleep(0.05)
+            await module.update_from_hardware()
+            return module
+        module = asyncio.run(scan())
+        assert_that(module.health["state"]).is_equal_to(CLOSED)
+        assert_that(module.Lamp.value).is_true()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+from controlpyweb.reader_writer import ReaderWriter
+from assertpy import assert_that
+import threading
+import unittest
+
+
+class BlockingSession:
+    """ A session whose get call blocks until released, so tests can act while a request is in flight"""
+
+    def __init__(self):
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def get(self, url, params=None, timeout=None):
+        self.entered.set()
+        self.release.wait(5)
+        return None
+
+
+class TestConcurrency(unittest.TestCase):
+
+    def setUp(self):
+        self.session = BlockingSession()
+        self.slow = ReaderWriter("slow")
+        self.slow._req = self.session
+        self.fast = ReaderWriter("fast")
+        self.fast.loads('{"relay1": "1"}')
+
+    def tearDown(self):
+        self.session.release.set()
+
+    def _in_flight(self, target):
+        t = threading.Thread(target=target, daemon=True)
+        t.start()
+        assert_that(self.session.entered.wait(5)).is_true()
+        return t
+
+    def test_slow_module_does_not_block_other_modules(self):
+        self._in_flight(self.slow.update_from_hardware)
+        assert_that(self.fast.read("relay1")).is_equal_to("1")
+        self.fast.write("relay1", False)
+        assert_that(self.fast.changes).is_equal_to({"relay1": "0"})
+
+    def test_slow_module_can_be_written_while_request_in_flight(self):
+        self.slow.loads('{"relay1": "0"}')
+        t = self._in_flight(self.slow.update_from_hardware)
+        self.slow.write("relay1", True)
+        assert_that(self.slow.read("relay1")).is_equal_to("0")
+        self.session.release.set()
+        t.join(5)
+
+    def test_writes_made_during_send_are_kept(self):
+        self.slow.write("relay1", True)
+        self.slow.write("relay2", True)
+        t = self._in_flight(self.slow.send_changes_to_hardware)
+        self.slow.write("relay2", False)
+        self.slow.write("relay3", True)
+        self.session.release.set()
+        t.join(5)
+        assert_that(self.slow.changes).is_equal_to({"relay2": "0", "relay3": "1"})
@@ -0,0 +1,154 @@
+from controlpyweb.async_webio_module import AsyncWebIOModule
+from controlpyweb.errors import WebIOStaleImageError
+from controlpyweb.io_definitions.analog_io import AnalogIn, AnalogOut
+from controlpyweb.refresher import Refresher
+from controlpyweb.simulator import DeviceSimulator
+from controlpyweb.webio_module import WebIOModule
+from tests.fakes import FakeDevice
+from assertpy import assert_that
+import asyncio
+import os
+import requests
+import tempfile
+import time
+import unittest
+
+
+STATE = {"temperature1": "70.0", "register1": "1.0"}
+
+
+class Module(WebIOModule):
+    Temp1 = AnalogIn("Temp1", "temperature1")
+    Setpoint = AnalogOut("Setpoint", "register1")
+
+
+class AsyncModule(AsyncWebIOModule):
+    Temp1 = AnalogIn("Temp1", "temperature1")
+
+
+class TestFreshness(unittest.TestCase):
+
+    def setUp(self):
+        self.device = FakeDevice(STATE)
+        self.module = Module("testme", max_age=10.0, failure_threshold=None)
+        self.module._req = self.device
+
+    def age(self, seconds: float):
+        """ Makes the image seconds old"""
+        self.module._last_hardware_read_time = time.time() - seconds
+
+    def test_fresh_reads_are_served_from_the_image(self):
+        assert_that(self.module.is_fresh()).is_false()
+        assert_that(self.module.Temp1.value).is_equal_to(70.0)
+        assert_that(self.device.requests).is_length(1)
+        self.device.state["temperature1"] = "75.0"
+        assert_that(self.module.Temp1.value).is_equal_to(70.0)
+        assert_that(self.module.read("temperature1")).is_equal_to("70.0")
+        assert_that(self.device.requests).is_length(1)
+
+    def test_stale_reads_refresh_the_image(self):
+        self.module.update_from_hardware()
+        self.device.state["temperature1"] = "75.0"
+        self.age(11.0)
+        assert_that(self.module.is_fresh()).is_false()
+        assert_that(self.module.Temp1.value).is_equal_to(75.0)
+        assert_that(self.module.is_fresh()).is_true()
+        self.age(2.0)
+        self.device.state["temperature1"] = "80.0"
+        assert_that(self.module.read("temperature1", max_age=1.0)).is_equal_to("80.0")
+        assert_that(self.module.read_stats.refreshes).is_equal_to(2)
+
+    def test_refresh_keeps_pending_changes(self):
+        self.module.update_from_hardware()
+        self.module.Setpoint = 5.0
+        self.age(11.0)
+        self.module.Temp1.value
+        assert_that(self.module.changes).is_equal_to({"register1": "5.0"})
+
+    def test_stale_image_that_cannot_be_refreshed(self):
+        self.module.update_from_hardware()
+        self.age(11.0)
+        self.device.error = requests.exceptions.ConnectionError("down")
+        self.assertRaises(WebIOStaleImageError, self.module.read, "temperature1")
+        self.module.serve_stale = True
+        assert_that(self.module.read("temperature1")).is_equal_to("70.0")
+        assert_that(self.module.Temp1.value).is_equal_to(70.0)
+        assert_that(self.module.read_stats.stale_reads).is_greater_than(2)
+
+    def test_freshness_is_checked_once_per_value(self):
+        self.module.update_from_hardware()
+        self.age(11.0)
+        count = len(self.device.requests)
+        io = self.module.Temp1
+        assert_that(self.device.requests).is_length(count)
+        io.value
+        assert_that(self.device.requests).is_length(count + 1)
+        self.age(11.0)
+        self.device.error = requests.exceptions.ConnectionError("down")
+        self.module.serve_stale = True
+        self.module.Temp1.value
+        assert_that(self.module.read_stats.stale_reads).is_equal_to(1)
+
+    def test_shared_image_whose_publisher_stopped_is_stale(self):
+        self.module.update_from_hardware()
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "module.image")
+            self.module.share_image(path)
+            # the last image published, 100s ago, before the publisher stopped
+            self.module._store_hardware_read(dict(self.device.state), read_time=time.time() - 100.0)
+            reader = Module("testme", max_age=1.0)
+            reader.attach_shared_image(path)
+            self.assertRaises(WebIOStaleImageError, reader.read, "temperature1")
+            assert_that(reader.read_stats.stale_reads).is_equal_to(1)
+            reader.shared_image.close()
+            self.module.shared_image.close()
+
+    def test_refresher_refreshes_modules_when_due(self):
+        other = Module("other", max_age=100.0)
+        other._req = FakeDevice(STATE)
+        refresher = Refresher([self.module, other], margin=0.5)
+        assert_that(refresher.run_once()).is_length(2)
+        assert_that(refresher.run_once()).is_empty()
+        self.age(6.0)
+        assert_that(list(refresher.run_once())).is_equal_to([self.module])
+        self.age(6.0)
+        self.device.error = requests.exceptions.ConnectionError("down")
+        assert_that(refresher.run_once()[self.module]).is_not_none()
+        assert_that(refresher.run_once()).is_empty()       # not retried until its budget has passed again
+        assert_that(refresher.errors).is_equal_to(1)
+        refresher.stop()
+
+    def test_refresher_survives_other_errors(self):
+        self.device.error = ZeroDivisionError()
+        refresher = Refresher([self.module])
+        assert_that(refresher.run_once()[self.module]).is_instance_of(ZeroDivisionError)
+        assert_that(refresher.errors).is_equal_to(1)
+        refresher.stop()
+
+    def test_refresher_keeps_images_within_their_budget(self):
+        self.module.max_age = 0.2
+        with Refresher([self.module]):
+            time.sleep(0.5)
+            assert_that(self.module.image_age).is_less_than_or_equal_to(0.2)
+        assert_that(len(self.device.requests)).is_greater_than_or_equal_to(3)
+
+    def test_modules_need_a_max_age(self):
+        self.assertRaises(ValueError, Refresher, [Module("testme")])
+
+    def test_async_stale_reads_refresh_in_the_background(self):
+        with DeviceSimulator() as simulator:
+            simulator.add_module("", {"temperature1": "70.0"})
+
+            async def read():
+                async with AsyncModule(simulator.url(), max_age=10.0) as module:
+                    with self.assertRaises(WebIOStaleImageError):
+                        module.Temp1.value
+                    await asyncio.sleep(0)
+                    await module._refreshing
+                    return module.Temp1.value
+
+            assert_that(asyncio.run(read())).is_equal_to(70.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
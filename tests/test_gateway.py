@@ -0,0 +1,128 @@
+from controlpyweb.gateway import Gateway, GatewayClient
+from controlpyweb.errors import WebIOConnectionError
+from controlpyweb.io_definitions.analog_io import AnalogIn
+from controlpyweb.io_definitions.discrete_io import DiscreteOut
+from controlpyweb.webio_module import WebIOModule
+from tests.fakes import FakeDevice
+from assertpy import assert_that
+import os
+import tempfile
+import threading
+import unittest
+
+
+STATE = {"temperature1": "70.0", "relay1": "0", "relay2": "0"}
+
+
+class Module(WebIOModule):
+    Temp1 = AnalogIn("Temp1", "temperature1")
+    Relay1 = DiscreteOut("Relay1", "relay1")
+    Relay2 = DiscreteOut("Relay2", "relay2")
+
+
+class TestGateway(unittest.TestCase):
+
+    def setUp(self):
+        self.device = FakeDevice(STATE)
+        polled = Module("testme")
+        polled._req = self.device
+        self.gateway = Gateway([polled], period=3600)
+        self.gateway.start(scan=False)
+        self.clients = [GatewayClient(self.gateway.address, timeout=5.0) for _ in range(3)]
+
+    def tearDown(self):
+        for client in self.clients:
+            client.close()
+        self.gateway.stop()
+
+    def test_reads_are_served_from_the_gateway(self):
+        modules = [client.attach(Module("testme")) for client in self.clients]
+        self.assertRaises(WebIOConnectionError, modules[0].update_from_hardware)
+        self.gateway.run_once()
+        for module in modules:
+            module.update_from_hardware()
+            assert_that(module.Temp1.value).is_equal_to(70.0)
+        assert_that(self.device.reads).is_equal_to(1)
+
+    def test_reads_keep_the_time_the_gateway_read_them(self):
+        module = self.clients[0].attach(Module("testme"))
+        self.gateway.run_once()
+        polled = self.gateway.modules[module.url]
+        polled._last_hardware_read_time -= 100.0
+        module.update_from_hardware()
+        assert_that(module.last_hardware_read_time).is_equal_to(polled.last_hardware_read_time)
+        assert_that(module.is_fresh(10.0)).is_false()
+
+    def test_reads_are_refused_once_the_scan_stops(self):
+        module = self.clients[0].attach(Module("testme"))
+        self.gateway.start()
+        self.gateway.run_once()
+        module.update_from_hardware()
+        self.gateway.scheduler.stop()
+        self.assertRaises(WebIOConnectionError, module.update_from_hardware)
+
+    def test_writes_are_merged_into_one_per_cycle(self):
+        self.gateway.run_once()
+        modules = [client.attach(Module("testme")) for client in self.clients]
+        modules[0].Relay1 = True
+        modules[1].Relay2 = True
+        modules[2].Relay1 = True
+        for module in modules:
+            module.send_changes_to_hardware()
+        assert_that(self.device.writes).is_empty()
+        self.gateway.run_once()
+        assert_that(self.device.writes).is_equal_to([{"relay1": "1", "relay2": "1"}])
+        assert_that(self.gateway.client_writes).is_equal_to(3)
+
+    def test_watched_modules_are_pushed_changes(self):
+        changed = threading.Event()
+        calls = []
+        module = self.clients[0].watch(Module("testme"))
+        module.subscribe("temperature1", lambda addr, old, new: (calls.append(new), changed.set()))
+        self.gateway.run_once()
+        assert_that(changed.wait(5.0)).is_true()
+        changed.clear()
+        self.device.state["temperature1"] = "72.0"
+        self.gateway.run_once()
+        assert_that(changed.wait(5.0)).is_true()
+        assert_that(calls).is_equal_to([70.0, 72.0])
+        assert_that(module.Temp1.value).is_equal_to(72.0)
+        assert_that(module.last_hardware_read_time).is_equal_to(self.gateway.modules[module.url].last_hardware_read_time)
+
+    def test_raising_subscribers_do_not_end_the_connection(self):
+        errors = []
+        client = GatewayClient(self.gateway.address, timeout=5.0, on_error=lambda c, ex: errors.append(ex))
+        self.clients.append(client)
+        module = client.watch(Module("testme"))
+        module.subscribe("temperature1", lambda addr, old, new: 1 / 0)
+        module.subscribe("relay1", lambda addr, old, new: int("not a number"))
+        self.gateway.run_once()
+        module.update_from_hardware()       # replied in order, so after the push
+        assert_that(module.Temp1.value).is_equal_to(70.0)
+        assert_that(client.push_errors).is_equal_to(1)
+        assert_that(errors).is_length(1)
+        assert_that(client.last_error).is_instance_of(ZeroDivisionError)
+        self.device.state["relay1"] = "1"
+        self.gateway.run_once()
+        module.update_from_hardware()
+        assert_that(client.last_error).is_instance_of(ValueError)
+        assert_that(module.Relay1.value).is_true()
+
+    def test_unknown_modules_are_refused(self):
+        self.assertRaises(ValueError, self.clients[0].watch, Module("elsewhere"))
+
+    def test_over_a_unix_socket(self):
+        path = os.path.join(tempfile.mkdtemp(), "webio.sock")
+        polled = Module("testme")
+        polled._req = self.device
+        with Gateway([polled], period=3600, address=path) as gateway:
+            with GatewayClient(path) as client:
+                gateway.run_once()
+                module = client.attach(Module("testme"))
+                module.update_from_hardware()
+                assert_that(module.Temp1.value).is_equal_to(70.0)
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+from controlpyweb.historian import Historian, MAX, MIN
+from controlpyweb.io_definitions.analog_io import AnalogIn
+from controlpyweb.io_definitions.discrete_io import DiscreteIn
+from controlpyweb.webio_module import WebIOModule
+from tests.fakes import FakeDevice
+from assertpy import assert_that
+import math
+import unittest
+
+
+STATE = {"temperature1": "70.0", "device1DigitalInput1": "0", "serialNumber": "00:0C"}
+
+
+class Module(WebIOModule):
+    Temp1 = AnalogIn("Temp1", "temperature1")
+    Button1 = DiscreteIn("Button1", "device1DigitalInput1")
+
+
+class TestHistorian(unittest.TestCase):
+
+    def setUp(self):
+        self.historian = Historian(capacity=5, resolutions=((10, 3),))
+        self.historian.set_addresses(["a", "b"])
+
+    def record(self, times):
+        for t in times:
+            self.historian.record(t, {"a": float(t), "b": t % 2 == 0})
+
+    def test_ring_keeps_the_last_polls(self):
+        self.record(range(8))
+        times, values = self.historian.window("a")
+        assert_that(times.tolist()).is_equal_to([3, 4, 5, 6, 7])
+        assert_that(values.tolist()).is_equal_to([3, 4, 5, 6, 7])
+        times, values = self.historian.last("b", 2)
+        assert_that(values.tolist()).is_equal_to([1.0, 0.0])
+
+    def test_memory_is_fixed(self):
+        self.record(range(10))
+        size = self.historian.nbytes
+        self.record(range(10, 1000))
+        assert_that(self.historian.nbytes).is_equal_to(size)
+
+    def test_window_and_stats(self):
+        self.record(range(5))
+        times, values = self.historian.window("a", start=1, end=3)
+        assert_that(values.tolist()).is_equal_to([1, 2, 3])
+        assert_that(self.historian.stats("a", start=1, end=3)).is_equal_to(dict(min=1.0, max=3.0, mean=2.0, count=3))
+
+    def test_missing_values_are_nan(self):
+        self.historian.record(1.0, {"a": None, "b": "not a number"})
+        self.historian.record(2.0, {"a": 4.0})
+        assert_that(math.isnan(self.historian.last("a", 2)[1][0])).is_true()
+        assert_that(self.historian.stats("a")["count"]).is_equal_to(1)
+
+    def test_resample(self):
+        self.record([0, 1, 2, 3, 4])
+        times, values = self.historian.resample("a", 2)
+        assert_that(times.tolist()).is_equal_to([0, 2, 4])
+        assert_that(values.tolist()).is_equal_to([0.5, 2.5, 4.0])
+        times, values = self.historian.resample("a", 2, how=MAX)
+        assert_that(values.tolist()).is_equal_to([1, 3, 4])
+
+    def test_downsampled_history_outlives_the_raw_polls(self):
+        self.record(range(40))
+        self.historian.flush()
+        assert_that(self.historian.window("a")[0].tolist()).is_equal_to([35, 36, 37, 38, 39])
+        times, means = self.historian.window("a", resolution=10)
+        assert_that(times.tolist()).is_equal_to([10, 20, 30])
+        assert_that(means.tolist()).is_equal_to([14.5, 24.5, 34.5])
+        assert_that(self.historian.window("a", resolution=10, kind=MIN)[1].tolist()).is_equal_to([10, 20, 30])
+        assert_that(self.historian.stats("a", resolution=10)).is_equal_to(dict(min=10.0, max=39.0, mean=24.5,
+                                                                                count=30))
+        self.assertRaises(ValueError, self.historian.window, "a", resolution=60)
+
+    def test_attached_to_a_module(self):
+        device = FakeDevice(STATE)
+        module = Module("testme")
+        module._req = device
+        module.attach_historian(self.historian)
+        assert_that(self.historian.addresses).contains_only("temperature1", "device1DigitalInput1")
+        for temp in ("70.0", "71.5", "73.0"):
+            device.state["temperature1"] = temp
+            module.update_from_hardware()
+        times, values = self.historian.window("temperature1")
+        assert_that(values.tolist()).is_equal_to([70.0, 71.5, 73.0])
+        assert_that(times[-1]).is_equal_to(module.last_hardware_read_time)
+        module.attach_historian(None)
+        module.update_from_hardware()
+        assert_that(self.historian.window("temperature1")[1]).is_length(3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+from controlpyweb.async_webio_module import AsyncWebIOModule
+from controlpyweb.errors import WebIOConnectionError
+from controlpyweb.io_definitions.analog_io import AnalogIn
+from controlpyweb.io_definitions.discrete_io import DiscreteIn
+from controlpyweb.simulator import DeviceSimulator
+from controlpyweb.webio_module import WebIOModule
+from tests.fakes import FakeDevice
+from assertpy import assert_that
+import asyncio
+import requests
+import threading
+import unittest
+
+STATE = {"device1DigitalInput1": "1", "temperature1": "72.5", "temperature2": "60.0"}
+
+
+class Module(WebIOModule):
+    Button1 = DiscreteIn("Button1", "device1DigitalInput1")
+    Temp1 = AnalogIn("Temp1", "temperature1")
+    Temp2 = AnalogIn("Temp2", "temperature2")
+
+
+class AsyncModule(AsyncWebIOModule):
+    Temp1 = AnalogIn("Temp1", "temperature1")
+    Temp2 = AnalogIn("Temp2", "temperature2")
+
+
+class TestImmediateReads(unittest.TestCase):
+
+    def setUp(self):
+        self.device = FakeDevice(STATE)
+        self.device.hold = threading.Event()       # every request is held until released
+        self.module = Module("testme")
+        self.module._req = self.device
+
+    def read_concurrently(self, ios: list) -> list:
+        results = [None] * len(ios)
+
+        def read(i):
+            try:
+                results[i] = ios[i].read_immediate()
+            except WebIOConnectionError as ex:
+                results[i] = ex
+
+        threads = [threading.Thread(target=read, args=(i,)) for i in range(len(ios))]
+        for thread in threads:
+            thread.start()
+        while self.module.read_stats.immediate_reads < len(ios):
+            threading.Event().wait(0.001)
+        self.device.hold.set()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_reads_share_a_request(self):
+        results = self.read_concurrently([self.module.Temp1, self.module.Temp2, self.module.Button1] * 3)
+        assert_that(results).is_equal_to([72.5, 60.0, True] * 3)
+        assert_that(len(self.device.requests)).is_less_than(9)
+        stats = self.module.read_stats
+        assert_that(stats.immediate_requests + stats.immediate_shared).is_equal_to(9)
+        assert_that(stats.immediate_requests).is_equal_to(len(self.device.requests))
+
+    def test_shared_read_refreshes_the_image(self):
+        self.device.hold.set()
+        assert_that(self.module.Temp1.read_immediate()).is_equal_to(72.5)
+        assert_that(self.module.Temp2.value).is_equal_to(60.0)
+        assert_that(self.module.last_hardware_read_time).is_not_none()
+
+    def test_pending_writes_survive_an_immediate_read(self):
+        self.device.hold.set()
+        self.module.write("temperature2", 61.0)
+        self.module.read_immediate("temperature1")
+        assert_that(self.module.changes).is_equal_to({"temperature2": "61.0"})
+
+    def test_errors_reach_every_caller(self):
+        self.device.error = requests.exceptions.ConnectionError("down")
+        results = self.read_concurrently([self.module.Temp1, self.module.Temp2])
+        for result in results:
+            assert_that(result).is_instance_of(WebIOConnectionError)
+
+    def test_recent_image_is_reused(self):
+        self.device.hold.set()
+        self.module.update_from_hardware()
+        self.device.state["temperature1"] = "80.0"
+        assert_that(self.module.read_immediate("temperature1", max_age=60.0)).is_equal_to("72.5")
+        assert_that(len(self.device.requests)).is_equal_to(1)
+        assert_that(self.module.read_immediate("temperature1")).is_equal_to("80.0")
+        self.module.immediate_max_age = 60.0
+        self.device.state["temperature1"] = "90.0"
+        assert_that(self.module.read_immediate("temperature1")).is_equal_to("80.0")
+        assert_that(self.module.read_stats.immediate_reused).is_equal_to(2)
+
+    def test_subscriber_may_read_immediately(self):
+        self.device.hold.set()
+        reads = []
+        self.module.Button1.subscribe(lambda addr, old, new: reads.append(self.module.Temp1.read_immediate()))
+        thread = threading.Thread(target=self.module.Temp2.read_immediate, daemon=True)
+        thread.start()
+        thread.join(5.0)
+        assert_that(thread.is_alive()).is_false()
+        assert_that(reads).is_equal_to([72.5])
+        assert_that(self.module.read_stats.immediate_requests).is_equal_to(2)
+
+    def test_async_reads_share_a_request(self):
+        with DeviceSimulator() as simulator:
+            device = simulator.add_module("", STATE, latency=0.05)
+
+            async def read():
+                async with AsyncModule(simulator.url()) as module:
+                    values = await asyncio.gather(*[io.read_immediate() for io in [module.Temp1, module.Temp2] * 5])
+                    return values, module.read_stats.immediate_shared
+
+            values, shared = asyncio.run(read())
+        assert_that(values).is_equal_to([72.5, 60.0] * 5)
+        assert_that(shared).is_equal_to(9)
+        assert_that(device.requests).is_equal_to(1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+from controlpyweb.errors import ControlPyWebAddressNotFoundError
+from controlpyweb.io_definitions.discrete_io import DiscreteIn
+from controlpyweb.json_backend import get_loads
+from controlpyweb.simulator import DeviceSimulator
+from controlpyweb.webio_module import WebIOModule
+from assertpy import assert_that
+import json
+import unittest
+
+STATE = {"device1DigitalInput1": "1", "device1DigitalInput2": "0", "vin": "24.1", "serialNumber": "00:0C",
+         "timezoneOffset": "-25200", "relay7": "0", "relay8": "1"}
+
+
+class Module(WebIOModule):
+    Button1 = DiscreteIn("Button1", "device1DigitalInput1")
+
+
+class TestJsonBackend(unittest.TestCase):
+
+    def test_stdlib_backend(self):
+        name, loads = get_loads("json")
+        assert_that(name).is_equal_to("json")
+        assert_that(loads(b'{"a": "1"}')).is_equal_to({"a": "1"})
+
+    def test_auto_picks_an_installed_backend(self):
+        name, loads = get_loads()
+        assert_that(name).is_in("orjson", "ujson", "json")
+        assert_that(loads(json.dumps(STATE).encode())).is_equal_to(STATE)
+
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError, get_loads, "yaml")
+
+    def test_projection_keeps_the_addresses_in_use(self):
+        module = Module("testme", project_reads=True)
+        module._store_hardware_read(dict(STATE))
+        assert_that(module._io).is_equal_to({"device1DigitalInput1": "1", "vin": "24.1", "serialNumber": "00:0C"})
+        assert_that(module.Button1.value).is_true()
+        assert_that(module.vin).is_equal_to(24.1)
+        self.assertRaises(ControlPyWebAddressNotFoundError, module.read, "relay8")
+
+    def test_projection_follows_subscriptions_and_extras(self):
+        module = Module("testme", project_reads=["relay7"])
+        module._store_hardware_read(dict(STATE))
+        assert_that(module._io).contains_key("relay7").does_not_contain_key("relay8")
+        module.subscribe("relay8", lambda *args: None)
+        module._store_hardware_read(dict(STATE))
+        assert_that(module.read("relay8")).is_equal_to("1")
+
+    def test_projection_over_http(self):
+        with DeviceSimulator() as simulator:
+            simulator.add_module("", STATE)
+            module = Module(simulator.url(), project_reads=True)
+            module.update_from_hardware()
+            module.close()
+        assert_that(module._io).does_not_contain_key("timezoneOffset")
+        assert_that(module.serial_number).is_equal_to("00:0C")
+
+
+if __name__ == '__main__':
+    unittest.main()
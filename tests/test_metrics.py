@@ -0,0 +1,91 @@
+from controlpyweb.errors import WebIOConnectionError
+from controlpyweb.io_definitions.discrete_io import DiscreteOut
+from controlpyweb.metrics import Histogram, MetricsServer, prometheus_text
+from controlpyweb.simulator import DeviceSimulator
+from controlpyweb.webio_module import WebIOModule
+from assertpy import assert_that
+from urllib.request import urlopen
+import unittest
+
+
+class Module(WebIOModule):
+    Lamp1 = DiscreteOut("Lamp1", "redLamp")
+    Lamp2 = DiscreteOut("Lamp2", "amberLamp")
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.simulator = DeviceSimulator()
+        self.device = self.simulator.add_module("", {"redLamp": "0", "amberLamp": "0"})
+        self.simulator.start()
+        self.module = Module(self.simulator.url(), timeout=1.0, metrics=True, failure_threshold=None)
+
+    def tearDown(self):
+        self.module.close()
+        self.simulator.stop()
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram((1, 2))
+        for value in (0.5, 1, 1.5, 3):
+            histogram.observe(value)
+        assert_that(histogram.cumulative()).is_equal_to([(1, 2), (2, 3), (float('inf'), 4)])
+        assert_that(histogram.sum).is_equal_to(6.0)
+
+    def test_requests_are_counted_and_timed(self):
+        self.module.update_from_hardware()
+        self.module.Lamp1 = True
+        self.module.Lamp2 = True
+        self.module.send_changes_to_hardware()
+        self.module.sync_with_hardware()
+        metrics = self.module.collect_metrics()
+        assert_that(metrics["reads"]).is_equal_to(2)
+        assert_that(metrics["writes"]).is_equal_to(1)
+        assert_that(metrics["read_seconds"]["count"]).is_equal_to(2)
+        assert_that(metrics["decode_seconds"]["count"]).is_equal_to(2)
+        assert_that(metrics["payload_bytes"]).is_greater_than(0)
+        assert_that(metrics["flushes"]).is_equal_to(1)
+        assert_that(metrics["changes_per_flush"]["sum"]).is_equal_to(2)
+        assert_that(metrics["image_age_seconds"]).is_less_than(1.0)
+
+    def test_errors_are_counted(self):
+        self.device.failure_rate = 1.0
+        self.assertRaises(WebIOConnectionError, self.module.update_from_hardware)
+        self.device.failure_rate = 0.0
+        self.device.latency = 0.2
+        self.assertRaises(WebIOConnectionError, self.module.update_from_hardware, 0.05)
+        metrics = self.module.collect_metrics()
+        assert_that(metrics["http_errors"]).is_equal_to(1)
+        assert_that(metrics["timeouts"]).is_equal_to(1)
+        assert_that(metrics["reads"]).is_equal_to(0)
+
+    def test_disabled_metrics_report_the_image_only(self):
+        module = Module(self.simulator.url())
+        module.update_from_hardware()
+        module.close()
+        assert_that(module.metrics).is_none()
+        assert_that(module.collect_metrics()).contains_only("module", "image_age_seconds", "circuit")
+
+    def test_prometheus_text(self):
+        self.module.update_from_hardware()
+        text = prometheus_text([self.module])
+        label = 'module="{}"'.format(self.module._url)
+        assert_that(text).contains("# TYPE controlpyweb_reads_total counter")
+        assert_that(text).contains("controlpyweb_reads_total{" + label + "} 1")
+        assert_that(text).contains("controlpyweb_read_seconds_bucket{" + label + ',le="+Inf"} 1')
+        assert_that(text).contains("controlpyweb_circuit_open{" + label + "} 0")
+
+    def test_metrics_server(self):
+        self.module.update_from_hardware()
+        server = MetricsServer([self.module], host="127.0.0.1", port=0)
+        server.start()
+        try:
+            with urlopen("http://127.0.0.1:{}/metrics".format(server.port), timeout=1.0) as reply:
+                body = reply.read().decode()
+        finally:
+            server.stop()
+        assert_that(body).contains("controlpyweb_image_age_seconds")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+from controlpyweb.io_definitions import io_out
+from controlpyweb.io_definitions.analog_io import AnalogOut
+from controlpyweb.io_definitions.discrete_io import DiscreteOut
+from controlpyweb.webio_module import WebIOModule
+from assertpy import assert_that
+from unittest import mock
+import json
+import unittest
+
+
+class Module(WebIOModule):
+    Absolute = AnalogOut("Absolute", "register1", deadband=0.5)
+    Percent = AnalogOut("Percent", "register2", deadband_pct=1.0)
+    Paced = AnalogOut("Paced", "register3", min_interval=1.0, refresh_interval=10.0)
+    Exact = AnalogOut("Exact", "register4")
+    Lamp = DiscreteOut("Lamp", "redLamp", deadband=1.0)
+
+
+class TestOutputDeadband(unittest.TestCase):
+
+    def setUp(self):
+        self.module = Module("testme")
+        self.module.loads(json.dumps({"register1": "50.0", "register2": "200.0", "register3": "5.0",
+                                      "register4": "1.0", "redLamp": "0"}))
+        self.now = 100.0
+        patcher = mock.patch.object(io_out.time, "monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_absolute_deadband(self):
+        self.module.Absolute = 50.4
+        assert_that(self.module.changes).is_empty()
+        self.module.Absolute = 50.6
+        assert_that(self.module.changes).is_equal_to({"register1": "50.6"})
+        assert_that(self.module.write_stats.suppressed).is_equal_to(1)
+
+    def test_percentage_deadband(self):
+        self.module.Percent = 198.5
+        assert_that(self.module.changes).is_empty()
+        self.module.Percent = 197.5
+        assert_that(self.module.changes).is_equal_to({"register2": "197.5"})
+
+    def test_exact_comparison_is_unchanged(self):
+        self.module.Exact = 1.0
+        self.module.Exact = 1.01
+        assert_that(self.module.changes).is_equal_to({"register4": "1.01"})
+
+    def test_discrete_outputs_have_no_deadband(self):
+        self.module.Lamp = True
+        assert_that(self.module.changes).is_equal_to({"redLamp": "1"})
+
+    def test_min_interval_and_refresh_interval(self):
+        self.module.Paced = 6.0
+        assert_that(self.module.changes).contains_key("register3")
+        self.module.flush_changes()
+        self.now += 0.5
+        self.module.Paced = 7.0
+        assert_that(self.module.changes).is_empty()
+        self.now += 0.6
+        self.module.Paced = 7.0
+        assert_that(self.module.changes).is_equal_to({"register3": "7.0"})
+        self.module.flush_changes()
+        self.now += 5.0
+        self.module.Paced = 5.0        # the value the output has
+        assert_that(self.module.changes).is_empty()
+        self.now += 5.0
+        self.module.Paced = 5.0        # refreshed once the last write is older than refresh_interval
+        assert_that(self.module.changes).is_equal_to({"register3": "5.0"})
+
+
+if __name__ == '__main__':
+    unittest.main()
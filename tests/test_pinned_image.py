@@ -0,0 +1,134 @@
+from controlpyweb.errors import ControlPyWebAddressNotFoundError
+from controlpyweb.io_definitions.analog_io import AnalogIn, AnalogOut
+from controlpyweb.io_definitions.discrete_io import DiscreteOut
+from controlpyweb.webio_module import WebIOModule
+from tests.fakes import FakeDevice
+from assertpy import assert_that
+import asyncio
+import threading
+import unittest
+
+
+STATE = {"temperature1": "70.0", "level1": "5.0", "redLamp": "0", "register1": "1.0"}
+
+
+class Module(WebIOModule):
+    Temp1 = AnalogIn("Temp1", "temperature1")
+    Level1 = AnalogIn("Level1", "level1")
+    Lamp1 = DiscreteOut("Lamp1", "redLamp")
+    Setpoint = AnalogOut("Setpoint", "register1")
+
+
+class TestPinnedImage(unittest.TestCase):
+
+    def setUp(self):
+        self.device = FakeDevice(STATE)
+        self.module = Module("testme")
+        self.module._req = self.device
+        self.module.update_from_hardware()
+
+    def poll(self, **state):
+        """ Polls the module from another thread, as a scan running alongside would"""
+        self.device.state.update(state)
+        thread = threading.Thread(target=self.module.update_from_hardware)
+        thread.start()
+        thread.join()
+
+    def test_reads_come_from_the_pinned_version(self):
+        module = self.module
+        with module.pinned():
+            assert_that(module.Temp1.value).is_equal_to(70.0)
+            self.poll(temperature1="80.0", level1="6.0")
+            assert_that(module.Level1.value).is_equal_to(5.0)
+            assert_that(module.read("level1")).is_equal_to("5.0")
+            assert_that(module.read_many(["Temp1", "Level1"])).is_equal_to({"Temp1": 70.0, "Level1": 5.0})
+            self.assertRaises(ControlPyWebAddressNotFoundError, module.read, "notThere")
+        assert_that(module.read_many(["Temp1", "Level1"])).is_equal_to({"Temp1": 80.0, "Level1": 6.0})
+
+    def test_other_threads_read_the_latest(self):
+        module, seen = self.module, []
+        with module.pinned():
+            self.poll(temperature1="80.0")
+            thread = threading.Thread(target=lambda: seen.append(module.Temp1.value))
+            thread.start()
+            thread.join()
+            assert_that(module.Temp1.value).is_equal_to(70.0)
+        assert_that(seen).is_equal_to([80.0])
+
+    def test_the_pinned_version_is_copied_only_on_write(self):
+        module = self.module
+        with module.pinned() as pin:
+            assert_that(module._typed).is_same_as(pin.typed)
+            assert_that(module._io).is_same_as(pin.io)
+            self.poll(temperature1="80.0")
+            assert_that(module._typed).is_not_same_as(pin.typed)
+            assert_that(pin.typed.get("temperature1")).is_equal_to(70.0)
+        typed = module._typed
+        self.poll(temperature1="90.0")
+        assert_that(module._typed).is_same_as(typed)
+
+    def test_writes_are_staged_until_the_end(self):
+        module = self.module
+        with module.pinned():
+            module.Lamp1 = True
+            module.Setpoint = 2.0
+            module.Setpoint = 3.0
+            assert_that(module.changes).is_empty()
+            assert_that(module.Lamp1.value).is_false()
+        assert_that(module.changes).is_equal_to({"redLamp": "1", "register1": "3.0"})
+        assert_that(module.write_stats.writes).is_equal_to(3)
+        assert_that(module.write_stats.coalesced).is_equal_to(1)
+
+    def test_writes_are_dropped_when_the_block_raises(self):
+        module = self.module
+        with self.assertRaises(ValueError):
+            with module.pinned():
+                module.Lamp1 = True
+                raise ValueError()
+        assert_that(module.changes).is_empty()
+        assert_that(module._pins).is_equal_to(0)
+
+    def test_staged_writes_show_in_reads_when_updating_reads_on_write(self):
+        module = self.module
+        module.update_reads_on_write = True
+        with module.pinned():
+            module.Setpoint = 3.0
+            assert_that(module.Setpoint.value).is_equal_to(3.0)
+            assert_that(module.read("register1")).is_equal_to(3.0)
+            self.poll(temperature1="80.0")
+            assert_that(module.Temp1.value).is_equal_to(70.0)
+        assert_that(module.Setpoint.value).is_equal_to(3.0)
+        assert_that(module.Temp1.value).is_equal_to(80.0)
+
+    def test_nested_blocks_share_the_version(self):
+        module = self.module
+        with module.pinned() as outer:
+            with module.pinned() as inner:
+                assert_that(inner).is_same_as(outer)
+                module.Lamp1 = True
+            assert_that(module.changes).is_empty()
+        assert_that(module.changes).is_equal_to({"redLamp": "1"})
+
+    def test_tasks_pin_independently(self):
+        module = self.module
+
+        async def pinned_reader(started: asyncio.Event, polled: asyncio.Event):
+            with module.pinned():
+                started.set()
+                await polled.wait()
+                return module.Temp1.value
+
+        async def run():
+            started, polled = asyncio.Event(), asyncio.Event()
+            task = asyncio.ensure_future(pinned_reader(started, polled))
+            await started.wait()
+            self.poll(temperature1="80.0")
+            latest = module.Temp1.value
+            polled.set()
+            return await task, latest
+
+        assert_that(asyncio.run(run())).is_equal_to((70.0, 80.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+from controlpyweb.reader_writer import ReaderWriter
+from controlpyweb.scan_scheduler import ScanScheduler, ScanStatistics, OVERRUN_COMPRESS, OVERRUN_SKIP
+from tests.fakes import FakeDevice
+from assertpy import assert_that
+import unittest
+import time
+
+
+class Malformed:
+    def json(self):
+        raise ValueError("not json")
+
+
+def make_module(latency: float = 0.0):
+    module = ReaderWriter("testme")
+    module._req = FakeDevice({"relay1": "1"}, latency)
+    return module
+
+
+class TestScanScheduler(unittest.TestCase):
+
+    def test_runs_read_logic_write_at_fixed_period(self):
+        module = make_module()
+        calls = []
+
+        def logic(scheduler):
+            calls.append(module.read("relay1"))
+            module.write("relay1", True)
+
+        scheduler = ScanScheduler([module], period=0.01, logic=logic)
+        start = time.monotonic()
+        scheduler.run(cycles=10)
+        elapsed = time.monotonic() - start
+        assert_that(calls).is_length(10).contains_only("1")
+        assert_that(elapsed).is_between(0.085, 0.2)
+        assert_that(scheduler.stats.cycles).is_equal_to(10)
+        assert_that(scheduler.stats.overruns).is_equal_to(0)
+        assert_that(module.changes).is_empty()
+
+    def test_overrun_skips_missed_cycles(self):
+        scheduler = ScanScheduler([make_module(0.025)], period=0.01, overrun=OVERRUN_SKIP)
+        scheduler.run(cycles=4)
+        assert_that(scheduler.stats.overruns).is_equal_to(4)
+        assert_that(scheduler.stats.skipped_cycles).is_greater_than_or_equal_to(4)
+
+    def test_overrun_compress_catches_up(self):
+        slow = [True]
+        module = make_module()
+
+        def logic(scheduler):
+            if slow.pop() if slow else False:
+                time.sleep(0.035)
+
+        scheduler = ScanScheduler([module], period=0.01, logic=logic, overrun=OVERRUN_COMPRESS, max_catch_up=5)
+        start = time.monotonic()
+        scheduler.run(cycles=5)
+        elapsed = time.monotonic() - start
+        assert_that(scheduler.stats.overruns).is_greater_than_or_equal_to(1)
+        assert_that(scheduler.stats.skipped_cycles).is_equal_to(0)
+        assert_that(elapsed).is_less_than(0.05 + 0.01)
+
+    def test_start_and_stop_in_background(self):
+        scheduler = ScanScheduler([make_module()], period=0.005)
+        scheduler.start()
+        time.sleep(0.05)
+        scheduler.stop(timeout=1)
+        assert_that(scheduler.is_running).is_false()
+        assert_that(scheduler.stats.cycles).is_greater_than(2)
+
+    def test_errors_are_counted_and_the_scan_goes_on(self):
+        module, reported, calls = make_module(), [], []
+
+        def logic(scheduler):
+            calls.append(None)
+            if len(calls) % 2 == 0:
+                raise RuntimeError("logic failed")
+
+        scheduler = ScanScheduler([module], period=0.001, logic=logic,
+                                  on_error=lambda scheduler, error: reported.append(error))
+        scheduler.run(cycles=4)
+        assert_that(scheduler.stats.errors).is_equal_to(2)
+        assert_that(scheduler.stats.cycles).is_equal_to(2)
+        assert_that(scheduler.stats.summary()["errors"]).is_equal_to(2)
+        assert_that(reported).is_length(2)
+        assert_that(scheduler.last_error).is_instance_of(RuntimeError)
+
+    def test_raising_error_callback_does_not_stop_the_scan(self):
+        def logic(scheduler):
+            raise RuntimeError("logic failed")
+
+        def on_error(scheduler, error):
+            raise ValueError("reporting failed")
+
+        scheduler = ScanScheduler([make_module()], period=0.001, logic=logic, on_error=on_error)
+        scheduler.run(cycles=3)
+        assert_that(scheduler.stats.errors).is_equal_to(3)
+        assert_that(scheduler.last_error).is_instance_of(ValueError)
+        assert_that(scheduler.last_error.__context__).is_instance_of(RuntimeError)
+
+    def test_malformed_reply_is_a_connection_error(self):
+        module = make_module()
+        module._req.get = lambda url, params=None, timeout=None: Malformed()
+        scheduler = ScanScheduler([module], period=0.001)
+        scheduler.run(cycles=2)
+        assert_that(scheduler.stats.connection_errors).is_equal_to(2)
+        assert_that(scheduler.stats.errors).is_equal_to(0)
+
+    def test_statistics_percentiles(self):
+        stats = ScanStatistics(history=100)
+        for i in range(1, 101):
+            stats.record(i / 1000.0, 0, 0, 0, False)
+        assert_that(stats.percentile(50)).is_close_to(0.050, 1e-9)
+        assert_that(stats.percentile(99)).is_close_to(0.099, 1e-9)
+        assert_that(stats.summary()['read']['max']).is_close_to(0.1, 1e-9)
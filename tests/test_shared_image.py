@@ -0,0 +1,169 @@
+from controlpyweb import shared_image
+from controlpyweb.errors import ControlPyWebSharedImageError
+from controlpyweb.io_definitions.analog_io import AnalogIn, AnalogOut
+from controlpyweb.io_definitions.discrete_io import DiscreteIn
+from controlpyweb.shared_image import SharedImage
+from controlpyweb.webio_module import WebIOModule
+from tests.fakes import FakeDevice
+from assertpy import assert_that
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+
+STATE = {"temperature1": "70.0", "device1DigitalInput1": "1", "register1": "2.0", "serialNumber": "00:0C"}
+
+
+class Module(WebIOModule):
+    Temp1 = AnalogIn("Temp1", "temperature1")
+    Button1 = DiscreteIn("Button1", "device1DigitalInput1")
+    Setpoint = AnalogOut("Setpoint", "register1")
+
+
+class Other(WebIOModule):
+    Temp1 = AnalogIn("Temp1", "temperature1")
+
+
+def _read_in_child(path: str, queue):
+    module = Module("testme")
+    module.attach_shared_image(path)
+    module.update_from_hardware()
+    queue.put((module.Temp1.value, module.Button1.value, module.serial_number))
+
+
+class TestSharedImage(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".image")
+        os.close(handle)
+        self.device = FakeDevice(STATE)
+        self.poller = Module("testme")
+        self.poller._req = self.device
+        self.poller.share_image(self.path)
+        self.reader = Module("testme")
+        self.reader._req = FakeDevice(STATE)
+        self.reader.attach_shared_image(self.path)
+
+    def tearDown(self):
+        self.reader.shared_image.close()
+        self.poller.shared_image.unlink()
+
+    def test_typed_values_follow_the_poller(self):
+        assert_that(self.reader.shared_image.get("temperature1")).is_none()
+        self.poller.update_from_hardware()
+        assert_that(self.reader.Temp1.value).is_equal_to(70.0)
+        assert_that(self.reader.Button1.value).is_true()
+        self.device.state["temperature1"] = "71.5"
+        self.poller.update_from_hardware()
+        assert_that(self.reader.Temp1.value).is_equal_to(71.5)
+        assert_that(self.reader.shared_image.read_typed()).is_equal_to(
+            {"temperature1": 71.5, "device1DigitalInput1": True, "register1": 2.0})
+
+    def test_reader_takes_the_raw_image_without_polling(self):
+        calls = []
+        self.reader.subscribe("temperature1", lambda addr, old, new: calls.append(new))
+        self.poller.update_from_hardware()
+        self.reader.update_from_hardware()
+        self.reader.update_from_hardware()
+        assert_that(self.reader._req.requests).is_empty()
+        assert_that(self.reader.serial_number).is_equal_to("00:0C")
+        assert_that(self.reader.last_hardware_read_time).is_equal_to(self.poller.last_hardware_read_time)
+        assert_that(calls).is_equal_to([70.0])
+
+    def test_reader_writes_go_to_the_hardware(self):
+        self.poller.update_from_hardware()
+        self.reader.Setpoint = 5.0
+        self.reader.sync_with_hardware()
+        assert_that(self.reader._req.state["register1"]).is_equal_to("5.0")
+        assert_that(self.reader.changes).is_empty()
+
+    def test_attaching_with_other_io_is_refused(self):
+        other = Other("testme")
+        self.assertRaises(ControlPyWebSharedImageError, other.attach_shared_image, self.path)
+
+    def test_reads_are_never_torn(self):
+        layout = [("a", "analog"), ("b", "analog"), ("c", "analog")]
+        publisher = SharedImage.create(self.path + "2", layout)
+        reader = SharedImage.attach(self.path + "2", layout)
+        stop = threading.Event()
+
+        def publish():
+            i = 0
+            while not stop.is_set():
+                i += 1
+                publisher.publish({"a": i, "b": i, "c": i}, {"a": i}, float(i))
+
+        thread = threading.Thread(target=publish)
+        thread.start()
+        try:
+            for _ in range(2000):
+                values = set(reader.read_typed().values())
+                assert_that(len(values)).is_less_than_or_equal_to(1)
+        finally:
+            stop.set()
+            thread.join()
+            reader.close()
+            publisher.unlink()
+
+    @mock.patch.object(shared_image, "_STALLED", 0.05)
+    def test_publisher_dying_part_way_through_an_update_makes_the_image_stale(self):
+        self.poller.update_from_hardware()
+        self.reader.update_from_hardware()
+        read_time = self.reader.last_hardware_read_time
+        self.poller.shared_image._sequence[0] += 1      # as left by a publisher that died publishing
+        assert_that(self.reader.shared_image.get("temperature1")).is_none()
+        assert_that(self.reader.shared_image.stalled).is_true()
+        started = time.monotonic()
+        for _ in range(20):
+            # the slot is missing, so the module falls back on the last raw image it read
+            assert_that(self.reader.Temp1.value).is_equal_to(70.0)
+        assert_that(time.monotonic() - started).is_less_than(0.05)
+        self.reader.update_from_hardware()
+        assert_that(self.reader.last_hardware_read_time).is_equal_to(read_time)
+        assert_that(self.reader.shared_image.read_typed()).is_empty()
+        self.poller.shared_image._sequence[0] += 1
+        assert_that(self.reader.shared_image.stalled).is_false()
+        assert_that(self.reader.Temp1.value).is_equal_to(70.0)
+
+    def test_reader_follows_a_new_publisher(self):
+        self.poller.update_from_hardware()
+        assert_that(self.reader.Temp1.value).is_equal_to(70.0)
+        successor = Module("testme")
+        successor._req = FakeDevice(dict(STATE, temperature1="72.0"))
+        successor.share_image(self.path)
+        try:
+            successor.update_from_hardware()
+            assert_that(self.reader.Temp1.value).is_equal_to(72.0)
+            self.reader.update_from_hardware()
+            assert_that(self.reader.last_hardware_read_time).is_equal_to(successor.last_hardware_read_time)
+        finally:
+            successor.shared_image.close()
+
+    def test_reader_follows_a_publisher_starting_after_the_file_was_removed(self):
+        self.poller.update_from_hardware()
+        self.reader.update_from_hardware()
+        self.poller.shared_image.unlink()
+        self.poller.share_image(self.path)
+        self.device.state["temperature1"] = "73.0"
+        self.poller.update_from_hardware()
+        self.reader.update_from_hardware()
+        assert_that(self.reader.Temp1.value).is_equal_to(73.0)
+        assert_that(self.reader.last_hardware_read_time).is_equal_to(self.poller.last_hardware_read_time)
+
+    def test_shared_across_processes(self):
+        self.poller.update_from_hardware()
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        child = context.Process(target=_read_in_child, args=(self.path, queue))
+        child.start()
+        result = queue.get(timeout=30)
+        child.join()
+        assert_that(result).is_equal_to((70.0, True, "00:0C"))
+
+
+if __name__ == '__main__':
+    unittest.main()
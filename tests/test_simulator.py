@@ -0,0 +1,67 @@
+from controlpyweb.errors import WebIOConnectionError
+from controlpyweb.io_definitions.analog_io import AnalogOut
+from controlpyweb.io_definitions.discrete_io import DiscreteIn, DiscreteOut
+from controlpyweb.simulator import DeviceSimulator
+from controlpyweb.webio_module import WebIOModule
+from assertpy import assert_that
+import unittest
+
+
+class Module(WebIOModule):
+    Button1 = DiscreteIn("Button1", "device1DigitalInput1")
+    Lamp1 = DiscreteOut("Lamp1", "redLamp")
+    Temp1 = AnalogOut("Temp1", "temperature1")
+
+
+STATE = {"device1DigitalInput1": "1", "redLamp": "0", "temperature1": "72.5"}
+
+
+class TestSimulator(unittest.TestCase):
+
+    def setUp(self):
+        self.simulator = DeviceSimulator()
+        self.device = self.simulator.add_module("", STATE)
+        self.other = self.simulator.add_module("other", STATE)
+        self.simulator.start()
+        self.module = Module(self.simulator.url(), timeout=1.0, failure_threshold=None)
+
+    def tearDown(self):
+        self.module.close()
+        self.simulator.stop()
+
+    def test_reads_and_writes_over_http(self):
+        self.module.update_from_hardware()
+        assert_that(self.module.Button1.value).is_true()
+        assert_that(self.module.Temp1.value).is_equal_to(72.5)
+        self.module.Lamp1 = True
+        self.module.Temp1 = 80
+        self.module.send_changes_to_hardware()
+        assert_that(self.device.state["redLamp"]).is_equal_to("1")
+        assert_that(self.device.state["temperature1"]).is_equal_to("80.0")
+        assert_that(self.other.state["redLamp"]).is_equal_to("0")
+        assert_that(self.device.requests).is_equal_to(2)
+
+    def test_named_modules_are_separate(self):
+        other = Module(self.simulator.url("other"))
+        other.Lamp1.write_immediate(True)
+        other.close()
+        assert_that(self.other.state["redLamp"]).is_equal_to("1")
+        assert_that(self.device.state["redLamp"]).is_equal_to("0")
+
+    def test_injected_failures_raise_connection_errors(self):
+        self.device.failure_rate = 1.0
+        self.assertRaises(WebIOConnectionError, self.module.update_from_hardware)
+        self.device.failure_rate = 0.0
+        self.device.offline = True
+        self.assertRaises(WebIOConnectionError, self.module.update_from_hardware)
+        self.device.offline = False
+        self.module.update_from_hardware()
+        assert_that(self.device.failures).is_equal_to(2)
+
+    def test_latency_beyond_timeout_times_out(self):
+        self.device.latency = 0.2
+        self.assertRaises(WebIOConnectionError, self.module.update_from_hardware, 0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
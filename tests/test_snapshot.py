@@ -0,0 +1,83 @@
+from controlpyweb.errors import ControlPyWebSnapshotError
+from controlpyweb.io_definitions.analog_io import AnalogIn, AnalogOut
+from controlpyweb.io_definitions.discrete_io import DiscreteIn
+from controlpyweb.snapshot import append_snapshot, compact_snapshots, read_snapshots, warm_start
+from controlpyweb.webio_module import WebIOModule
+from assertpy import assert_that
+import os
+import tempfile
+import unittest
+
+STATE = {"device1DigitalInput1": "1", "temperature1": "72.5", "register1": "3.0", "serialNumber": "00:0C"}
+
+
+class Module(WebIOModule):
+    Button1 = DiscreteIn("Button1", "device1DigitalInput1")
+    Temp1 = AnalogIn("Temp1", "temperature1")
+    Setpoint = AnalogOut("Setpoint", "register1")
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.module = Module("testme")
+        self.module._store_hardware_read(dict(STATE))
+        self.module.Setpoint = 4.5
+        handle, self.path = tempfile.mkstemp(suffix=".snap")
+        os.close(handle)
+        os.remove(self.path)
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_round_trip(self):
+        restored = Module("testme")
+        restored.restore(self.module.snapshot())
+        assert_that(restored.Button1.value).is_true()
+        assert_that(restored.Temp1.value).is_equal_to(72.5)
+        assert_that(restored.serial_number).is_equal_to("00:0C")
+        assert_that(restored.changes).is_equal_to({"register1": "4.5"})
+        assert_that(restored.last_hardware_read_time).is_equal_to(self.module.last_hardware_read_time)
+
+    def test_snapshot_of_another_module_is_rejected(self):
+        other = Module("elsewhere")
+        self.assertRaises(ControlPyWebSnapshotError, other.restore, self.module.snapshot())
+        self.assertRaises(ControlPyWebSnapshotError, other.restore, b"CPWS\x01")
+
+    def test_subscriptions_only_see_later_changes(self):
+        calls = []
+        restored = Module("testme")
+        restored.subscribe("temperature1", lambda addr, old, new: calls.append(new))
+        restored.restore(self.module.snapshot())
+        restored._store_hardware_read(dict(STATE))
+        assert_that(calls).is_empty()
+        restored._store_hardware_read(dict(STATE, temperature1="80.0"))
+        assert_that(calls).is_equal_to([80.0])
+
+    def test_warm_start_from_the_latest_snapshot(self):
+        other = Module("other")
+        append_snapshot(self.path, self.module)
+        append_snapshot(self.path, other)
+        self.module.Setpoint = 9.0
+        append_snapshot(self.path, self.module)
+        with open(self.path, "ab") as f:
+            f.write(b"\x10\x00")        # a record torn by a crash
+        assert_that(read_snapshots(self.path)).is_length(2)
+
+        modules = [Module("testme"), Module("other"), Module("new")]
+        restored = warm_start(modules, self.path)
+        assert_that(restored).is_equal_to(modules[:2])
+        assert_that(modules[0].changes).is_equal_to({"register1": "9.0"})
+
+        size = os.path.getsize(self.path)
+        compact_snapshots(self.path)
+        assert_that(os.path.getsize(self.path)).is_less_than(size)
+        assert_that(read_snapshots(self.path)).is_length(2)
+
+    def test_warm_start_without_a_file(self):
+        assert_that(warm_start([Module("testme")], self.path)).is_empty()
+
+
+if __name__ == '__main__':
+    unittest.main()
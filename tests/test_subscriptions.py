@@ -0,0 +1,92 @@
+from controlpyweb.io_definitions.analog_io import AnalogIn
+from controlpyweb.io_definitions.discrete_io import DiscreteIn
+from controlpyweb.subscriptions import FALLING, RISING
+from controlpyweb.webio_module import WebIOModule
+from tests.fakes import FakeDevice
+from assertpy import assert_that
+import unittest
+
+
+STATE = {"device1DigitalInput1": "0", "temperature1": "70.0", "vin": "24.0"}
+
+
+class Module(WebIOModule):
+    Button1 = DiscreteIn("Button1", "device1DigitalInput1")
+    Temp1 = AnalogIn("Temp1", "temperature1")
+
+
+class TestSubscriptions(unittest.TestCase):
+
+    def setUp(self):
+        self.module = Module("testme")
+        self.session = FakeDevice(STATE)
+        self.module._req = self.session
+        self.events = []
+
+    def record(self, addr, old, new):
+        self.events.append((addr, old, new))
+
+    def poll(self, **state):
+        self.session.state.update(state)
+        self.module.update_from_hardware()
+
+    def test_change_callbacks_get_converted_values(self):
+        self.module.Button1.subscribe(self.record)
+        self.poll()
+        self.poll()
+        self.poll(device1DigitalInput1="1")
+        assert_that(self.events).is_equal_to([("device1DigitalInput1", None, False),
+                                              ("device1DigitalInput1", False, True)])
+
+    def test_only_changed_addresses_are_dispatched(self):
+        self.poll()
+        self.module.Button1.subscribe(self.record)
+        self.module.Temp1.subscribe(self.record)
+        self.poll(temperature1="71.0", vin="23.0")
+        assert_that(self.events).is_equal_to([("temperature1", 70.0, 71.0)])
+        assert_that(self.module.changed_since_last_read()).is_equal_to({"temperature1": ("70.0", "71.0"),
+                                                                         "vin": ("24.0", "23.0")})
+
+    def test_unconvertible_value_does_not_stop_the_poll(self):
+        self.module.Temp1.subscribe(self.record)
+        self.module.Button1.subscribe(self.record)
+        self.poll()
+        self.poll(temperature1="", device1DigitalInput1="1")
+        assert_that(self.events[-1]).is_equal_to(("device1DigitalInput1", False, True))
+        self.poll()
+        self.poll(temperature1="72.0")
+        assert_that(self.events[-1]).is_equal_to(("temperature1", 70.0, 72.0))
+        assert_that(self.events).is_length(4)
+
+    def test_rising_and_falling_edges(self):
+        rising, falling = [], []
+        self.poll()
+        self.module.Button1.subscribe(lambda *e: rising.append(e), edge=RISING)
+        self.module.Button1.subscribe(lambda *e: falling.append(e), edge=FALLING)
+        for value in ("1", "1", "0", "1"):
+            self.poll(device1DigitalInput1=value)
+        assert_that(rising).is_length(2)
+        assert_that(falling).is_length(1)
+
+    def test_deadband_is_relative_to_last_reported_value(self):
+        self.poll()
+        self.module.Temp1.subscribe(self.record, deadband=0.5)
+        for value in ("70.3", "70.5", "70.6", "70.9", "71.2"):
+            self.poll(temperature1=value)
+        assert_that(self.events).is_equal_to([("temperature1", 70.0, 70.6), ("temperature1", 70.6, 71.2)])
+
+    def test_unsubscribe(self):
+        subscription = self.module.subscribe("vin", self.record)
+        self.module.unsubscribe(subscription)
+        self.poll(vin="1")
+        assert_that(self.events).is_empty()
+
+    def test_raising_callback_does_not_stop_others(self):
+        def fail(*args):
+            raise RuntimeError("callback failed")
+        self.poll()
+        self.module.subscribe("vin", fail)
+        self.module.subscribe("vin", self.record)
+        with self.assertRaises(RuntimeError):
+            self.poll(vin="1")
+        assert_that(self.events).is_equal_to([("vin", "24.0", "1")])
@@ -0,0 +1,54 @@
+from controlpyweb.io_definitions.discrete_io import DiscreteOut
+from controlpyweb.webio_module import WebIOModule
+from tests.fakes import FakeDevice
+from assertpy import assert_that
+import unittest
+
+
+STATE = {"redLamp": "0", "amberLamp": "0"}
+
+
+class Module(WebIOModule):
+    Lamp1 = DiscreteOut("Lamp1", "redLamp")
+    Lamp2 = DiscreteOut("Lamp2", "amberLamp")
+
+
+class TestSyncWithHardware(unittest.TestCase):
+
+    def setUp(self):
+        self.device = FakeDevice(STATE)
+        self.module = Module("testme")
+        self.module._req = self.device
+        self.module.update_from_hardware()
+
+    def test_sync_writes_and_reads_in_one_round_trip(self):
+        self.module.Lamp1 = True
+        self.module.sync_with_hardware()
+        assert_that(self.device.requests).is_equal_to([None, {"redLamp": "1"}])
+        assert_that(self.module.Lamp1.value).is_true()
+        assert_that(self.module.changes).is_empty()
+
+    def test_sync_without_changes_reads(self):
+        self.device.state["amberLamp"] = "1"
+        self.module.sync_with_hardware()
+        assert_that(self.device.requests).is_equal_to([None, None])
+        assert_that(self.module.Lamp2.value).is_true()
+
+    def test_writes_queued_during_sync_are_kept(self):
+        self.module.Lamp1 = True
+        self.device.during_request = lambda: self.module.write("amberLamp", True)
+        self.module.sync_with_hardware()
+        assert_that(self.module.changes).is_equal_to({"amberLamp": "1"})
+
+    def test_writes_queued_during_read_are_kept(self):
+        self.module.Lamp1 = True
+        self.device.during_request = lambda: self.module.write("amberLamp", True)
+        self.module.update_from_hardware()
+        assert_that(self.module.changes).is_equal_to({"amberLamp": "1"})
+
+    def test_pending_writes_stay_visible_when_reads_update_on_write(self):
+        self.module.update_reads_on_write = True
+        self.device.during_request = lambda: self.module.write("amberLamp", True)
+        self.module.update_from_hardware()
+        assert_that(self.module.Lamp2.value).is_true()
+        assert_that(self.device.state["amberLamp"]).is_equal_to("0")
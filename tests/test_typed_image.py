@@ -0,0 +1,79 @@
+from controlpyweb.io_definitions.analog_io import AnalogIn, AnalogOut
+from controlpyweb.io_definitions.discrete_io import DiscreteIn
+from controlpyweb.tag_image import ANALOG, DISCRETE, TagImage
+from controlpyweb.webio_module import WebIOModule
+from assertpy import assert_that
+import json
+import unittest
+
+incoming = {"device1DigitalInput1": "1", "device1DigitalInput2": "false", "temperature1": "87.5",
+            "temperature2": "75", "register1": "3"}
+
+
+class Module(WebIOModule):
+    Button1 = DiscreteIn("Button1", "device1DigitalInput1")
+    Button2 = DiscreteIn("Button2", "device1DigitalInput2")
+    Temp1 = AnalogIn("Temp1", "temperature1")
+    Temp2 = AnalogOut("Temp2", "temperature2")
+
+
+module = Module("testme")
+
+
+class TestTypedImage(unittest.TestCase):
+
+    def setUp(self):
+        self.module = module
+        self.module.update_reads_on_write = False
+        self.module.loads(json.dumps(incoming))
+
+    def test_registered_addresses_are_converted_once_on_load(self):
+        assert_that(self.module._typed.to_dict()).is_equal_to({"device1DigitalInput1": True, "device1DigitalInput2": False,
+                                                      "temperature1": 87.5, "temperature2": 75.0})
+        assert_that(self.module.Temp1.value).is_equal_to(87.5)
+        assert_that(self.module.Button2.value).is_false()
+
+    def test_unregistered_addresses_are_converted_on_read(self):
+        assert_that(self.module.read_value("register1", float)).is_equal_to(3.0)
+        assert_that(self.module.read("register1")).is_equal_to("3")
+
+    def test_writes_update_the_typed_image(self):
+        self.module.update_reads_on_write = True
+        self.module.Temp2 = 12
+        assert_that(self.module.Temp2.value).is_equal_to(12.0)
+        assert_that(self.module.read("temperature2")).is_equal_to(12.0)
+
+    def test_unconvertible_values_still_raise_on_read(self):
+        self.module.loads(json.dumps(dict(incoming, temperature1="n/a")))
+        assert_that(self.module._typed.to_dict()).does_not_contain_key("temperature1")
+        with self.assertRaises(ValueError):
+            self.module.Temp1.value
+
+
+class TestCompactTagImage(unittest.TestCase):
+
+    def test_compact_image_matches_dictionary_image(self):
+        module = Module("testme", compact_image=True)
+        module.update_reads_on_write = True
+        module.loads(json.dumps(incoming))
+        assert_that(module._typed).is_instance_of(TagImage)
+        assert_that(module.Button1.value).is_true()
+        assert_that(module.Button2.value).is_false()
+        assert_that(module.Temp1.value).is_equal_to(87.5)
+        module.Temp2 = 12
+        assert_that(module.Temp2.value).is_equal_to(12.0)
+
+    def test_values_are_stored_in_place(self):
+        image = TagImage()
+        for i in range(20):
+            image.add("relay{}".format(i), DISCRETE)
+        image.add("analog1", ANALOG)
+        floats, bits = image._floats, image._bits
+        image.set("relay17", True)
+        image.set("analog1", 2.5)
+        assert_that(image.get("relay17")).is_true()
+        assert_that(image.get("relay16")).is_none()
+        assert_that(image._floats).is_same_as(floats)
+        assert_that(image._bits).is_same_as(bits).is_length(3)
+        image.invalidate("relay17")
+        assert_that(image.to_dict()).is_equal_to({"analog1": 2.5})
@@ -0,0 +1,64 @@
+from controlpyweb import reader_writer
+from controlpyweb.io_definitions.analog_io import AnalogOut
+from controlpyweb.io_definitions.discrete_io import DiscreteIn, DiscreteOut
+from controlpyweb.webio_module import WebIOModule
+from assertpy import assert_that
+import unittest
+from unittest import mock
+
+
+class X410DigitalOut(WebIOModule):
+    StartLamp = DiscreteOut("Start Lamp", "redLamp")
+    MaintLight = DiscreteOut("Maintenance Lamp", "lamp1")
+    Setpoint = AnalogOut("Setpoint", "register1")
+
+
+class X410WithInput(X410DigitalOut):
+    DoorClosed = DiscreteIn("Door Closed", "doorClosed")
+    MaintLight = None
+
+
+class TestWebIOModule(unittest.TestCase):
+
+    def test_tag_table_is_built_when_class_is_defined(self):
+        assert_that(list(X410DigitalOut._io_table)).is_equal_to(["MaintLight", "Setpoint", "StartLamp"])
+        assert_that(list(X410WithInput._io_table)).is_equal_to(["DoorClosed", "Setpoint", "StartLamp"])
+
+    def test_instances_are_bound_independently(self):
+        first, second = X410DigitalOut("first"), X410DigitalOut("second")
+        first.loads('{"redLamp": "0", "lamp1": "0", "register1": "1.5"}')
+        second.loads('{"redLamp": "1", "lamp1": "1", "register1": "2.5"}')
+        assert_that(first.StartLamp.value).is_false()
+        assert_that(second.StartLamp.value).is_true()
+        assert_that(first.Setpoint.value).is_equal_to(1.5)
+
+        first.StartLamp = True
+        assert_that(first.changes).is_equal_to({"redLamp": "1"})
+        assert_that(second.changes).is_empty()
+
+    def test_declared_io_is_not_modified_by_instances(self):
+        module = X410DigitalOut("first")
+        assert_that(module.StartLamp).is_not_same_as(X410DigitalOut.StartLamp)
+        assert_that(module.StartLamp._reader_writer).is_same_as(module)
+        assert_that(X410DigitalOut.StartLamp._reader_writer).is_none()
+
+    def test_unbound_io_is_returned_as_is(self):
+        class Holder:
+            Lamp = DiscreteOut("Lamp", "lamp1")
+        holder = Holder()
+        assert_that(holder.Lamp).is_same_as(Holder.__dict__["Lamp"])
+
+    @mock.patch.object(reader_writer.requests.Session, 'get')
+    @mock.patch.object(reader_writer.requests, 'get')
+    def test_construction_does_not_read(self, get, session_get):
+        with mock.patch.object(X410DigitalOut, 'read') as read, \
+                mock.patch.object(X410DigitalOut, 'read_value') as read_value:
+            modules = [X410DigitalOut("10.0.0.{}".format(i)) for i in range(100)] + \
+                      [X410DigitalOut("10.0.1.{}".format(i), keep_alive=False) for i in range(100)]
+        assert_that(modules[0]._req).is_instance_of(reader_writer.requests.Session)
+        assert_that(session_get.call_count).is_equal_to(0)
+        assert_that(get.call_count).is_equal_to(0)
+        assert_that(read.call_count).is_equal_to(0)
+        assert_that(read_value.call_count).is_equal_to(0)
+        assert_that(set(m.StartLamp._reader_writer for m in modules)).is_length(200)
+        assert_that(modules[0].members).is_equal_to(["MaintLight", "Setpoint", "StartLamp"])
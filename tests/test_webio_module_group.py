@@ -0,0 +1,50 @@
+from controlpyweb.errors import WebIOConnectionError
+from controlpyweb.reader_writer import ReaderWriter
+from controlpyweb.webio_module_group import WebIOModuleGroup
+from tests.fakes import FakeDevice
+from assertpy import assert_that
+import unittest
+import time
+
+
+def make_module(latency: float, online: bool = True):
+    module = ReaderWriter("testme")
+    module._req = FakeDevice({"relay1": "1"}, latency)
+    if not online:
+        module._req.error = WebIOConnectionError("offline")
+    return module
+
+
+class TestWebIOModuleGroup(unittest.TestCase):
+
+    def test_scan_time_is_bounded_by_slowest_module(self):
+        modules = [make_module(0.05) for _ in range(8)]
+        with WebIOModuleGroup(modules, max_workers=8) as group:
+            start = time.perf_counter()
+            results = group.update_from_hardware()
+            elapsed = time.perf_counter() - start
+        assert_that(elapsed).is_less_than(0.05 * 4)
+        assert_that(list(results.values())).contains_only(None)
+        assert_that(modules[0].read("relay1")).is_equal_to("1")
+
+    def test_failures_are_reported_per_module(self):
+        good, bad = make_module(0), make_module(0, online=False)
+        with WebIOModuleGroup([good, bad]) as group:
+            results = group.update_from_hardware()
+        assert_that(results[good]).is_none()
+        assert_that(results[bad]).is_instance_of(WebIOConnectionError)
+        assert_that(WebIOModuleGroup.failed(results)).is_equal_to([bad])
+
+    def test_scan_reads_runs_logic_then_writes(self):
+        modules = [make_module(0) for _ in range(3)]
+
+        def logic(group):
+            for module in group:
+                module.write("relay1", False)
+
+        with WebIOModuleGroup(modules) as group:
+            result = group.scan(logic)
+        assert_that(WebIOModuleGroup.failed(result.writes)).is_empty()
+        for module in modules:
+            assert_that(module._req.requests).is_equal_to([None, {"relay1": "0"}])
+            assert_that(module.changes).is_empty()
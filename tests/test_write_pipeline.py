@@ -0,0 +1,81 @@
+from controlpyweb.reader_writer import ReaderWriter
+from controlpyweb.write_pipeline import RateLimiter, split_changes
+from assertpy import assert_that
+from urllib.parse import urlencode
+import threading
+import time
+import unittest
+
+
+class Session:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = []
+        self.entered = threading.Event()
+
+    def get(self, url, params=None, timeout=None):
+        self.requests.append((url, dict(params or {})))
+        self.entered.set()
+        time.sleep(self.latency)
+        return None
+
+
+class TestWritePipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.session = Session()
+        self.module = ReaderWriter("testme", max_url_length=120)
+        self.module._req = self.session
+
+    def test_split_changes_keeps_each_url_within_limit(self):
+        url = "http://testme/customState.json"
+        changes = {"relay{}".format(i): "1" for i in range(40)}
+        batches = list(split_changes(url, changes, 100))
+        assert_that(len(batches)).is_greater_than(1)
+        for batch in batches:
+            assert_that(len(url + "?" + urlencode(batch))).is_less_than_or_equal_to(100)
+        merged = dict()
+        for batch in batches:
+            merged.update(batch)
+        assert_that(merged).is_equal_to(changes)
+        assert_that(list(split_changes(url, changes, None))).is_equal_to([changes])
+
+    def test_repeated_writes_are_coalesced(self):
+        for value in range(5):
+            self.module.write("register1", value)
+        self.module.write("register2", 1)
+        self.module.send_changes_to_hardware()
+        assert_that(self.session.requests).is_equal_to([(self.module._url, {"register1": "4", "register2": "1"})])
+        assert_that(self.module.write_stats.coalesced).is_equal_to(4)
+        assert_that(self.module.write_stats.requests).is_equal_to(1)
+
+    def test_large_change_sets_are_batched(self):
+        for i in range(30):
+            self.module.write("relay{}".format(i), True)
+        self.module.send_changes_to_hardware()
+        assert_that(len(self.session.requests)).is_greater_than(1)
+        assert_that(self.module.changes).is_empty()
+        assert_that(self.module.write_stats.batches).is_equal_to(len(self.session.requests) - 1)
+
+    def test_concurrent_immediate_writes_share_a_request(self):
+        self.session.latency = 0.05
+        first = threading.Thread(target=self.module.write_immediate, args=("relay0", True))
+        first.start()
+        self.session.entered.wait(1)
+        others = [threading.Thread(target=self.module.write_immediate, args=("relay{}".format(i), True))
+                  for i in range(1, 6)]
+        for t in others:
+            t.start()
+        for t in [first] + others:
+            t.join(2)
+        assert_that(self.session.requests).is_length(2)
+        assert_that(self.session.requests[1][1]).is_length(5)
+        assert_that(self.module.write_stats.immediate_merged).is_equal_to(4)
+
+    def test_request_rate_is_limited(self):
+        self.module._rate_limiter = RateLimiter(max_rate=50)
+        start = time.monotonic()
+        for i in range(4):
+            self.module.write_immediate("relay1", i % 2 == 0)
+        assert_that(time.monotonic() - start).is_greater_than_or_equal_to(0.055)
+        assert_that(self.module.write_stats.throttled_time).is_greater_than(0.05)